@@ -1,5 +1,11 @@
-from . import tool
+import heapq
+from array import array
+from bisect import bisect_right
 from . import map
+from . import constants as c
+from . import searchStats
+from . import bitboard
+from . import distanceField
 
 class SearchEntry():
     def __init__(self, x, y, g_cost, f_cost=0, pre_entry=None):
@@ -17,155 +23,731 @@ class SearchEntry():
         return (self.x, self.y)
 
 
-def AStarSearch(map, source, dest):
-    def getNewPosition(map, locatioin, offset):
-        # 位置 (x, y) 表示 location 节点的一个相邻节点
-        x,y = (location.x + offset[0], location.y + offset[1])
-        if not map.isValid(x, y) or not map.isMovable(x, y):
-            # 如果位置 (x, y) 所在的地图格子是无效的或不可移动的，返回 None
+class Path():
+    def __init__(self, map, index_list, head=0, cost_list=None):
+        self.map = map
+        # 路径上每个格子的索引值数组，第一个是开始位置，最后一个是目的位置
+        self.index_list = array('i', index_list)
+        # head 是路径当前所在格子在数组中的位置，作为队列使用时每走一步加 1
+        self.head = head
+        # cost_list 是从开始位置走到每个格子的累计行走距离，为 None 时每一步的行走距离都是 1
+        self.cost_list = None if cost_list is None else array('i', cost_list)
+
+    def __len__(self):
+        # 从当前格子到目的位置的格子数量，包含当前格子
+        return len(self.index_list) - self.head
+
+    def __getitem__(self, key):
+        # 整数下标返回从当前格子开始的第 key 个格子的地图位置，切片返回新的路径对象
+        if isinstance(key, slice):
+            cost_list = None if self.cost_list is None else self.cost_list[self.head:][key]
+            return Path(self.map, self.index_list[self.head:][key], 0, cost_list)
+        if key < 0:
+            key += len(self)
+        if key < 0 or key >= len(self):
+            raise IndexError('path index out of range')
+        return self.map.getCellPos(self.index_list[self.head + key])
+
+    def __iter__(self):
+        # 按顺序返回从当前格子到目的位置的地图位置
+        for i in range(self.head, len(self.index_list)):
+            yield self.map.getCellPos(self.index_list[i])
+
+    def copy(self):
+        '''返回一个新的路径对象，共用格子索引值数组，可以单独作为队列使用'''
+        path = Path(self.map, (), self.head)
+        path.index_list = self.index_list
+        path.cost_list = self.cost_list
+        return path
+
+    def getDistance(self):
+        '''返回从当前格子到目的位置的行走距离'''
+        return len(self.index_list) - 1 - self.head
+
+    def getCost(self):
+        '''返回从当前格子到目的位置的累计行走距离'''
+        if self.cost_list is None:
+            return self.getDistance()
+        return self.cost_list[-1] - self.cost_list[self.head]
+
+    def getPosByCost(self, cost):
+        '''返回从当前格子出发，累计行走距离不超过 cost 时能走到的最远的地图位置'''
+        if self.cost_list is None:
+            return self.getPosByDistance(cost)
+        i = bisect_right(self.cost_list, self.cost_list[self.head] + cost, self.head) - 1
+        return self.map.getCellPos(self.index_list[max(i, self.head)])
+
+    def cutByCost(self, cost):
+        '''返回从当前格子出发，累计行走距离不超过 cost 的一段路径，目的位置和 getPosByCost 返回的位置一样'''
+        if self.cost_list is None:
+            distance = max(0, min(cost, self.getDistance()))
+        else:
+            distance = max(0, bisect_right(self.cost_list, self.cost_list[self.head] + cost, self.head) - 1 - self.head)
+        return self[:distance + 1]
+
+    def getFirstStep(self):
+        '''返回当前格子的下一步地图位置，已经在目的位置时返回 None'''
+        if self.head + 1 >= len(self.index_list):
             return None
-        return (x, y)
-        
-    def getPositions(map, location):
-        # 获取 location 节点所有的相邻节点
-        offsets = tool.getMovePositions(location.x, location.y)
-        poslist = []
-        for offset in offsets:
-            # 如果这个相邻节点是无效的或不可移动地，pos 值为 None
-            pos = getNewPosition(map, location, offset)
-            if pos is not None:
-                poslist.append(pos)
-        # 返回 location 节点所有有效且可移动的相邻节点列表
-        return poslist
-
-    def calHeuristic(map, pos, dest):
-        # 返回从 pos 节点到 pos 节点的估计距离
-        return map.calHeuristicDistance(dest.x, dest.y, pos[0], pos[1])
-
-    def getMoveCost(location, pos):
-        # 从 location 节点移动到 pos 节点的距离
-        if location.x != pos[0] and location.y != pos[1]:
-            return 1.4
+        return self.map.getCellPos(self.index_list[self.head + 1])
+
+    def getDest(self):
+        '''返回路径的目的位置'''
+        return self.map.getCellPos(self.index_list[-1])
+
+    def getPosByDistance(self, distance):
+        '''返回从当前格子走 distance 步后的地图位置，distance 超过路径的范围时返回开始或者目的位置'''
+        distance = max(0, min(distance, self.getDistance()))
+        return self.map.getCellPos(self.index_list[self.head + distance])
+
+    def popStep(self):
+        '''作为队列使用，走到下一个格子并返回它的地图位置，已经在目的位置时返回 None'''
+        pos = self.getFirstStep()
+        if pos is not None:
+            self.head += 1
+        return pos
+
+
+class SearchArea():
+    def __init__(self, map, source, index_list, cost_list, parent_list):
+        self.map = map
+        # 搜索开始位置的格子索引值
+        self.source = source
+        # 搜索到的所有格子索引值，按照行走距离从小到大排列，包含开始位置
+        self.index_list = index_list
+        # cost_list 和 parent_list 数组保存每个格子的行走距离和父节点索引值，没有搜索到的格子值为 -1
+        self.cost_list = cost_list
+        self.parent_list = parent_list
+
+    def isInArea(self, index):
+        # 判断格子是否在搜索到的范围中
+        return self.cost_list[index] >= 0
+
+    def getCost(self, index):
+        # 返回到格子的行走距离，没有搜索到时返回 None
+        cost = self.cost_list[index]
+        return cost if cost >= 0 else None
+
+    def getEntry(self, index):
+        # 返回到格子的路径对象，没有搜索到时返回 None
+        if not self.isInArea(index):
+            return None
+        return createPathEntry(self.map, self.parent_list, self.cost_list, index)
+
+
+def countSteps(parent_list, index):
+    # 根据父节点数组，返回从开始位置到 index 格子的步数
+    steps = 0
+    while parent_list[index] != -1:
+        index = parent_list[index]
+        steps += 1
+    return steps
+
+def createPathEntry(map, parent_list, cost_list, index):
+    # 根据父节点数组，创建从开始位置到 index 格子的路径节点链表，返回终点的节点对象
+    index_list = []
+    while index != -1:
+        index_list.append(index)
+        index = parent_list[index]
+    location = None
+    for index in reversed(index_list):
+        x, y = map.getCellPos(index)
+        location = SearchEntry(x, y, cost_list[index], cost_list[index], location)
+    return location
+
+def AStarSearch(map, source, dest, counter=None):
+    # counter 不为 None 时，保存扩展的节点数量等统计信息，参考 searchStats.recordSearch
+    start_time = searchStats.getStartTime(map)
+    move_table = map.move_table
+    movable_map = map.movable_map
+    # 移动到每个格子的行走距离
+    cost_map = map.cost_map
+    source_index = map.getCellIndex(*source)
+    dest_index = map.getCellIndex(*dest)
+
+    # 每个格子的搜索状态，0 表示未访问，1 表示在 open 列表中，2 表示在 closed 列表中
+    state_list = bytearray(map.size)
+    # 每个格子的 G 值，F 值，父节点索引值和加入 open 列表的顺序
+    g_list = array('i', [0]) * map.size
+    f_list = array('i', [0]) * map.size
+    parent_list = array('i', [-1]) * map.size
+    order_list = array('i', [0]) * map.size
+    # open_heap 是按照 (f_cost, 加入顺序, 格子索引值) 排列的最小堆，
+    # 堆中旧的记录不删除，出堆时再跳过；f_cost 相同时先加入的节点先出堆
+    open_heap = [(0, 0, source_index)]
+    state_list[source_index] = 1
+    order = 1
+    # 扩展的节点数量，加入最小堆的记录数量和最小堆的最大长度，只在记录统计信息时计数
+    expanded, pushed, peak_open = 0, 1, 1
+    record = start_time is not None or counter is not None
+
+    while len(open_heap) > 0:
+        if record and len(open_heap) > peak_open:
+            peak_open = len(open_heap)
+        # 从最小堆中取出 f_cost 值最小的节点
+        f_cost, _, index = heapq.heappop(open_heap)
+        if state_list[index] != 1 or f_list[index] != f_cost:
+            # 跳过已经在 closed 列表中或者 f_cost 已被更新的过期记录
+            continue
+        if index == dest_index:
+            # 位置和终点位置一样，表示找到路线
+            if record:
+                searchStats.recordSearch(map, start_time, 'astar', expanded, pushed, peak_open,
+                                countSteps(parent_list, index), counter)
+            return createPathEntry(map, parent_list, g_list, index)
+
+        # 将节点添加到 closed 列表中
+        state_list[index] = 2
+        if record:
+            expanded += 1
+        for next in move_table[index]:
+            # 忽略已经在 closed 列表中或者不能移动到的相邻格子
+            if state_list[next] == 2 or not movable_map[next]:
+                continue
+            # 计算从当前位置移动到相邻位置的 g_cost，加上相邻位置格子类型的行走距离
+            g_cost = g_list[index] + cost_map[next]
+            if state_list[next] == 0:
+                # 估计距离使用行走距离的下限，有距离表或路标距离表时更接近实际的距离
+                h_cost = map.calLowerDistance(next, dest_index)
+                if h_cost is None:
+                    # 只考虑石头也不能到达终点，不再访问这个格子
+                    state_list[next] = 2
+                    continue
+                # 相邻位置不在 open 列表中，添加到 open 列表中
+                state_list[next] = 1
+                order_list[next] = order
+                order += 1
+            elif g_list[next] <= g_cost:
+                continue
+            else:
+                h_cost = f_list[next] - g_list[next]
+            # 更新相邻位置的 g_cost，f_cost 和父节点
+            g_list[next] = g_cost
+            f_list[next] = g_cost + h_cost
+            parent_list[next] = index
+            heapq.heappush(open_heap, (f_list[next], order_list[next], next))
+            if record:
+                pushed += 1
+
+    # 没有找到从开始位置到终点位置的路线
+    searchStats.recordSearch(map, start_time, 'astar', expanded, pushed, peak_open, None, counter)
+    return None
+
+def BidirectionalSearch(map, source, dest, counter=None):
+    # 从 source 位置和 dest 位置同时进行广度优先搜索，每一步的距离都是 1，
+    # 每次扩展节点较少的一边的一整层节点，两边相遇时得到最短的路径。
+    # 返回和 AStarSearch 一样的路径节点链表，找不到路径时返回 None。
+    # counter 不为 None 时，保存扩展的节点数量等统计信息，参考 searchStats.recordSearch
+    start_time = searchStats.getStartTime(map)
+    move_table = map.move_table
+    movable_map = map.movable_map
+    source_index = map.getCellIndex(*source)
+    dest_index = map.getCellIndex(*dest)
+    if source_index == dest_index:
+        return SearchEntry(source[0], source[1], 0, 0)
+
+    # 下标 0 是从 source 开始的正向搜索，下标 1 是从 dest 开始的反向搜索
+    cost_lists = (array('i', [-1]) * map.size, array('i', [-1]) * map.size)
+    parent_lists = (array('i', [-1]) * map.size, array('i', [-1]) * map.size)
+    frontiers = [[source_index], [dest_index]]
+    cost_lists[0][source_index] = 0
+    cost_lists[1][dest_index] = 0
+    # 扩展的节点数量，加入队列的节点数量和两边队列的最大长度之和
+    expanded, pushed, peak_open = 0, 2, 2
+    meet = None
+
+    if movable_map[dest_index]:
+        while len(frontiers[0]) > 0 and len(frontiers[1]) > 0 and meet is None:
+            # 选择节点较少的一边扩展
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            cost_list, other_cost_list = cost_lists[side], cost_lists[1 - side]
+            parent_list = parent_lists[side]
+            new_frontier = []
+            best_cost = None
+            # 每一层扩展完后再计数
+            expanded += len(frontiers[side])
+            for index in frontiers[side]:
+                g_cost = cost_list[index] + 1
+                for next in move_table[index]:
+                    # 反向搜索可以到达 source 格子，source 格子上是行动的生物
+                    if cost_list[next] >= 0 or not (movable_map[next] or next == source_index):
+                        continue
+                    cost_list[next] = g_cost
+                    parent_list[next] = index
+                    new_frontier.append(next)
+                    if other_cost_list[next] >= 0:
+                        # 两边的搜索相遇，这一层中距离最短的相遇位置就是最短路径经过的位置
+                        total_cost = g_cost + other_cost_list[next]
+                        if best_cost is None or total_cost < best_cost:
+                            best_cost = total_cost
+                            meet = next
+            frontiers[side] = new_frontier
+            pushed += len(new_frontier)
+            if len(frontiers[0]) + len(frontiers[1]) > peak_open:
+                peak_open = len(frontiers[0]) + len(frontiers[1])
+
+    path_length = None
+    if meet is not None:
+        path_length = cost_lists[0][meet] + cost_lists[1][meet]
+    searchStats.recordSearch(map, start_time, 'bidirectional', expanded, pushed, peak_open, path_length, counter)
+    if meet is None:
+        return None
+    # 合并相遇位置两边的路径，先得到从 source 到相遇位置的格子，再加上相遇位置到 dest 的格子
+    index_list = []
+    index = meet
+    while index != -1:
+        index_list.append(index)
+        index = parent_lists[0][index]
+    index_list.reverse()
+    index = parent_lists[1][meet]
+    while index != -1:
+        index_list.append(index)
+        index = parent_lists[1][index]
+    location = None
+    for g_cost, index in enumerate(index_list):
+        x, y = map.getCellPos(index)
+        location = SearchEntry(x, y, g_cost, g_cost, location)
+    return location
+
+def isReachable(map, source, dest, max_distance, counter=None):
+    # 判断是否能在 max_distance 行走距离以内从 source 位置行走到 dest 位置，
+    # 每一步的距离是移动到的格子的行走距离，f_cost 大于 max_distance 的节点直接剪枝，一找到路径就返回
+    # counter 不为 None 时，保存扩展的节点数量等统计信息，路径长度是找到 dest 时的步数
+    if source[0] == dest[0] and source[1] == dest[1]:
+        return True
+    dest_index = map.getCellIndex(*dest)
+    source_index = map.getCellIndex(*source)
+    if not map.isConnected(source_index, dest_index):
+        # 不在同一个连通区域中，不用搜索
+        return False
+    lower_distance = map.calLowerDistance(source_index, dest_index)
+    if lower_distance is None or lower_distance > max_distance:
+        # 行走距离的下限已经超过了 max_distance
+        return False
+
+    start_time = searchStats.getStartTime(map)
+    move_table = map.move_table
+    movable_map = map.movable_map
+    cost_map = map.cost_map
+    # g_list 保存已找到的到每个格子的最短行走距离，没有找到时是 max_distance
+    g_list = [max_distance] * map.size
+    g_list[source_index] = 0
+    # 最小堆中的记录是 (f_cost, -g_cost, 格子索引值)，f_cost 相同时优先扩展离 source 更远的节点
+    open_heap = [(0, 0, source_index)]
+    # 只在记录统计信息时计数
+    expanded, pushed, peak_open = 0, 1, 1
+    record = start_time is not None or counter is not None
+    while len(open_heap) > 0:
+        if record and len(open_heap) > peak_open:
+            peak_open = len(open_heap)
+        _, g_cost, index = heapq.heappop(open_heap)
+        g_cost = -g_cost
+        if g_cost > g_list[index]:
+            # 跳过过期的记录
+            continue
+        if record:
+            expanded += 1
+        for next in move_table[index]:
+            if not movable_map[next]:
+                continue
+            next_g = g_cost + cost_map[next]
+            if next == dest_index and next_g <= max_distance:
+                # 找到一条行走距离不超过 max_distance 的路径
+                searchStats.recordSearch(map, start_time, 'reach', expanded, pushed, peak_open, next_g, counter)
+                return True
+            if next_g >= g_list[next]:
+                # 已经有更短的路径，或者剩下的行走距离不够到达 dest
+                continue
+            lower_distance = map.calLowerDistance(next, dest_index)
+            if lower_distance is None:
+                continue
+            f_cost = next_g + lower_distance
+            if f_cost > max_distance:
+                continue
+            g_list[next] = next_g
+            heapq.heappush(open_heap, (f_cost, -next_g, next))
+            if record:
+                pushed += 1
+    searchStats.recordSearch(map, start_time, 'reach', expanded, pushed, peak_open, None, counter)
+    return False
+
+def searchBuckets(map, source_index, max_distance=None, dest_index=-1, visit=None):
+    # 桶队列（Dial 算法）的 Dijkstra 搜索，每个格子的行走距离都是小的整数，
+    # 距离为 g 的格子放在 buckets[g % bucket_num] 中，入队和出队都是 O(1)。
+    # 所有行走距离都是 1 时和广度优先搜索的顺序一样。
+    # 返回 (按照行走距离排列的格子列表, 行走距离数组, 父节点数组, 出队的记录数量, 入队的记录数量)，
+    # 扩展到 dest_index 格子，或者 visit 不为 None 并且 visit(格子索引值, 行走距离) 返回 True 时停止搜索。
+    # source_index 也可以是多个不重复的开始格子的索引值列表，计算每个格子到最近的开始格子的距离
+    move_table = map.move_table
+    movable_map = map.movable_map
+    cost_map = map.cost_map
+    cost_list = array('i', [-1]) * map.size
+    parent_list = array('i', [-1]) * map.size
+    source_list = source_index if isinstance(source_index, list) else [source_index]
+    for index in source_list:
+        cost_list[index] = 0
+    # 同时在队列中的格子的行走距离最多相差 max_move_cost，桶的数量是 max_move_cost + 1
+    bucket_num = map.max_move_cost + 1
+    buckets = [[] for _ in range(bucket_num)]
+    buckets[0].extend(source_list)
+    # index_list 保存已经确定行走距离的格子，pending 是队列中记录的数量，
+    # 入队的记录数量是出队的记录数量加上还在队列中的记录数量
+    index_list = []
+    pending, popped = len(source_list), 0
+    g_cost = 0
+    while pending > 0:
+        bucket = buckets[g_cost % bucket_num]
+        buckets[g_cost % bucket_num] = []
+        pending -= len(bucket)
+        popped += len(bucket)
+        for index in bucket:
+            if cost_list[index] != g_cost:
+                # 跳过已经找到更短距离的过期记录
+                continue
+            index_list.append(index)
+            if index == dest_index or (visit is not None and visit(index, g_cost)):
+                return index_list, cost_list, parent_list, popped, popped + pending
+            for next in move_table[index]:
+                if not movable_map[next]:
+                    continue
+                next_g = g_cost + cost_map[next]
+                if max_distance is not None and next_g > max_distance:
+                    continue
+                if cost_list[next] < 0 or next_g < cost_list[next]:
+                    cost_list[next] = next_g
+                    parent_list[next] = index
+                    buckets[next_g % bucket_num].append(next)
+                    pending += 1
+        g_cost += 1
+    return index_list, cost_list, parent_list, popped, popped
+
+def getReachableArea(map, source, max_distance):
+    # 获取行走距离小于等于 max_distance 的所有格子，地图有位棋盘并且所有格子的行走距离都是 1 时
+    # 使用位棋盘计算，没有位棋盘的大地图中范围比较大时使用 numpy 距离场计算，否则使用桶队列搜索，
+    # 几种方法返回的对象接口一样
+    if map.bitboard is not None and map.uniform_cost:
+        return bitboard.getReachableArea(map, source, max_distance)
+    if distanceField.isVectorized(map) and max_distance >= c.FIELD_MIN_DISTANCE:
+        return distanceField.getReachableArea(map, source, max_distance)
+    return searchReachableArea(map, source, max_distance)
+
+def searchReachableArea(map, source, max_distance):
+    # 从 source 位置开始做一次桶队列搜索，获取行走距离小于等于 max_distance 的所有格子，
+    # 返回 SearchArea 对象，包含每个格子的行走距离和路径上的前一个格子
+    start_time = searchStats.getStartTime(map)
+    source_index = map.getCellIndex(*source)
+    index_list, cost_list, parent_list, popped, pushed = searchBuckets(map, source_index, max_distance)
+    if start_time is not None:
+        # 路径长度是范围内最远的格子的行走距离
+        searchStats.recordSearch(map, start_time, 'area', popped, pushed,
+                        searchStats.getLayerPeak(cost_list), cost_list[index_list[-1]])
+    return SearchArea(map, source_index, index_list, cost_list, parent_list)
+
+def DialSearch(map, source, dest, counter=None):
+    # 使用桶队列的 Dijkstra 算法搜索 source 位置到 dest 位置的路径，适合格子行走距离不同的地图，
+    # 返回和 AStarSearch 一样的路径节点链表，节点的 g_cost 是行走距离，找不到路径时返回 None
+    start_time = searchStats.getStartTime(map)
+    source_index = map.getCellIndex(*source)
+    dest_index = map.getCellIndex(*dest)
+    index_list, cost_list, parent_list, popped, pushed = searchBuckets(map, source_index, None, dest_index)
+    found = index_list[-1] == dest_index
+    if start_time is not None or counter is not None:
+        searchStats.recordSearch(map, start_time, 'dial', popped, pushed, searchStats.getLayerPeak(cost_list),
+                        countSteps(parent_list, dest_index) if found else None, counter)
+    if not found:
+        return None
+    return createPathEntry(map, parent_list, cost_list, dest_index)
+
+class ReservationTable():
+    def __init__(self, map, entity_list):
+        # 多个生物一起规划行走路径时使用的时空预约表，时间 t 是走完第 t 步的时间，
+        # 所有查找都是字典操作，规划一个生物的路径时不需要遍历其他生物的路径
+        self.map = map
+        # entity_list 是一起规划的生物列表，它们现在所在的格子在规划时可以经过
+        self.entity_set = set(entity_list)
+        # cell_dict 的 key 是 (格子索引值, 时间)，value 是这个时间在格子中的生物
+        self.cell_dict = {}
+        # edge_dict 的 key 是 (格子索引值, 下一个格子索引值, 时间)，value 是这个时间这样移动的生物，
+        # 用来避免两个生物在同一步交换位置
+        self.edge_dict = {}
+        # rest_dict 的 key 是格子索引值，value 是 (开始时间, 生物)，生物走完路径后一直停在这个格子
+        self.rest_dict = {}
+        # last_dict 保存每个格子被每个生物预约的最后时间，{格子索引值: {生物: 时间}}
+        self.last_dict = {}
+        # path_dict 保存每个生物预约的每一步的格子索引值列表
+        self.path_dict = {}
+        for entity in entity_list:
+            # 还没有规划路径的生物停在现在的格子
+            self.reserve(entity, [map.getCellIndex(entity.map_x, entity.map_y)])
+        # 地图的连通区域标记把生物所在的格子当作障碍，这里重新标记可以经过的格子的连通区域，
+        # 用来排除不能到达的目的位置
+        self.label_list = array('i', [-1]) * map.size
+        for index in range(map.size):
+            if self.label_list[index] < 0 and self.isPassable(index):
+                self.fillLabel(index)
+
+    def fillLabel(self, start):
+        # 从 start 格子广度优先搜索，把连在一起的可以经过的格子标记为 start
+        self.label_list[start] = start
+        queue = [start]
+        head = 0
+        while head < len(queue):
+            index = queue[head]
+            head += 1
+            for next in self.map.move_table[index]:
+                if self.label_list[next] < 0 and self.isPassable(next):
+                    self.label_list[next] = start
+                    queue.append(next)
+
+    def isPassable(self, index):
+        '''不考虑预约时格子是否可以经过，一起规划的生物现在所在的格子也可以经过'''
+        return self.map.movable_map[index] or self.map.entity_map[index] in self.entity_set
+
+    def isConnected(self, source_index, dest_index):
+        '''不考虑预约时，判断是否可以从 source 格子走到 dest 格子'''
+        return self.label_list[dest_index] >= 0 and self.label_list[dest_index] == self.label_list[source_index]
+
+    def isFree(self, index, time, entity):
+        '''判断 time 时间格子是否没有被其他生物预约'''
+        other = self.cell_dict.get((index, time))
+        if other is not None and other is not entity:
+            return False
+        rest = self.rest_dict.get(index)
+        return rest is None or rest[1] is entity or time < rest[0]
+
+    def isSwap(self, index, next, time, entity):
+        '''判断在 time 时间从 index 格子走到 next 格子时，是否和其他生物交换位置'''
+        other = self.edge_dict.get((next, index, time))
+        return other is not None and other is not entity
+
+    def canRest(self, index, time, entity):
+        '''判断生物能否从 time 时间开始一直停在格子中'''
+        for other, last in self.last_dict.get(index, {}).items():
+            if other is not entity and last > time:
+                return False
+        return True
+
+    def reserve(self, entity, index_list):
+        '''预约生物每一步所在的格子，index_list[t] 是 t 时间的格子索引值，最后一个格子一直预约'''
+        self.release(entity)
+        for time, index in enumerate(index_list):
+            self.cell_dict[(index, time)] = entity
+            self.last_dict.setdefault(index, {})[entity] = time
+            if time > 0:
+                self.edge_dict[(index_list[time - 1], index, time - 1)] = entity
+        self.rest_dict[index_list[-1]] = (len(index_list) - 1, entity)
+        self.path_dict[entity] = index_list
+
+    def release(self, entity):
+        '''删除生物的所有预约'''
+        index_list = self.path_dict.pop(entity, None)
+        if index_list is None:
+            return
+        for time, index in enumerate(index_list):
+            del self.cell_dict[(index, time)]
+            self.last_dict[index].pop(entity, None)
+            if time > 0:
+                del self.edge_dict[(index_list[time - 1], index, time - 1)]
+        del self.rest_dict[index_list[-1]]
+
+    def planPath(self, entity, dest, window=c.COOPERATIVE_WINDOW):
+        '''删除生物原来的预约，搜索并预约一条和其他生物不冲突的路径，返回路径对象，
+           路径中原地等待的一步也是一个格子。找不到路径时生物停在原地，返回 None'''
+        source = (entity.map_x, entity.map_y)
+        self.release(entity)
+        path = createPath(self.map, CooperativeSearch(self.map, source, dest, self, entity, window))
+        if path is None:
+            self.reserve(entity, [self.map.getCellIndex(*source)])
         else:
-            return 1
+            self.reserve(entity, list(path.index_list))
+        return path
+
 
-    def isInDict(d, pos):
-        # 判断一个节点位置是否在字典中
-        if pos in d:
-            return d[pos]
+def CooperativeSearch(map, source, dest, table, entity, window=c.COOPERATIVE_WINDOW, counter=None):
+    # 窗口化的协作 A* 算法，在 (格子, 时间) 空间中搜索 source 位置到 dest 位置的路径，
+    # 每一步可以走到相邻格子或者原地等待，避开预约表 table 中其他生物预约的格子。
+    # 最多搜索 window 步，窗口内不能到达时返回窗口结束时估计距离最小的部分路径。
+    # 返回和 AStarSearch 一样的路径节点链表，原地等待的行走距离是 1，找不到路径时返回 None
+    start_time = searchStats.getStartTime(map)
+    move_table = map.move_table
+    cost_map = map.cost_map
+    source_index = map.getCellIndex(*source)
+    dest_index = map.getCellIndex(*dest)
+    h_cost = map.calLowerDistance(source_index, dest_index)
+    if h_cost is None or not table.isConnected(source_index, dest_index):
         return None
 
-    def addAdjacentPositions(map, location, dest, open_dict, closed_dict):
-        # 获取 location 节点所有可移动的相邻位置
-        poslist = getPositions(map, location)
-        for pos in poslist:
-            # 如果 pos 位置已经在 closed_dict 字典中，不用添加
-            if isInDict(closed_dict, pos) is None:
-                # 查看 pos 位置是否在 open_dict 字典中 
-                findEntry = isInDict(open_dict, pos)
-                h_cost = calHeuristic(map, pos, dest)
-                # 计算从 location 节点所在位置移动到 pos 位置的 g_cost
-                g_cost = location.g_cost + getMoveCost(location, pos)
-                if findEntry is None :
-                    # 如果 pos 位置不在 open_dict 字典中，创建一个节点对象添加到 open_dict 字典中
-                    open_dict[pos] = SearchEntry(pos[0], pos[1], g_cost, g_cost + h_cost, location)
-                elif findEntry.g_cost > g_cost:
-                    # 如果 pos 位置在 open_dict 字典中，并且 findEntry 节点的 g_cost 
-                    # 大于从 location 节点移动过来计算出的 g_cost
-                    findEntry.g_cost = g_cost
-                    findEntry.f_cost = g_cost + h_cost
-                    # 更新 findEntry 节点的父节点为 location 节点
-                    findEntry.pre_entry = location
-    
-    def getFastPosition(open_dict):
-        # 初始化 fast 值为 None
-        fast = None
-        for entry in open_dict.values():
-            # 在 open_dict 中找到一个 f_cost 值最小的节点
-            if fast is None:
-                fast = entry
-            elif fast.f_cost > entry.f_cost:
-                fast = entry
-        # 如果 openlist 列表为空，返回 None
-        return fast
-
-    # open_dict 和 closed_dict 字典的 key 是节点在地图上的位置（x, y）
-    open_dict = {}
-    closed_dict = {}
-    # 创建开始位置的节点对象
-    location = SearchEntry(source[0], source[1], 0.0)
-    # 创建终点位置的节点对象
-    dest = SearchEntry(dest[0], dest[1], 0.0)
-    # 将开始节点对象添加到 open_dict 字典中
-    open_dict[source] = location
-
-    while True:
-        # 从 open_dict 字典中找到一个 f_cost 值最小的节点
-        location = getFastPosition(open_dict)
-        if location is None:
-            # location 为 None，表示没有找到从开始位置到终点位置的路线
-            print("can't find valid path")
-            break;
-        
-        if location.x == dest.x and location.y == dest.y:
-            # location 位置和终点位置一样，表示找到路线
+    # g_dict 和 parent_dict 的 key 是 (格子索引值, 时间)
+    g_dict = {(source_index, 0): 0}
+    parent_dict = {(source_index, 0): None}
+    closed = set()
+    # open_heap 是按照 (f_cost, h_cost, 加入顺序, 格子索引值, 时间) 排列的最小堆，
+    # f_cost 相同时先扩展离 dest 更近的节点
+    open_heap = [(h_cost, h_cost, 0, source_index, 0)]
+    order = 1
+    # 只在记录统计信息时计数
+    expanded, pushed, peak_open = 0, 1, 1
+    record = start_time is not None or counter is not None
+    goal = None
+    while len(open_heap) > 0:
+        if record and len(open_heap) > peak_open:
+            peak_open = len(open_heap)
+        _, h_cost, _, index, time = heapq.heappop(open_heap)
+        node = (index, time)
+        if node in closed:
+            continue
+        if (index == dest_index and table.canRest(index, time, entity)) or time == window:
+            # 到达 dest 位置并且之后可以一直停在这里，或者到达窗口的最后一步
+            goal = node
             break
-        
-        # 将 location 节点添加到 closed_dict 字典中
-        closed_dict[location.getPos()] = location
-        # 将 location 节点从 open_dict 字典中删除
-        open_dict.pop(location.getPos())
-        # 添加 location 节点的相邻节点
-        addAdjacentPositions(map, location, dest, open_dict, closed_dict)
+        closed.add(node)
+        if record:
+            expanded += 1
+        g_cost = g_dict[node]
+        next_time = time + 1
+        # 相邻格子和原地等待
+        for next in move_table[index] + (index,):
+            if (next, next_time) in closed or not table.isPassable(next):
+                continue
+            if not table.isFree(next, next_time, entity) or table.isSwap(index, next, time, entity):
+                continue
+            next_h = map.calLowerDistance(next, dest_index)
+            if next_h is None:
+                continue
+            next_g = g_cost + (1 if next == index else cost_map[next])
+            if next_g >= g_dict.get((next, next_time), next_g + 1):
+                continue
+            g_dict[(next, next_time)] = next_g
+            parent_dict[(next, next_time)] = node
+            heapq.heappush(open_heap, (next_g + next_h, next_h, order, next, next_time))
+            order += 1
+            if record:
+                pushed += 1
 
+    if goal is None:
+        searchStats.recordSearch(map, start_time, 'coop', expanded, pushed, peak_open, None, counter)
+        return None
+    node_list = []
+    while goal is not None:
+        node_list.append(goal)
+        goal = parent_dict[goal]
+    location = None
+    for index, time in reversed(node_list):
+        x, y = map.getCellPos(index)
+        g_cost = g_dict[(index, time)]
+        location = SearchEntry(x, y, g_cost, g_cost, location)
+    searchStats.recordSearch(map, start_time, 'coop', expanded, pushed, peak_open, len(node_list) - 1, counter)
     return location
 
-def getFirstStepAndDistance(location):
-    # 获取路径中开始位置的下一步位置和路径的距离
-    distance = 0
-    tmp = location
-    while location.pre_entry is not None:
-        distance += 1
-        tmp = location
+def getGoalEntries(map, source, goal_groups, max_distance=None):
+    # 从 source 位置开始只做一次桶队列搜索，找到每一组目的格子中离 source 最近的格子。
+    # goal_groups 是目的格子索引值列表的列表，返回的字典 key 是搜索到的目的格子索引值，
+    # value 是到这个格子的路径对象，所有组都找到最近的格子后停止搜索。
+    # 每组中所有距离等于最近距离的目的格子都会在字典中，找不到的组没有格子在字典中。
+    # max_distance 不为 None 时只搜索行走距离小于等于 max_distance 的格子
+    goal_dict = {}
+    for group_index, goals in enumerate(goal_groups):
+        for index in goals:
+            goal_dict.setdefault(index, []).append(group_index)
+    # best_list 保存每组目的格子已经找到的最近距离，left_num 是还没有找到的组的数量
+    best_list = [None for _ in goal_groups]
+    left_num = len(set(group_index for index_list in goal_dict.values() for group_index in index_list))
+    found_list = []
+    # stop_cost 是所有组都找到后最远的最近距离
+    stop_cost = None
+
+    def visit(index, g_cost):
+        # 格子按照行走距离从小到大出队，如果是目的格子，更新所在组的最近距离
+        nonlocal left_num, stop_cost
+        if stop_cost is not None and g_cost > stop_cost:
+            # 剩下的格子不会再有距离相同的目的格子
+            return True
+        if index in goal_dict:
+            found_list.append(index)
+            for group_index in goal_dict[index]:
+                if best_list[group_index] is None:
+                    # 这一组第一次找到目的格子，桶队列保证这是最近的距离
+                    best_list[group_index] = g_cost
+                    left_num -= 1
+            if left_num == 0:
+                stop_cost = max(best for best in best_list if best is not None)
+        return False
+
+    if left_num == 0:
+        return {}
+    start_time = searchStats.getStartTime(map)
+    source_index = map.getCellIndex(*source)
+    index_list, cost_list, parent_list, popped, pushed = searchBuckets(map, source_index, max_distance, visit=visit)
+    if start_time is not None:
+        # 路径长度是最远的最近距离
+        searchStats.recordSearch(map, start_time, 'goals', popped, pushed,
+                        searchStats.getLayerPeak(cost_list), stop_cost)
+    return {index: createPath(map, createPathEntry(map, parent_list, cost_list, index)) for index in found_list}
+
+def createPath(map, location):
+    '''把路径节点链表转换成路径对象，location 是 None 时返回 None。
+       格子的行走距离不同时，保存节点 g_cost 中的累计行走距离'''
+    if location is None:
+        return None
+    index_list, cost_list = [], []
+    while location is not None:
+        index_list.append(map.getCellIndex(location.x, location.y))
+        cost_list.append(location.g_cost)
         location = location.pre_entry
-    return (tmp.x, tmp.y, distance)
+    index_list.reverse()
+    cost_list.reverse()
+    return Path(map, index_list, 0, None if map.uniform_cost else cost_list)
 
-def getAStarDistance(map, source, dest):
-    # 获取 source 位置到 dest 位置的路径距离。如果找不到路径，返回 None
-    location = AStarSearch(map, source, dest)
-    if location is not None:
-        _, _, distance = getFirstStepAndDistance(location)
-    else:
-        distance = None
-    return distance
-
-def getPath(map, source, dest):
+def findPath(map, search_func, source, dest, counter=None):
+    # 调用路径搜索函数，把搜索结果转换成路径对象。
+    # 先用连通区域标记排除不能到达的 dest 位置，不用搜索整个连通区域才返回 None。
+    # counter 不为 None 时，保存搜索扩展的节点数量等统计信息，排除时没有扩展节点
+    if not map.isConnected(map.getCellIndex(*source), map.getCellIndex(*dest)):
+        searchStats.recordSearch(map, None, None, 0, 0, 0, None, counter)
+        return None
+    return createPath(map, search_func(map, source, dest, counter))
+
+def searchPath(map, source, dest, path_search=None, counter=None):
+    # 获取 source 位置到 dest 位置的路径对象，使用地图的搜索结果缓存，找不到路径时返回 None。
+    # path_search 是这次搜索使用的算法，例如 c.SEARCH_BIDIRECTIONAL，为 None 时使用地图设置的算法，
+    # 不同的算法分别缓存。counter 不为 None 时一定重新搜索，并保存扩展的节点数量等统计信息
+    source, dest = tuple(source), tuple(dest)
+    key = ('path', source, dest, path_search)
+    search_func = map.getPathSearch(path_search)
+    if counter is not None:
+        path = findPath(map, search_func, source, dest, counter)
+        map.addSearchResult(key, path)
+        return path
+    return map.getSearchResult(key, findPath, search_func, source, dest)
+
+def addPath(map, path):
+    # 把已经找到的路径对象保存到地图的搜索结果缓存中，之后 searchPath 获取同样的开始位置和目的位置时不用再搜索，
+    # 路径必须是最短路径
+    path = path[:]
+    map.addSearchResult(('path', path[0], path.getDest(), None), path)
+
+def getPath(map, source, dest, path_search=None, counter=None):
     # source 位置和 dest 位置相同时，返回 None
     if source[0] == dest[0] and source[1] == dest[1]:
         return None
-    
-    # 如果找到路径，返回 source 位置到 dest 位置的路径每一步的列表
-    path = None
-    location = AStarSearch(map, source, dest)
-    if location is not None:
-        path = []
-        # location 节点起始时是 dest 位置
-        while location.pre_entry is not None:
-            # 按照从 dest 位置反方向添加到路径列表，最后一个是 source 的下一个位置
-            path.append(location)
-            location = location.pre_entry
-        # 将路径列表反转，变成从source 的下一个位置到 dest 位置的路径列表
-        path = path[::-1]
+    # 如果找到路径，返回 source 位置到 dest 位置的路径对象，可以用 popStep 依次获取每一步的位置，
+    # path_search 和 counter 参考 searchPath
+    path = searchPath(map, source, dest, path_search, counter)
+    if path is not None:
+        # 缓存中的路径对象不会被修改
+        path = path.copy()
     return path
 
-def getPosByDistance(location, distance):
+def getFirstStepAndDistance(path):
+    # 获取路径中开始位置的下一步位置和路径的距离，路径只有一个格子时下一步位置是目的位置
+    x, y = path.getFirstStep() or path.getDest()
+    return (x, y, path.getDistance())
+
+def getPosByDistance(path, distance):
     # 从路径的目的位置往前指定的距离 distance，返回得到的地图位置
-    tmp = location
-    while location.pre_entry is not None:
-        if distance == 0:
-            break
-        location = location.pre_entry
-        tmp = location
-        distance -= 1
-        
-    return (tmp.x, tmp.y)
\ No newline at end of file
+    return path.getPosByDistance(path.getDistance() - distance)
+
+def getAStarDistance(map, source, dest, path_search=None):
+    # 获取 source 位置到 dest 位置的路径距离。如果找不到路径，返回 None
+    path = searchPath(map, source, dest, path_search)
+    return None if path is None else path.getDistance()
@@ -0,0 +1,148 @@
+'''位棋盘，用 python 整数的每一位表示一个地图格子，第 index 位是格子索引值为 index 的格子。
+   计算行走范围时每一步对所有边界格子同时做移位和掩码运算，适合几百个格子的小地图'''
+from . import constants as c
+from . import aStarSearch
+from . import searchStats
+
+class Bitboard():
+    def __init__(self, map):
+        self.map = map
+        # terrain_bits 是有效并且不是石头的格子，entity_bits 是有生物的格子
+        self.terrain_bits = 0
+        self.entity_bits = 0
+        # group_bits 保存每个生物组的生物所在的格子，key 是生物组 id
+        self.group_bits = {}
+        for index in range(map.size):
+            x, y = map.getCellPos(index)
+            if map.isValid(x, y) and map.grid_map[index] != c.MAP_STONE:
+                self.terrain_bits |= 1 << index
+            if map.entity_map[index] is not None:
+                self.setEntity(index, None, map.entity_map[index])
+        # 移动和攻击的相邻格子的 (掩码, 索引值差值) 列表
+        self.move_shifts = createShifts(map.move_table)
+        self.attack_shifts = createShifts(map.attack_table)
+
+    def setEntity(self, index, old, entity):
+        '''格子上的生物从 old 改为 entity 时调用，old 和 entity 可以是 None'''
+        bit = 1 << index
+        if old is not None:
+            self.entity_bits &= ~bit
+            self.group_bits[old.group_id] = self.group_bits.get(old.group_id, 0) & ~bit
+        if entity is not None:
+            self.entity_bits |= bit
+            self.group_bits[entity.group_id] = self.group_bits.get(entity.group_id, 0) | bit
+
+    def getMovableBits(self):
+        '''返回可以移动到的格子，和地图的 movable_map 一样'''
+        return self.terrain_bits & ~self.entity_bits
+
+    def dilate(self, bits, shifts):
+        '''返回 bits 中格子的所有相邻格子'''
+        result = 0
+        for mask, delta in shifts:
+            if delta > 0:
+                result |= (bits & mask) << delta
+            else:
+                result |= (bits & mask) >> -delta
+        return result
+
+    def getLayers(self, source_bits, max_distance=None, movable_bits=None):
+        '''从 source_bits 中的格子开始扩展，返回每一层新到达的格子列表，第 i 层是行走距离为 i 的格子。
+           开始格子可以有生物，max_distance 为 None 时扩展到不能再扩展为止'''
+        if movable_bits is None:
+            movable_bits = self.getMovableBits()
+        reached = frontier = source_bits
+        layers = [frontier]
+        while max_distance is None or len(layers) <= max_distance:
+            frontier = self.dilate(frontier, self.move_shifts) & movable_bits & ~reached
+            if frontier == 0:
+                break
+            reached |= frontier
+            layers.append(frontier)
+        return layers
+
+    def getThreatBits(self, entity_list):
+        '''返回 entity_list 中的生物本轮行走后可以攻击到的所有格子，是每个生物的行走范围和相邻可攻击格子的并集'''
+        movable_bits = self.getMovableBits()
+        threat = 0
+        for entity in entity_list:
+            source_bits = 1 << self.map.getCellIndex(entity.map_x, entity.map_y)
+            reached = 0
+            for layer in self.getLayers(source_bits, entity.attr.distance, movable_bits):
+                reached |= layer
+            threat |= reached | self.dilate(reached, self.attack_shifts)
+        return threat & self.terrain_bits
+
+
+class BitboardArea():
+    def __init__(self, map, source, layers):
+        # 和 aStarSearch.SearchArea 的接口一样，保存位棋盘扩展的每一层格子
+        self.map = map
+        self.source = source
+        self.layers = layers
+        self.bits = 0
+        for layer in layers:
+            self.bits |= layer
+        self._index_list = None
+
+    @property
+    def index_list(self):
+        # 搜索到的所有格子索引值，按照行走距离从小到大排列，第一次使用时再从位棋盘转换
+        if self._index_list is None:
+            self._index_list = []
+            for layer in self.layers:
+                self._index_list.extend(getIndexList(layer))
+        return self._index_list
+
+    def isInArea(self, index):
+        # 判断格子是否在搜索到的范围中
+        return (self.bits >> index) & 1 == 1
+
+    def getCost(self, index):
+        # 返回到格子的行走距离，没有搜索到时返回 None
+        for cost, layer in enumerate(self.layers):
+            if (layer >> index) & 1:
+                return cost
+        return None
+
+    def getEntry(self, index):
+        # 返回到格子的路径节点链表，从格子往回每一步选择上一层中的相邻格子，没有搜索到时返回 None
+        cost = self.getCost(index)
+        if cost is None:
+            return None
+        index_list = [index]
+        for layer in reversed(self.layers[:cost]):
+            index = next(index for index in self.map.move_table[index] if (layer >> index) & 1)
+            index_list.append(index)
+        location = None
+        for g_cost, index in enumerate(reversed(index_list)):
+            x, y = self.map.getCellPos(index)
+            location = aStarSearch.SearchEntry(x, y, g_cost, g_cost, location)
+        return location
+
+
+def createShifts(neighbor_table):
+    # 把相邻格子表按照两个格子的索引值差值分组，返回 (有这个方向相邻格子的格子掩码, 索引值差值) 列表。
+    # 六边形地图中奇数行和偶数行的差值不同，会分到不同的组中，不需要单独判断行的奇偶
+    mask_dict = {}
+    for index, neighbors in enumerate(neighbor_table):
+        for next in neighbors:
+            mask_dict[next - index] = mask_dict.get(next - index, 0) | (1 << index)
+    return [(mask, delta) for delta, mask in sorted(mask_dict.items())]
+
+def getIndexList(bits):
+    '''返回 bits 中所有格子的索引值列表，从小到大排列'''
+    return [index for index, bit in enumerate(reversed(bin(bits)[2:])) if bit == '1']
+
+def getReachableArea(map, source, max_distance):
+    '''和 aStarSearch.getReachableArea 一样，返回行走距离小于等于 max_distance 的所有格子，
+       每一步的距离都是 1，使用位棋盘计算'''
+    start_time = searchStats.getStartTime(map)
+    source_index = map.getCellIndex(*source)
+    layers = map.bitboard.getLayers(1 << source_index, max_distance)
+    area = BitboardArea(map, source_index, layers)
+    if start_time is not None:
+        # 每一层做一次扩展，open 列表最多时是格子最多的一层
+        searchStats.recordSearch(map, start_time, 'bitboard', len(layers), bin(area.bits).count('1'),
+                        max(bin(layer).count('1') for layer in layers), len(layers) - 1)
+    return area
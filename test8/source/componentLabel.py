@@ -0,0 +1,142 @@
+'''连通区域标记，给可以移动到的格子标记所在连通区域的 id，O(1) 判断两个格子之间是否有路径'''
+from array import array
+from collections import deque
+
+class ComponentLabel():
+    def __init__(self, map):
+        self.map = map
+        # label_list 保存每个格子所在连通区域的 id，不能移动到的格子值为 -1
+        self.label_list = array('i', [-1]) * map.size
+        # size_dict 保存每个连通区域的格子数量，合并连通区域时把小的合并到大的中
+        self.size_dict = {}
+        self.next_label = 0
+        for index in range(map.size):
+            if map.movable_map[index] and self.label_list[index] < 0:
+                self.fillLabel(index, self.newLabel())
+
+    def newLabel(self):
+        # 返回一个新的连通区域 id
+        label = self.next_label
+        self.next_label += 1
+        self.size_dict[label] = 0
+        return label
+
+    def setLabel(self, cells, old, label):
+        # 把 cells 中的格子从连通区域 old 改为连通区域 label，old 为 -1 表示格子之前没有标记
+        for index in cells:
+            self.label_list[index] = label
+        self.size_dict[label] += len(cells)
+        if old >= 0:
+            self.size_dict[old] -= len(cells)
+            if self.size_dict[old] == 0:
+                del self.size_dict[old]
+
+    def fillLabel(self, start, label):
+        # 从 start 格子广度优先搜索，把和 start 格子连在一起并且标记相同的格子改为连通区域 label
+        label_list, movable_map, move_table = self.label_list, self.map.movable_map, self.map.move_table
+        old = label_list[start]
+        label_list[start] = label
+        cells = [start]
+        head = 0
+        while head < len(cells):
+            index = cells[head]
+            head += 1
+            for next in move_table[index]:
+                if movable_map[next] and label_list[next] == old:
+                    label_list[next] = label
+                    cells.append(next)
+        self.setLabel(cells, old, label)
+
+    def setMovable(self, index):
+        '''格子变成可以移动到时调用，格子相邻的连通区域合并成一个'''
+        label_list = self.label_list
+        labels = set(label_list[next] for next in self.map.move_table[index] if label_list[next] >= 0)
+        if len(labels) == 0:
+            label = self.newLabel()
+        else:
+            # 保留格子数量最多的连通区域 id，只需要重新标记其他较小的连通区域
+            label = max(labels, key=self.size_dict.get)
+        self.setLabel([index], -1, label)
+        for next in self.map.move_table[index]:
+            if label_list[next] >= 0 and label_list[next] != label:
+                self.fillLabel(next, label)
+
+    def setBlocked(self, index):
+        '''格子变成不能移动到时调用，格子所在的连通区域可能分成多个'''
+        label_list = self.label_list
+        old = label_list[index]
+        if old < 0:
+            return
+        label_list[index] = -1
+        self.size_dict[old] -= 1
+        if self.size_dict[old] == 0:
+            del self.size_dict[old]
+        seeds = [next for next in self.map.move_table[index] if label_list[next] == old]
+        if len(seeds) > 1:
+            self.splitLabel(old, seeds)
+
+    def splitLabel(self, old, seeds):
+        # 从每个种子格子开始一个广度优先搜索，所有搜索轮流扩展一个格子，两个搜索相遇时合并。
+        # 没有相遇就结束的搜索找到了一个分出来的连通区域，重新标记这些格子；
+        # 只剩一个搜索没有结束时停止，它所在的连通区域保留原来的 id。
+        # 这样只需要访问分出来的较小的连通区域，不用搜索整个连通区域
+        label_list, move_table = self.label_list, self.map.move_table
+        # owner 保存格子被哪个搜索访问过，parent 是合并搜索用的并查集
+        owner = {seed: i for i, seed in enumerate(seeds)}
+        parent = list(range(len(seeds)))
+        queues = [deque([seed]) for seed in seeds]
+        cells = [[seed] for seed in seeds]
+        active = list(range(len(seeds)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        while len(active) > 1:
+            for i in list(active):
+                if len(active) <= 1:
+                    break
+                if parent[i] != i:
+                    # 这个搜索已经合并到别的搜索中
+                    continue
+                queue = queues[i]
+                if len(queue) == 0:
+                    # 搜索结束了，访问过的格子是一个单独的连通区域
+                    active.remove(i)
+                    self.setLabel(cells[i], old, self.newLabel())
+                    continue
+                index = queue.popleft()
+                for next in move_table[index]:
+                    if label_list[next] != old:
+                        continue
+                    j = owner.get(next)
+                    if j is None:
+                        owner[next] = i
+                        queue.append(next)
+                        cells[i].append(next)
+                        continue
+                    j = find(j)
+                    if j != i:
+                        # 两个搜索相遇，属于同一个连通区域，合并到搜索 i 中
+                        parent[j] = i
+                        queue.extend(queues[j])
+                        cells[i].extend(cells[j])
+                        queues[j], cells[j] = None, None
+                        active.remove(j)
+
+    def isConnected(self, source_index, dest_index):
+        '''判断是否可以从 source 格子走到 dest 格子。source 格子上可以有生物，
+           从 source 格子走到相邻的格子；dest 格子必须可以移动到'''
+        if source_index == dest_index:
+            return True
+        label = self.label_list[dest_index]
+        if label < 0:
+            return False
+        if self.label_list[source_index] == label:
+            return True
+        for next in self.map.move_table[source_index]:
+            if self.label_list[next] == label:
+                return True
+        return False
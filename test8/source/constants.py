@@ -34,6 +34,43 @@ RED          = (255,   0,   0)
 GREEN        = (  0, 255,   0)
 GOLD         = (255, 215,   0)
 
+# 地图搜索结果缓存的最大数量
+SEARCH_CACHE_SIZE = 256
+# 是否记录路径搜索的统计信息
+SEARCH_STATS = False
+
+# 路径搜索算法类型
+# A* 算法
+SEARCH_ASTAR = 'astar'
+# 跳点搜索算法，只用于正方形地图
+SEARCH_JPS = 'jps'
+# 分层路径搜索算法，用于比较大的地图
+SEARCH_HPA = 'hpa'
+# 桶队列的 Dijkstra 算法，用于格子行走距离不同的地图
+SEARCH_DIAL = 'dial'
+# 双向广度优先搜索算法，用于每一步距离都是 1 的地图
+SEARCH_BIDIRECTIONAL = 'bidirectional'
+# 地图格子数量不超过这个值时，使用位棋盘计算行走范围
+BITBOARD_MAX_SIZE = 1024
+# 没有位棋盘时，行走范围的最大距离不小于这个值才使用 numpy 距离场计算，范围小时桶队列搜索更快
+FIELD_MIN_DISTANCE = 10
+# 多个生物协作规划路径时，每个生物最多搜索的步数
+COOPERATIVE_WINDOW = 16
+# 分层路径搜索时每个区块的长度
+CLUSTER_SIZE = 8
+# 关卡加载时是否计算静态地图的距离表
+BAKE_DISTANCE_TABLE = True
+# 距离表最多使用的内存字节数，地图太大时不计算距离表
+DISTANCE_TABLE_MAX_BYTES = 4 * 1024 * 1024
+
+# AStarSearch 使用的估计距离类型
+# 默认的估计距离，不考虑障碍物
+HEURISTIC_DEFAULT = 'default'
+# 路标估计距离，用于没有距离表的大地图
+HEURISTIC_LANDMARK = 'landmark'
+# 路标的数量
+LANDMARK_NUM = 8
+
 # 地图背景颜色类型
 BG_EMPTY = 0
 BG_ACTIVE = 1
@@ -46,10 +83,19 @@ MAP_EMPTY = 0 # 格子是空的
 MAP_STONE = 1 # 格子中是石头
 MAP_GRASS = 2 # 格子中是草地
 
+# 每种地图格子类型的默认行走距离，必须是整数，关卡配置文件中可以修改
+MAP_MOVE_COST = {MAP_EMPTY:1, MAP_STONE:1, MAP_GRASS:1}
+
 # 地图配置文件中的属性
 MAP_GRID = 'mapgrid'
 GROUP1 = 'group1'
 GROUP2 = 'group2'
+# 地图使用的估计距离类型，可以不设置
+MAP_HEURISTIC = 'heuristic'
+# 地图格子类型的行走距离，key 是格子类型，可以不设置
+MAP_MOVE_COST_KEY = 'movecost'
+# 地图使用的路径搜索算法类型，可以不设置
+MAP_PATH_SEARCH = 'search'
 
 SIZE_MULTIPLIER = 1.3
 
@@ -0,0 +1,108 @@
+'''整个地图的距离场，计算每个地图格子到最近的开始位置的行走距离。
+   安装了 numpy 并且每一步的距离都是 1 时，每次用数组运算把整个边界向相邻格子扩展一步，否则使用桶队列搜索'''
+from array import array
+from . import aStarSearch
+from . import searchStats
+
+try:
+    import numpy as np
+except ImportError:
+    # 没有安装 numpy 时，使用桶队列搜索计算距离场
+    np = None
+
+class DistanceField():
+    def __init__(self, map, source_list, cost_list):
+        self.map = map
+        # 开始格子的索引值列表
+        self.source_list = source_list
+        # cost_list 保存每个格子到最近的开始格子的行走距离，不能到达的格子值为 -1
+        self.cost_list = cost_list
+
+    def getCost(self, index):
+        '''返回格子到最近的开始格子的行走距离，不能到达时返回 None'''
+        cost = self.cost_list[index]
+        return cost if cost >= 0 else None
+
+
+def isVectorized(map):
+    '''判断是否使用 numpy 计算距离场：安装了 numpy，并且每一步的距离都是 1'''
+    return np is not None and map.uniform_cost
+
+def getDistanceField(map, sources, max_distance=None):
+    '''计算每个地图格子到 sources 中最近位置的行走距离，sources 是地图位置 (x, y) 的列表，
+       开始位置可以有生物，其他格子必须可以移动到。max_distance 不为 None 时，
+       只计算行走距离小于等于 max_distance 的格子。返回 DistanceField 对象'''
+    start_time = searchStats.getStartTime(map)
+    source_list = sorted(set(map.getCellIndex(x, y) for x, y in sources))
+    if isVectorized(map):
+        costs = searchField(map, source_list, max_distance)
+        cost_list = array('i', costs.astype(np.int32).tobytes())
+        if start_time is not None:
+            recordField(map, start_time, costs)
+    else:
+        cost_list = aStarSearch.searchBuckets(map, source_list, max_distance)[1]
+        if start_time is not None:
+            reached = map.size - cost_list.count(-1)
+            searchStats.recordSearch(map, start_time, 'field', reached, reached,
+                            searchStats.getLayerPeak(cost_list), max(cost_list))
+    return DistanceField(map, source_list, cost_list)
+
+def getReachableArea(map, source, max_distance):
+    '''和 aStarSearch.getReachableArea 一样，返回行走距离小于等于 max_distance 的所有格子，
+       每一步的距离都是 1，使用 numpy 距离场计算'''
+    start_time = searchStats.getStartTime(map)
+    source_index = map.getCellIndex(*source)
+    costs = searchField(map, [source_index], max_distance)
+    # 到达的格子按照行走距离从小到大排列
+    reached = np.flatnonzero(costs >= 0)
+    reached = reached[np.argsort(costs[reached], kind='stable')]
+    # 每个格子的父节点是相邻格子中行走距离小 1 的格子，开始位置没有父节点。
+    # padded 最后多一个元素对应相邻格子数组中不足的位置
+    neighbor_array = getNeighborArray(map)
+    padded = np.append(costs, -1)
+    reached_costs = costs[reached]
+    parents = np.full(map.size, -1, dtype=np.int32)
+    for column in reversed(range(neighbor_array.shape[1])):
+        neighbors = neighbor_array[reached, column]
+        match = (padded[neighbors] == reached_costs - 1) & (reached_costs > 0)
+        parents[reached[match]] = neighbors[match]
+    if start_time is not None:
+        recordField(map, start_time, costs)
+    return aStarSearch.SearchArea(map, source_index, reached.tolist(),
+                    array('i', costs.astype(np.int32).tobytes()), array('i', parents.tobytes()))
+
+def recordField(map, start_time, costs):
+    # 记录距离场的统计信息，每个到达的格子扩展一次，边界最多时是格子最多的一层，路径长度是最远的格子的距离
+    layers = np.bincount(costs[costs >= 0])
+    searchStats.recordSearch(map, start_time, 'field', int(layers.sum()), int(layers.sum()),
+                    int(layers.max()), len(layers) - 1)
+
+def getNeighborArray(map):
+    # 返回 numpy 相邻格子数组，第 index 行是 index 格子的相邻格子索引值，和地图的 move_table 一样，
+    # 相邻格子不足的位置值为 map.size。地图的相邻格子不会改变，第一次使用时创建并保存在地图中
+    if map.neighbor_array is None:
+        width = max(len(neighbors) for neighbors in map.move_table)
+        neighbor_array = np.full((map.size, width), map.size, dtype=np.intp)
+        for index, neighbors in enumerate(map.move_table):
+            neighbor_array[index, :len(neighbors)] = neighbors
+        map.neighbor_array = neighbor_array
+    return map.neighbor_array
+
+def searchField(map, source_list, max_distance=None):
+    # 从 source_list 中的格子开始，每次一起取出边界上所有格子的相邻格子，
+    # 去掉不能移动到和已经有距离的格子后作为新的边界。返回 numpy 距离数组，不能到达的格子值为 -1
+    neighbor_array = getNeighborArray(map)
+    # 两个数组最后多一个元素对应相邻格子数组中不足的位置，这个位置不能移动到
+    movable = np.zeros(map.size + 1, dtype=bool)
+    movable[:-1] = np.frombuffer(map.movable_map, dtype=np.uint8) != 0
+    costs = np.full(map.size + 1, -1, dtype=np.int32)
+    frontier = np.array(source_list, dtype=np.intp)
+    costs[frontier] = 0
+    distance = 0
+    while len(frontier) > 0 and (max_distance is None or distance < max_distance):
+        next = neighbor_array[frontier].ravel()
+        next = np.unique(next[movable[next] & (costs[next] < 0)])
+        distance += 1
+        costs[next] = distance
+        frontier = next
+    return costs[:-1]
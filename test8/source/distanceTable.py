@@ -0,0 +1,60 @@
+'''静态地图的距离表，保存格子之间只考虑石头不考虑生物的最短行走距离。
+   每一行在第一次用到时才计算，关卡加载时不需要对每个格子都搜索一次'''
+from array import array
+from . import constants as c
+
+class DistanceTable():
+    def __init__(self, map, typecode):
+        self.map = map
+        self.typecode = typecode
+        # 不能到达的两个格子之间的距离值是数组元素类型的最大值
+        self.unreachable = (1 << (8 * array(typecode).itemsize)) - 1
+        # row_list[index] 是 index 格子到每个格子的距离数组，还没有计算时为 None
+        self.row_list = [None] * map.size
+        # passable 保存格子是否有效并且不是石头
+        self.passable = bytearray(map.size)
+        for index in range(map.size):
+            x, y = map.getCellPos(index)
+            self.passable[index] = map.isValid(x, y) and map.grid_map[index] != c.MAP_STONE
+
+    def searchRow(self, source):
+        # 从 source 格子广度优先搜索，返回 source 到每个格子的距离数组
+        row = array(self.typecode, [self.unreachable]) * self.map.size
+        if not self.passable[source]:
+            return row
+        row[source] = 0
+        queue = [source]
+        head = 0
+        while head < len(queue):
+            index = queue[head]
+            head += 1
+            g_cost = row[index] + 1
+            for next in self.map.move_table[index]:
+                if self.passable[next] and row[next] == self.unreachable:
+                    row[next] = g_cost
+                    queue.append(next)
+        return row
+
+    def getDistance(self, index1, index2):
+        '''返回两个格子之间只考虑石头时的最短行走距离，不能到达时返回 None'''
+        # 格子之间的距离是对称的，估计距离时 index2 通常是固定的目标格子，所以按 index2 计算一行
+        row = self.row_list[index2]
+        if row is None:
+            row = self.row_list[index2] = self.searchRow(index2)
+        distance = row[index1]
+        if distance == self.unreachable:
+            return None
+        return distance
+
+def createDistanceTable(map, max_bytes=c.DISTANCE_TABLE_MAX_BYTES):
+    '''创建地图的距离表，所有行都计算后需要的内存超过 max_bytes 时返回 None'''
+    # 最大距离小于格子数量，格子少于 255 个时每个距离只需要 1 个字节
+    if map.size < 0xff:
+        typecode = 'B'
+    elif map.size < 0xffff:
+        typecode = 'H'
+    else:
+        return None
+    if map.size * map.size * array(typecode).itemsize > max_bytes:
+        return None
+    return DistanceTable(map, typecode)
@@ -1,7 +1,7 @@
 import pygame as pg
 from . import tool
 from . import constants as c
-from . import aStarSearch
+from . import incrementalSearch, aStarSearch, hexGeometry
 from . import map
 
 class FireBall():
@@ -122,8 +122,10 @@ class Entity():
         self.current_time = 0.0
         # 生物行走时的速度
         self.move_speed = 1
-        # 生物到目的位置的行走路径
-        self.walk_path = None
+        # 生物到目的位置的增量路径搜索对象，地图改变时修复行走路径
+        self.planner = None
+        # 生物行走时当前所在格子的索引值
+        self.walk_index = None
         
         # 是否是远程攻击
         self.remote_attack = False
@@ -144,17 +146,19 @@ class Entity():
     def getRectPos(self, map_x, map_y):
         '''返回在地图格子中显示生物图形的坐标'''
         if c.MAP_HEXAGON:
-            base_x, base_y = tool.getHexMapPos(map_x, map_y)
+            base_x, base_y = hexGeometry.getCellPixel(map_x, map_y)
             return (base_x + c.HEX_X_SIZE // 2, base_y + c.HEX_Y_SIZE // 2)
         else:
             return(map_x * c.REC_SIZE + c.REC_SIZE // 2, map_y * c.REC_SIZE + c.REC_SIZE // 2 + 3)
         
     def setDestination(self, map, map_x, map_y, enemy=None):
-        # 获取到目的位置的行走路径
+        # 使用地图设置的路径搜索算法和搜索结果缓存获取路径，目的位置和生物位置相同时不需要行走
         path = aStarSearch.getPath(map, (self.map_x, self.map_y), (map_x, map_y))
         if path is not None:
-            # 找到一条路径，保存路径和目的坐标
-            self.walk_path = path
+            # 找到一条路径，保存路径规划对象，地图改变时通知它修复路径
+            self.planner = incrementalSearch.PathPlanner(map, path, self)
+            self.walk_index = map.getCellIndex(self.map_x, self.map_y)
+            map.addPlanner(self.planner)
             # 设置目的位置坐标
             self.dest_x, self.dest_y = self.getRectPos(map_x, map_y)
             # 设置下一个格子的坐标为当前位置坐标
@@ -180,33 +184,31 @@ class Entity():
     def canRemoteAttack(self, map):
         if self.attr.remote:
             # 如果是远程生物，检查是否有敌方生物在可攻击的相邻格子
-            dir_list = tool.getAttackPositions(self.map_x, self.map_y)
-            for offset_x, offset_y in dir_list:
-                # 遍历生物所在地图格子的相邻八个格子
-                tmp_x, tmp_y = self.map_x + offset_x, self.map_y + offset_y                    
-                if map.isValid(tmp_x, tmp_y):
-                    entity = map.entity_map[tmp_y][tmp_x]
-                    if entity is not None and entity.group_id != self.group_id:
-                        # 如果有敌方生物在相邻格子，不能进行远程攻击
-                        return False
+            for index in map.attack_table[map.getCellIndex(self.map_x, self.map_y)]:
+                # 遍历生物所在地图格子的相邻可攻击格子
+                entity = map.entity_map[index]
+                if entity is not None and entity.group_id != self.group_id:
+                    # 如果有敌方生物在相邻格子，不能进行远程攻击
+                    return False
             return True
         return False
 
-    def getNextPosition(self):
-        # 获取下一个格子的坐标
-        if len(self.walk_path) > 0:
-            next = self.walk_path[0]
-            map_x, map_y = next.getPos()
-            self.walk_path.remove(next)        
-            return self.getRectPos(map_x, map_y)
+    def getNextPosition(self, map):
+        # 获取下一个格子的坐标，路径上的格子改变时路径搜索对象会重新计算下一个格子
+        next = self.planner.getNextStep(self.walk_index)
+        if next is not None:
+            self.walk_index = next
+            return self.getRectPos(*map.getCellPos(next))
         return None
  
-    def walkToDestination(self):
+    def walkToDestination(self, map):
         if self.rect.centerx == self.next_x and self.rect.centery == self.next_y:
             # 已经行走到下一个格子的坐标，继续获取再下一个格子的坐标
-            pos = self.getNextPosition()
+            pos = self.getNextPosition(map)
             if pos is None:
-                self.state = c.IDLE
+                # 到目的位置的路径被挡住了，停在当前格子，不再攻击敌方生物
+                self.dest_x, self.dest_y = self.next_x, self.next_y
+                self.enemy = None
             else:
                 # 保存路径中下一个格子的坐标
                 self.next_x, self.next_y = pos
@@ -280,14 +282,16 @@ class Entity():
     
             if self.rect.centerx != self.dest_x or self.rect.centery != self.dest_y:
                 # 如果还没走到目的坐标，继续行走
-                self.walkToDestination()
+                self.walkToDestination(map)
             else:
-                # 已经走到目的坐标，生物的地图位置已经改变，更新地图中生物所在的位置
+                # 已经走到目的坐标，删除路径搜索对象
+                map.removePlanner(self.planner)
+                self.planner = None
+                self.walk_index = None
+                # 生物的地图位置已经改变，更新地图中生物所在的位置
                 map.setEntity(self.map_x, self.map_y, None)
                 self.map_x, self.map_y = map.getMapIndex(self.dest_x, self.dest_y)
                 map.setEntity(self.map_x, self.map_y, self)
-                # 设置行走路径为 None
-                self.walk_path = None
                 if self.enemy is None:
                     # 设置生物状态为空闲状态
                     self.state = c.IDLE
@@ -400,6 +404,17 @@ class EntityGroup():
         # 每次生物行动结束后调用，索引值指向下一个将要行动的生物
         self.entity_index += 1
 
+    def planPaths(self, map, destinations, window=c.COOPERATIVE_WINDOW):
+        '''同一轮中多个生物一起规划行走路径，destinations 是 {生物: 目的地图位置} 字典。
+           按照生物组的行动顺序依次搜索，先规划的生物预约经过的格子和时间，后规划的生物避开它们。
+           返回 {生物: 路径对象} 字典，找不到路径的生物值为 None'''
+        entity_list = [entity for entity in self.group if entity in destinations]
+        table = aStarSearch.ReservationTable(map, entity_list)
+        paths = {}
+        for entity in entity_list:
+            paths[entity] = table.planPath(entity, destinations[entity], window)
+        return paths
+
     def update(self, current_time, level):
         # 调用本生物组中所有生物的更新函数
         for entity in self.group:
@@ -0,0 +1,100 @@
+'''AI 行动使用的流场，从敌方生物相邻的目的格子反向计算每个地图格子的行走距离，
+   生物沿着距离变小的方向走到最近的目的格子。同一组目的格子的流场由地图缓存，生物位置改变后重新计算'''
+from array import array
+from . import aStarSearch
+from . import distanceField
+from . import searchStats
+
+class FlowField():
+    def __init__(self, map, goals):
+        # goals 是目的格子索引值的列表，目的格子必须可以移动到
+        self.map = map
+        self.goals = goals
+        # cost_list 保存每个格子到最近目的格子的行走距离，不能到达的格子值为 -1。
+        # 每一步的距离都是 1 时正向和反向的距离一样，直接使用距离场
+        if map.uniform_cost:
+            self.cost_list = distanceField.getDistanceField(map, [map.getCellPos(index) for index in goals]).cost_list
+        else:
+            self.cost_list = searchReverseCost(map, goals)
+
+    def getDistance(self, index):
+        '''返回从 index 格子走到最近目的格子的距离，index 格子上可以有生物，不能到达时返回 None'''
+        cost = self.cost_list[index]
+        if cost >= 0:
+            return cost
+        # 有生物的格子不在流场中，从相邻格子计算距离，走到相邻格子的行走距离是 cost_map 中的值
+        distance = None
+        cost_map = self.map.cost_map
+        for next in self.map.move_table[index]:
+            cost = self.cost_list[next]
+            if cost >= 0 and (distance is None or cost + cost_map[next] < distance):
+                distance = cost + cost_map[next]
+        return distance
+
+    def getNextStep(self, index):
+        '''返回从 index 格子向目的格子走一步的相邻格子，index 是目的格子或者不能到达时返回 None'''
+        distance = self.getDistance(index)
+        if distance is None or distance == 0:
+            return None
+        cost_map = self.map.cost_map
+        for next in self.map.move_table[index]:
+            if self.cost_list[next] >= 0 and self.cost_list[next] + cost_map[next] == distance:
+                return next
+        return None
+
+    def getPath(self, source):
+        '''沿着流场从 source 位置走到最近的目的格子，返回路径对象，不能到达时返回 None'''
+        index = self.map.getCellIndex(*source)
+        total = self.getDistance(index)
+        if total is None:
+            return None
+        index_list = array('i')
+        while index is not None:
+            index_list.append(index)
+            index = self.getNextStep(index)
+        if self.map.uniform_cost:
+            return aStarSearch.Path(self.map, index_list)
+        # 格子的行走距离不同时，保存从 source 位置走到每个格子的累计行走距离，
+        # 开始格子上可能有生物，不在流场中
+        cost_list = [0] + [total - self.cost_list[index] for index in index_list[1:]]
+        return aStarSearch.Path(self.map, index_list, 0, cost_list)
+
+
+def searchReverseCost(map, goals):
+    # 格子的行走距离不同时，从多个目的格子反向进行桶队列的 Dijkstra 搜索，
+    # 从格子走到相邻格子 next 的行走距离是 cost_map[next]，返回一维距离数组
+    start_time = searchStats.getStartTime(map)
+    move_table = map.move_table
+    movable_map = map.movable_map
+    cost_map = map.cost_map
+    cost_list = array('i', [-1]) * map.size
+    bucket_num = map.max_move_cost + 1
+    buckets = [[] for _ in range(bucket_num)]
+    for index in goals:
+        if cost_list[index] < 0:
+            cost_list[index] = 0
+            buckets[0].append(index)
+    pending = len(buckets[0])
+    popped = 0
+    g_cost = 0
+    while pending > 0:
+        bucket = buckets[g_cost % bucket_num]
+        buckets[g_cost % bucket_num] = []
+        pending -= len(bucket)
+        popped += len(bucket)
+        for index in bucket:
+            if cost_list[index] != g_cost:
+                # 跳过已经找到更短距离的过期记录
+                continue
+            # 相邻格子走到 index 格子的行走距离都是 cost_map[index]
+            next_g = g_cost + cost_map[index]
+            for next in move_table[index]:
+                if movable_map[next] and (cost_list[next] < 0 or next_g < cost_list[next]):
+                    cost_list[next] = next_g
+                    buckets[next_g % bucket_num].append(next)
+                    pending += 1
+        g_cost += 1
+    if start_time is not None:
+        searchStats.recordSearch(map, start_time, 'flow', popped, popped,
+                        searchStats.getLayerPeak(cost_list), max(cost_list, default=-1))
+    return cost_list
@@ -1,11 +1,11 @@
 from . import map
-from . import tool, aStarSearch
+from . import aStarSearch
 
 class EnemyInfo():
     def __init__(self, entity, enemy, location, distance, damage_half):
         # 保存敌方生物
         self.enemy = enemy
-        # 保存目的位置
+        # 保存到目的位置的路径对象
         self.location = location
         # 保存到目的位置的路径距离
         self.distance = distance
@@ -21,27 +21,52 @@ class EnemyInfo():
         self.remote = enemy.attr.remote
          
 def getAction(entity, map, enemy_group):
-    def getDestination(entity, map, enemy):
-        # 获取敌方生物相邻的可攻击地图位置中和行动生物距离最近的地图位置
-        dir_list = tool.getAttackPositions(enemy.map_x, enemy.map_y)
-        best_pos = None
-        min_dis = 0
-        for offset_x, offset_y in dir_list:
-            x, y = enemy.map_x + offset_x, enemy.map_y + offset_y
-            if map.isValid(x, y) and map.isMovable(x, y):
-                # 这个相邻地图位置是有效且可移动，获取和行动生物的路径距离
-                distance = aStarSearch.getAStarDistance(map, (entity.map_x, entity.map_y), (x, y))
-                if distance is None:
-                    # distance 为 None，表示这个相邻位置不可到达
+    def getDestinations(entity, map, enemy_list):
+        # 获取每个敌方生物相邻的可攻击地图位置中和行动生物距离最近的地图位置，返回 {敌方生物: 路径对象}，
+        # 不能到达或者不用考虑的敌方生物不在字典中
+        goal_groups = []
+        for enemy in enemy_list:
+            goals = []
+            for index in map.attack_table[map.getCellIndex(enemy.map_x, enemy.map_y)]:
+                if map.movable_map[index]:
+                    # 这个相邻地图位置是有效且可移动的，作为搜索的目的位置
+                    goals.append(index)
+            goal_groups.append(goals)
+        entity_index = map.getCellIndex(entity.map_x, entity.map_y)
+        source = (entity.map_x, entity.map_y)
+        # 所有敌方生物的相邻地图位置共用一个流场，生物位置没有改变时，不同的行动生物使用缓存中的流场
+        field = map.getFlowField([index for goals in goal_groups for index in goals])
+        distance = field.getDistance(entity_index)
+        if distance is None:
+            # 不能走到任何一个敌方生物的相邻地图位置
+            return {}
+        if distance > entity.attr.distance:
+            # 本轮行动攻击不到任何敌方生物，最佳的是距离最近的敌方生物，沿着流场获取路径
+            path = field.getPath(source)
+            dest = path.index_list[-1]
+            for enemy, goals in zip(enemy_list, goal_groups):
+                if dest in goals:
+                    return {enemy: path}
+
+        # 本轮行动可以攻击到的敌方生物需要比较其他属性，从行动生物的位置搜索一次，只搜索本轮可以走到的格子，
+        # 不能走到任何一个相邻地图位置的敌方生物不用搜索
+        goal_groups = [[index for index in goals if map.isConnected(entity_index, index)]
+                        for goals in goal_groups]
+        paths = aStarSearch.getGoalEntries(map, source, goal_groups, entity.attr.distance)
+
+        destinations = {}
+        for enemy, goals in zip(enemy_list, goal_groups):
+            best_path = None
+            for index in goals:
+                path = paths.get(index)
+                if path is None:
+                    # 这个相邻位置不可到达，或者比最近的位置远
                     continue
-                if best_pos is None:
-                    best_pos = (x, y)
-                    min_dis =  distance
-                elif distance < min_dis:
+                if best_path is None or path.getCost() < best_path.getCost():
                     # 保存路径距离最近的相邻地图位置
-                    best_pos = (x, y)
-                    min_dis =  distance
-        return best_pos
+                    best_path = path
+            destinations[enemy] = best_path
+        return destinations
     
     # 创建敌方生物信息列表
     info_list = []
@@ -49,6 +74,11 @@ def getAction(entity, map, enemy_group):
     best_info = None
     # 行动生物是否可以进行远程攻击
     remote_attack = entity.canRemoteAttack(map)
+
+    if not remote_attack:
+        # 找到不相邻的敌方生物的相邻地图格子中和行动生物距离最近的格子位置
+        enemy_list = [enemy for enemy in enemy_group if not map.isNextToEntity(entity, enemy)]
+        destinations = getDestinations(entity, map, enemy_list)
     
     # 遍历敌方生物组中每一个生物，检查生物的地图位置
     for enemy in enemy_group:
@@ -56,20 +86,19 @@ def getAction(entity, map, enemy_group):
             location = None
             distance = 0
         else:
-            if tool.isNextToEntity(entity, enemy):
+            if map.isNextToEntity(entity, enemy):
                 # 如果敌方生物在相邻的地图格子，不用移动就可以攻击到
-                destination = (entity.map_x, entity.map_y)       
+                location = aStarSearch.Path(map, [map.getCellIndex(entity.map_x, entity.map_y)])
             else:
-                # 否则找到敌方生物的相邻地图格子中和行动生物距离最近的格子位置
-                destination = getDestination(entity, map, enemy)
+                # 路径对象 location 的终点是离行动生物最近的相邻地图格子
+                location = destinations.get(enemy)
             
-            if destination is None:
+            if location is None:
                 # 表示不能行走到这个敌方生物的相邻可攻击的地图位置
                 continue
 
-            # 获取路径对象 location 和路径距离 distance
-            location = aStarSearch.AStarSearch(map, (entity.map_x, entity.map_y), destination)
-            _, _, distance = aStarSearch.getFirstStepAndDistance(location)
+            # 获取路径的累计行走距离 distance
+            distance = location.getCost()
         
         # 判断基础伤害是否要减半
         if entity.attr.remote and not remote_attack:
@@ -117,16 +146,19 @@ def getAction(entity, map, enemy_group):
         if best_info.location is None:
             # 目的位置为 None, 表示行动生物进行远程攻击
             return (None, best_info.enemy)
-        else:
-            # 目的位置不为 None, 表示行动生物进行近战攻击
-            return ((best_info.location.x, best_info.location.y), best_info.enemy)
-    elif best_info.round_num == 1:
-        # 下一轮行动可以攻击到，本轮行走的距离，正好使下一轮能攻击到敌方生物
-        distance = entity.attr.distance
-        x, y = aStarSearch.getPosByDistance(best_info.location, distance)
-        return ((x, y), None)
+        # 目的位置不为 None, 表示行动生物进行近战攻击
+        path, enemy = best_info.location, best_info.enemy
     else:
-        # 至少二轮行动才能攻击到敌方生物时，本轮行走最大的距离
-        distance = best_info.distance - entity.attr.distance
-        x, y = aStarSearch.getPosByDistance(best_info.location, distance)
-        return ((x, y), None)
+        if best_info.round_num == 1:
+            # 下一轮行动可以攻击到，本轮行走的距离，正好使下一轮能攻击到敌方生物
+            distance = entity.attr.distance
+        else:
+            # 至少二轮行动才能攻击到敌方生物时，本轮行走最大的距离
+            distance = best_info.distance - entity.attr.distance
+        # 从路径的目的位置往回退 distance 的行走距离
+        location = best_info.location
+        path = location.cutByCost(location.getCost() - distance)
+        enemy = None
+    # 选择的路径保存到地图的搜索结果缓存中，生物行走到目的位置时不用再搜索
+    aStarSearch.addPath(map, path)
+    return (path.getDest(), enemy)
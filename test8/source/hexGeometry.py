@@ -0,0 +1,114 @@
+'''六边形地图的几何计算，使用立方体坐标 (q, r, s) 和轴向坐标 (q, r)，q + r + s = 0。
+   地图位置 (x, y) 是偏移坐标，奇数行向右偏移半个格子，y 就是 r。
+   坐标转换只使用整数加减和位运算，参数可以是整数，也可以是 numpy 整数数组'''
+from . import constants as c
+
+# 六个相邻格子的轴向坐标偏移：左，左上，右上，右，左下，右下
+AXIAL_DIRECTIONS = ((-1, 0), (0, -1), (1, -1), (1, 0), (-1, 1), (0, 1))
+
+def offsetToAxial(x, y):
+    '''偏移坐标转换成轴向坐标 (q, r)'''
+    return (x - ((y - (y & 1)) >> 1), y)
+
+def axialToOffset(q, r):
+    '''轴向坐标转换成偏移坐标 (x, y)'''
+    return (q + ((r - (r & 1)) >> 1), r)
+
+def offsetToCube(x, y):
+    '''偏移坐标转换成立方体坐标 (q, r, s)'''
+    q, r = offsetToAxial(x, y)
+    return (q, r, -q - r)
+
+def cubeToOffset(q, r, s):
+    '''立方体坐标转换成偏移坐标 (x, y)，s 由 q 和 r 决定'''
+    return axialToOffset(q, r)
+
+def getAxialDistance(dis_q, dis_r):
+    '''两个格子轴向坐标的差值是 (dis_q, dis_r) 时的六边形距离'''
+    return (abs(dis_q) + abs(dis_r) + abs(dis_q + dis_r)) >> 1
+
+def getDistance(x1, y1, x2, y2):
+    '''不考虑障碍物时两个格子之间的最少步数，是准确的六边形距离'''
+    q1, r1 = offsetToAxial(x1, y1)
+    q2, r2 = offsetToAxial(x2, y2)
+    return getAxialDistance(q1 - q2, r1 - r2)
+
+def getOffsetDirections(parity):
+    # 返回偶数行或者奇数行的六个相邻格子的偏移坐标差值，顺序和 AXIAL_DIRECTIONS 一样
+    q, r = offsetToAxial(0, parity)
+    return tuple((axialToOffset(q + dq, r + dr)[0], dr) for dq, dr in AXIAL_DIRECTIONS)
+
+# 偶数行和奇数行的相邻格子偏移坐标差值，用 OFFSET_DIRECTIONS[y & 1] 获取
+OFFSET_DIRECTIONS = (getOffsetDirections(0), getOffsetDirections(1))
+
+def getNeighbors(x, y):
+    '''返回六个相邻格子的地图位置列表，不判断位置是否有效'''
+    return [(x + dx, y + dy) for dx, dy in OFFSET_DIRECTIONS[y & 1]]
+
+def getRing(x, y, radius):
+    '''返回和格子距离正好是 radius 的所有格子位置，radius 为 0 时只有格子自己，不判断位置是否有效'''
+    if radius == 0:
+        return [(x, y)]
+    q, r = offsetToAxial(x, y)
+    # 从左下方向 radius 步的格子开始，沿着六个方向各走 radius 步
+    dq, dr = AXIAL_DIRECTIONS[4]
+    q, r = q + dq * radius, r + dr * radius
+    ring = []
+    for direction in (3, 2, 1, 0, 4, 5):
+        dq, dr = AXIAL_DIRECTIONS[direction]
+        for _ in range(radius):
+            ring.append(axialToOffset(q, r))
+            q, r = q + dq, r + dr
+    return ring
+
+def getDisc(x, y, radius):
+    '''返回和格子距离小于等于 radius 的所有格子位置，按照距离从小到大排列，不判断位置是否有效'''
+    disc = []
+    for i in range(radius + 1):
+        disc.extend(getRing(x, y, i))
+    return disc
+
+def cubeRound(q, r):
+    '''把小数的轴向坐标转换成所在格子的轴向坐标'''
+    s = -q - r
+    round_q, round_r, round_s = round(q), round(r), round(s)
+    dis_q, dis_r, dis_s = abs(round_q - q), abs(round_r - r), abs(round_s - s)
+    # 误差最大的坐标由另外两个坐标计算，保证 q + r + s = 0
+    if dis_q > dis_r and dis_q > dis_s:
+        round_q = -round_r - round_s
+    elif dis_r > dis_s:
+        round_r = -round_q - round_s
+    return (round_q, round_r)
+
+def getLine(x1, y1, x2, y2):
+    '''返回从格子 (x1, y1) 到格子 (x2, y2) 的直线经过的格子位置列表，包含两端的格子'''
+    q1, r1 = offsetToAxial(x1, y1)
+    q2, r2 = offsetToAxial(x2, y2)
+    distance = getAxialDistance(q1 - q2, r1 - r2)
+    if distance == 0:
+        return [(x1, y1)]
+    # 起点加上一个很小的偏移，避免直线正好经过两个格子的边界
+    q1, r1 = q1 + 1e-6, r1 + 2e-6
+    line = []
+    for i in range(distance + 1):
+        t = i / distance
+        q, r = cubeRound(q1 + (q2 - q1) * t, r1 + (r2 - r1) * t)
+        line.append(axialToOffset(q, r))
+    return line
+
+def getCellPixel(x, y):
+    '''返回地图格子外接矩形左上角的坐标值'''
+    X_LEN = c.HEX_X_SIZE // 2
+    Y_LEN = c.HEX_Y_SIZE // 2
+    odd = y & 1
+    return (X_LEN * (2 * x + odd), Y_LEN * 3 * (y >> 1) + odd * (Y_LEN + Y_LEN // 2))
+
+def getPixelCell(x, y):
+    '''根据坐标返回所在六边形格子的地图位置'''
+    # 以半个格子宽度和四分之一格子高度为单位时，轴向坐标 (q, r) 的格子中心是 (2q + r + 1, 3r + 2)，
+    # 六个顶点和中心的距离都是 (0, ±2) 或者 (±1, ±1)，反过来计算小数的轴向坐标后取整
+    u = x / (c.HEX_X_SIZE // 2)
+    v = y / (c.HEX_Y_SIZE // 4)
+    r = (v - 2) / 3
+    q = (u - 1 - r) / 2
+    return axialToOffset(*cubeRound(q, r))
@@ -0,0 +1,283 @@
+'''分层路径搜索（HPA*），把地图分成多个区块，先在区块入口组成的抽象图上搜索，再在区块内细化成每一步的路径'''
+import heapq
+from collections import deque
+from . import constants as c
+from . import aStarSearch
+from . import searchStats
+
+class ClusterGraph():
+    def __init__(self, map, cluster_size=c.CLUSTER_SIZE):
+        self.map = map
+        self.cluster_size = cluster_size
+        # 每一行和每一列的区块数量
+        self.cluster_x_num = (map.width + cluster_size - 1) // cluster_size
+        self.cluster_y_num = (map.height + cluster_size - 1) // cluster_size
+        # cluster_map 保存每个地图格子所在的区块 id，cluster_cells 保存每个区块的格子列表
+        self.cluster_map = [0] * map.size
+        self.cluster_cells = [[] for _ in range(self.cluster_x_num * self.cluster_y_num)]
+        for index in range(map.size):
+            x, y = map.getCellPos(index)
+            cluster = (y // cluster_size) * self.cluster_x_num + x // cluster_size
+            self.cluster_map[index] = cluster
+            self.cluster_cells[cluster].append(index)
+        # neighbor_clusters 保存每个区块的相邻区块集合，
+        # border_pairs 的 key 是两个相邻区块 id (小的 id, 大的 id)，value 是两个区块之间相邻的格子对列表
+        self.neighbor_clusters = [set() for _ in self.cluster_cells]
+        self.border_pairs = {}
+        for index in range(map.size):
+            cluster = self.cluster_map[index]
+            for next in map.move_table[index]:
+                if self.cluster_map[next] != cluster:
+                    self.neighbor_clusters[cluster].add(self.cluster_map[next])
+                    if cluster < self.cluster_map[next]:
+                        self.border_pairs.setdefault((cluster, self.cluster_map[next]), []).append((index, next))
+        # border_dict 的 key 是两个相邻区块 id (小的 id, 大的 id)，value 是入口的格子对列表
+        self.border_dict = {}
+        # cluster_nodes 保存每个区块中作为入口的格子集合
+        self.cluster_nodes = [set() for _ in self.cluster_cells]
+        # edge_dict 的 key 是入口格子，value 是 {相邻入口格子: 距离} 字典
+        self.edge_dict = {}
+        # 需要重新创建的区块集合
+        self.dirty_clusters = set(range(len(self.cluster_cells)))
+        self.rebuild()
+
+    def setDirty(self, index):
+        '''地图格子的类型或生物改变时调用，格子所在的区块在下次搜索前重新创建'''
+        self.dirty_clusters.add(self.cluster_map[index])
+
+    def rebuild(self):
+        '''重新创建改变了的区块的入口和边。改变了的区块重新计算所有的边，
+           相邻的区块只更新和改变了的区块之间的入口，其它入口之间的边保持不变'''
+        if len(self.dirty_clusters) == 0:
+            return
+        dirty = set(self.dirty_clusters)
+        self.dirty_clusters.clear()
+        # 重新计算改变了的区块和相邻区块之间的入口
+        key_set = set()
+        for cluster in dirty:
+            for neighbor in self.neighbor_clusters[cluster]:
+                key_set.add((min(cluster, neighbor), max(cluster, neighbor)))
+        for key in key_set:
+            self.border_dict[key] = self.findEntrances(*key)
+
+        affected = set(dirty)
+        for cluster in dirty:
+            affected.update(self.neighbor_clusters[cluster])
+        for cluster in affected:
+            nodes = self.getClusterNodes(cluster)
+            old_nodes = self.cluster_nodes[cluster]
+            self.cluster_nodes[cluster] = nodes
+            if cluster in dirty:
+                # 区块内的格子改变了，重新计算所有入口之间的边
+                for node in old_nodes:
+                    self.edge_dict.pop(node, None)
+                for node in nodes:
+                    self.edge_dict[node] = {}
+                for node in nodes:
+                    self.addClusterEdges(cluster, node)
+            else:
+                # 区块内的格子没有改变，只删除不再是入口的格子，添加新的入口格子的边
+                for node in old_nodes - nodes:
+                    self.edge_dict.pop(node, None)
+                    for other in nodes & old_nodes:
+                        self.edge_dict[other].pop(node, None)
+                added = nodes - old_nodes
+                for node in added:
+                    self.edge_dict[node] = {}
+                for node in added:
+                    self.addClusterEdges(cluster, node)
+
+        for cluster1, cluster2 in key_set:
+            # 删除两个区块入口之间原来的边，再添加新的入口之间的边，距离是 1
+            for cluster, other_cluster in ((cluster1, cluster2), (cluster2, cluster1)):
+                for node in self.cluster_nodes[cluster]:
+                    edges = self.edge_dict[node]
+                    for other in [other for other in edges if self.cluster_map[other] == other_cluster]:
+                        del edges[other]
+            for index1, index2 in self.border_dict[(cluster1, cluster2)]:
+                self.edge_dict[index1][index2] = 1
+                self.edge_dict[index2][index1] = 1
+
+    def getClusterNodes(self, cluster):
+        # 返回区块和所有相邻区块之间的入口中，在这个区块中的格子集合
+        nodes = set()
+        for neighbor in self.neighbor_clusters[cluster]:
+            for index1, index2 in self.border_dict[(min(cluster, neighbor), max(cluster, neighbor))]:
+                nodes.add(index1 if self.cluster_map[index1] == cluster else index2)
+        return nodes
+
+    def addClusterEdges(self, cluster, node):
+        # 在区块内部从入口格子 node 搜索，添加 node 和区块中其它入口之间两个方向的边
+        distances = self.searchCluster(cluster, node)
+        for other in self.cluster_nodes[cluster]:
+            if other != node and other in distances:
+                self.edge_dict[node][other] = distances[other]
+                self.edge_dict[other][node] = distances[other]
+
+    def findEntrances(self, cluster1, cluster2):
+        # 沿着两个相邻区块的边界找到所有可以通过的格子对，两边的格子都连在一起的格子对作为一个入口，
+        # 每个入口选择中间的格子对
+        movable_map = self.map.movable_map
+        move_table = self.map.move_table
+        pair_list = [(index1, index2) for index1, index2 in self.border_pairs[(cluster1, cluster2)]
+                     if movable_map[index1] and movable_map[index2]]
+        # pair_dict 的 key 是 cluster1 中的格子，value 是这个格子所在的格子对的位置列表
+        pair_dict = {}
+        for i, (index1, _) in enumerate(pair_list):
+            pair_dict.setdefault(index1, []).append(i)
+
+        def isConnected(index1, index2):
+            # 判断两个格子是同一个格子或者相邻
+            return index1 == index2 or index2 in move_table[index1]
+
+        entrances = []
+        visited = [False] * len(pair_list)
+        for i in range(len(pair_list)):
+            if visited[i]:
+                continue
+            # 找到和这个格子对连在一起的所有格子对，只需要检查 cluster1 中的格子相同或者相邻的格子对
+            run = []
+            queue = deque([i])
+            visited[i] = True
+            while len(queue) > 0:
+                j = queue.popleft()
+                index1, index2 = pair_list[j]
+                run.append(pair_list[j])
+                for next in (index1,) + tuple(move_table[index1]):
+                    for k in pair_dict.get(next, ()):
+                        if not visited[k] and isConnected(index2, pair_list[k][1]):
+                            visited[k] = True
+                            queue.append(k)
+            run.sort()
+            entrances.append(run[len(run) // 2])
+        return entrances
+
+    def searchCluster(self, cluster, start, goal=None):
+        # 在区块内部从 start 格子开始广度优先搜索，start 格子可以有生物。
+        # goal 为 None 时返回 {格子: 距离} 字典，否则返回到 goal 的格子列表，找不到时返回 None
+        movable_map = self.map.movable_map
+        parent_dict = {start: -1}
+        distances = {start: 0}
+        queue = deque([start])
+        while len(queue) > 0:
+            index = queue.popleft()
+            if index == goal:
+                path = []
+                while index != -1:
+                    path.append(index)
+                    index = parent_dict[index]
+                return path[::-1]
+            for next in self.map.move_table[index]:
+                if (next in distances or not movable_map[next] or
+                    self.cluster_map[next] != cluster):
+                    continue
+                distances[next] = distances[index] + 1
+                parent_dict[next] = index
+                queue.append(next)
+        if goal is not None:
+            return None
+        return distances
+
+    def searchAbstract(self, source, dest, record=False):
+        # 在抽象图上搜索，source 和 dest 作为临时节点连接到所在区块的入口，
+        # 返回经过的节点列表，找不到时为 None，以及扩展的节点数量，加入最小堆的记录数量和最小堆的最大长度，
+        # record 为 False 时不计数
+        map = self.map
+        source_cluster = self.cluster_map[source]
+        dest_cluster = self.cluster_map[dest]
+        source_edges = {}
+        # source 格子上有生物，不会是区块的入口，所以也要从 source 直接进入相邻的区块
+        cluster_set = set(self.cluster_map[next] for next in map.move_table[source])
+        cluster_set.add(source_cluster)
+        for cluster in cluster_set:
+            distances = self.searchCluster(cluster, source)
+            node_list = list(self.cluster_nodes[cluster])
+            if cluster == dest_cluster:
+                node_list.append(dest)
+            for node in node_list:
+                if node in distances and distances[node] < source_edges.get(node, distances[node] + 1):
+                    source_edges[node] = distances[node]
+        # 到 dest 的边，在 dest 所在区块中从 dest 反向搜索
+        dest_edges = {}
+        distances = self.searchCluster(dest_cluster, dest)
+        for node in self.cluster_nodes[dest_cluster]:
+            if node in distances:
+                dest_edges[node] = distances[node]
+
+        g_dict = {source: 0}
+        parent_dict = {source: None}
+        open_heap = [(0, 0, source)]
+        closed = set()
+        expanded, pushed, peak_open = 0, 1, 1
+        while len(open_heap) > 0:
+            if record and len(open_heap) > peak_open:
+                peak_open = len(open_heap)
+            _, g_cost, node = heapq.heappop(open_heap)
+            if node in closed:
+                continue
+            if node == dest:
+                node_list = []
+                while node is not None:
+                    node_list.append(node)
+                    node = parent_dict[node]
+                return node_list[::-1], expanded, pushed, peak_open
+            closed.add(node)
+            if record:
+                expanded += 1
+            edges = source_edges if node == source else self.edge_dict.get(node, {})
+            edge_list = list(edges.items())
+            if node in dest_edges:
+                edge_list.append((dest, dest_edges[node]))
+            for next, cost in edge_list:
+                next_g = g_cost + cost
+                if next in closed or next_g >= g_dict.get(next, next_g + 1):
+                    continue
+                g_dict[next] = next_g
+                parent_dict[next] = node
+                lower_distance = map.calLowerDistance(next, dest)
+                if lower_distance is None:
+                    continue
+                heapq.heappush(open_heap, (next_g + lower_distance, next_g, next))
+                if record:
+                    pushed += 1
+        return None, expanded, pushed, peak_open
+
+    def refinePath(self, node_list):
+        # 把抽象图上的节点列表细化成每一步的格子列表
+        path = [node_list[0]]
+        for node, next in zip(node_list, node_list[1:]):
+            if next in self.map.move_table[node] and self.cluster_map[node] != self.cluster_map[next]:
+                # 相邻区块入口之间只有一步
+                path.append(next)
+            else:
+                # 同一个区块中的两个节点，在区块内部搜索路径
+                cluster = self.cluster_map[next]
+                path.extend(self.searchCluster(cluster, node, next)[1:])
+        return path
+
+
+def HierarchicalSearch(map, source, dest, counter=None):
+    '''搜索 source 位置到 dest 位置的路径，返回和 AStarSearch 一样的路径节点链表，
+       链表中包含路径上的每一个格子，找不到路径时返回 None。
+       路径的长度接近但不一定是最短的。counter 不为 None 时，保存抽象图搜索扩展的节点数量等统计信息'''
+    start_time = searchStats.getStartTime(map)
+    record = start_time is not None or counter is not None
+    graph = map.getClusterGraph()
+    graph.rebuild()
+    source_index = map.getCellIndex(*source)
+    dest_index = map.getCellIndex(*dest)
+    if source_index == dest_index:
+        return aStarSearch.SearchEntry(source[0], source[1], 0, 0)
+    if not map.movable_map[dest_index]:
+        return None
+
+    node_list, expanded, pushed, peak_open = graph.searchAbstract(source_index, dest_index, record)
+    if node_list is None:
+        searchStats.recordSearch(map, start_time, 'hpa', expanded, pushed, peak_open, None, counter)
+        return None
+    location = None
+    for g_cost, index in enumerate(graph.refinePath(node_list)):
+        x, y = map.getCellPos(index)
+        location = aStarSearch.SearchEntry(x, y, g_cost, g_cost, location)
+    searchStats.recordSearch(map, start_time, 'hpa', expanded, pushed, peak_open, location.g_cost, counter)
+    return location
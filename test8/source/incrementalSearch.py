@@ -0,0 +1,195 @@
+'''增量路径搜索（D* Lite），生物行走时地图改变后修复已有的搜索结果，不用重新搜索整个路径'''
+import heapq
+from array import array
+from . import searchStats
+
+# 不能到达的格子的距离值
+INFINITE = 1 << 30
+
+class DStarLite():
+    def __init__(self, map, source, dest, entity=None):
+        # 从 dest 位置反向搜索到 source 位置，生物行走时 source 位置会改变，已有的搜索结果仍然有效
+        self.map = map
+        # entity 是行走的生物，生物所在的格子也可以经过
+        self.entity = entity
+        self.start = map.getCellIndex(*source)
+        self.goal = map.getCellIndex(*dest)
+        # 上一次修复搜索结果时的开始位置，km 是开始位置移动后累加的启发距离
+        self.last = self.start
+        self.km = 0
+        # g_list 是格子到 dest 的距离，rhs_list 是根据相邻格子计算出的距离
+        self.g_list = array('i', [INFINITE]) * map.size
+        self.rhs_list = array('i', [INFINITE]) * map.size
+        # 格子在 open 列表中的 key 值，in_open 为 1 表示格子在 open 列表中
+        self.key1_list = array('i', [0]) * map.size
+        self.key2_list = array('i', [0]) * map.size
+        self.in_open = bytearray(map.size)
+        self.open_heap = []
+        # 上次修复后改变了的格子集合
+        self.changed_set = set()
+
+        self.rhs_list[self.goal] = 0
+        self.insertOpen(self.goal)
+        self.computeShortestPath()
+
+    def setDirty(self, index):
+        '''地图格子的类型或生物改变时调用，在下次获取下一步时修复搜索结果'''
+        self.changed_set.add(index)
+
+    def isPassable(self, index):
+        # 判断格子是否可以移动到，行走的生物自己所在的格子也可以移动到
+        return self.map.movable_map[index] == 1 or (self.entity is not None and
+                self.map.entity_map[index] is self.entity)
+
+    def calHeuristic(self, index):
+        # 格子到开始位置的启发距离
+        return self.map.calIndexDistance(self.start, index)
+
+    def insertOpen(self, index):
+        # 计算格子的 key 值，添加或更新格子在 open 列表中的记录
+        g_cost = min(self.g_list[index], self.rhs_list[index])
+        key1, key2 = g_cost + self.calHeuristic(index) + self.km, g_cost
+        self.key1_list[index] = key1
+        self.key2_list[index] = key2
+        self.in_open[index] = 1
+        heapq.heappush(self.open_heap, (key1, key2, index))
+
+    def calRhs(self, index):
+        # 根据相邻格子的距离计算格子到 dest 的距离
+        rhs = INFINITE
+        g_list, cost_map = self.g_list, self.map.cost_map
+        for next in self.map.move_table[index]:
+            # 移动到相邻格子的行走距离是相邻格子类型的行走距离
+            if g_list[next] + cost_map[next] < rhs and self.isPassable(next):
+                rhs = g_list[next] + cost_map[next]
+        return rhs
+
+    def updateVertex(self, index):
+        # 重新计算格子的距离，距离不一致时放到 open 列表中
+        if index != self.goal:
+            self.rhs_list[index] = self.calRhs(index)
+        if self.g_list[index] != self.rhs_list[index]:
+            self.insertOpen(index)
+        else:
+            self.in_open[index] = 0
+
+    def computeShortestPath(self):
+        # 扩展 open 列表中的格子，直到开始位置的距离一致
+        start_time = searchStats.getStartTime(self.map)
+        # 只在记录统计信息时计数，加入 open 列表的记录数量是出堆的记录数量加上 open 列表增加的长度
+        record = start_time is not None
+        expanded, skipped, open_num = 0, 0, len(self.open_heap)
+        peak_open = open_num
+        g_list, rhs_list = self.g_list, self.rhs_list
+        open_heap = self.open_heap
+        move_table = self.map.move_table
+        start = self.start
+        while len(open_heap) > 0:
+            if record and len(open_heap) > peak_open:
+                peak_open = len(open_heap)
+            key1, key2, index = open_heap[0]
+            if (not self.in_open[index] or self.key1_list[index] != key1 or
+                self.key2_list[index] != key2):
+                # 跳过过期的记录
+                heapq.heappop(open_heap)
+                if record:
+                    skipped += 1
+                continue
+            start_g = min(g_list[start], rhs_list[start])
+            start_key = (start_g + self.km, start_g)
+            if (key1, key2) >= start_key and rhs_list[start] == g_list[start]:
+                break
+            heapq.heappop(open_heap)
+            self.in_open[index] = 0
+            if record:
+                expanded += 1
+
+            g_cost = min(g_list[index], rhs_list[index])
+            new_key1 = g_cost + self.calHeuristic(index) + self.km
+            if (key1, key2) < (new_key1, g_cost):
+                # 开始位置移动后 key 值变大了，重新放到 open 列表中
+                self.insertOpen(index)
+            elif g_list[index] > rhs_list[index]:
+                # 距离变短了，更新相邻格子
+                g_list[index] = rhs_list[index]
+                if self.isPassable(index):
+                    for next in move_table[index]:
+                        self.updateVertex(next)
+            else:
+                # 距离变长了，更新格子自己和相邻格子
+                g_list[index] = INFINITE
+                self.updateVertex(index)
+                for next in move_table[index]:
+                    self.updateVertex(next)
+        if record:
+            path_length = rhs_list[start] if rhs_list[start] < INFINITE else None
+            searchStats.recordSearch(self.map, start_time, 'dstar', expanded,
+                            expanded + skipped + len(open_heap) - open_num, peak_open, path_length)
+
+    def getNextStep(self, index):
+        '''生物行走到 index 格子时调用，返回下一步的格子索引值。
+           已经到达 dest 位置或者找不到路径时返回 None'''
+        if len(self.changed_set) > 0:
+            # 地图改变了，开始位置移动后增加 km，修复改变的格子相邻格子的距离
+            self.start = index
+            self.km += self.calHeuristic(self.last)
+            self.last = index
+            for changed in self.changed_set:
+                self.updateVertex(changed)
+                for next in self.map.move_table[changed]:
+                    self.updateVertex(next)
+            self.changed_set.clear()
+            self.computeShortestPath()
+        self.start = index
+        if index == self.goal or self.rhs_list[index] >= INFINITE:
+            return None
+        # 选择到 dest 距离最短的相邻格子
+        best, best_cost = None, INFINITE
+        cost_map = self.map.cost_map
+        for next in self.map.move_table[index]:
+            if self.g_list[next] + cost_map[next] < best_cost and self.isPassable(next):
+                best, best_cost = next, self.g_list[next] + cost_map[next]
+        return best
+
+
+class PathPlanner():
+    def __init__(self, map, path, entity):
+        # 生物沿着地图设置的路径搜索算法找到的路径 path 行走，剩下的路径被挡住后才创建 DStarLite，
+        # 之后地图再改变时由 DStarLite 修复搜索结果
+        self.map = map
+        self.path = path
+        self.entity = entity
+        self.dest = path.getDest()
+        self.dstar = None
+        # 创建 DStarLite 之前改变了的格子集合
+        self.changed_set = set()
+
+    def setDirty(self, index):
+        '''地图格子的类型或生物改变时调用'''
+        if self.dstar is not None:
+            self.dstar.setDirty(index)
+        else:
+            self.changed_set.add(index)
+
+    def isBlocked(self):
+        # 判断剩下的路径上是否有改变后不能经过的格子
+        path, movable_map = self.path, self.map.movable_map
+        for i in range(path.head + 1, len(path.index_list)):
+            index = path.index_list[i]
+            if index in self.changed_set and not movable_map[index]:
+                return True
+        return False
+
+    def getNextStep(self, index):
+        '''和 DStarLite.getNextStep 一样，生物行走到 index 格子时调用，返回下一步的格子索引值。
+           已经到达目的位置或者找不到路径时返回 None'''
+        if self.dstar is None and len(self.changed_set) > 0:
+            if self.isBlocked():
+                # 从生物现在的格子开始创建增量路径搜索对象
+                self.dstar = DStarLite(self.map, self.map.getCellPos(index), self.dest, self.entity)
+            self.changed_set.clear()
+        if self.dstar is not None:
+            return self.dstar.getNextStep(index)
+        if self.path.popStep() is None:
+            return None
+        return self.path.index_list[self.path.head]
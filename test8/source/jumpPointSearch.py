@@ -0,0 +1,140 @@
+'''正方形地图的跳点搜索（Jump Point Search），生物只能向上下左右四个方向移动，每一步的距离都是 1'''
+import heapq
+from array import array
+from . import constants as c
+from . import aStarSearch
+from . import searchStats
+
+def JumpPointSearch(map, source, dest, counter=None):
+    '''搜索 source 位置到 dest 位置的路径，返回和 AStarSearch 一样的路径节点链表，
+       链表中包含路径上的每一个格子，找不到路径时返回 None。
+       counter 不为 None 时，保存扩展的节点数量等统计信息，参考 searchStats.recordSearch。
+       六边形地图没有对称的路径可以剪枝，直接使用 AStarSearch'''
+    if c.MAP_HEXAGON:
+        return aStarSearch.AStarSearch(map, source, dest, counter)
+    start_time = searchStats.getStartTime(map)
+
+    width, height = map.width, map.height
+    movable_map = map.movable_map
+    dest_x, dest_y = dest
+    source_index = map.getCellIndex(*source)
+    dest_index = map.getCellIndex(dest_x, dest_y)
+
+    def isWalkable(x, y):
+        # 判断地图位置是否有效并且可以移动到
+        return 0 <= x < width and 0 <= y < height and movable_map[y * width + x] == 1
+
+    def jumpHorizontal(x, y, dx):
+        # 沿着 x 轴方向一直走，返回遇到的跳点位置，遇到障碍物时返回 None
+        while True:
+            x += dx
+            if not isWalkable(x, y):
+                return None
+            if x == dest_x and y == dest_y:
+                return (x, y)
+            # 上方或下方的格子可以走，但是前一个格子的上方或下方是障碍物，这个格子是跳点
+            if ((isWalkable(x, y - 1) and not isWalkable(x - dx, y - 1)) or
+                (isWalkable(x, y + 1) and not isWalkable(x - dx, y + 1))):
+                return (x, y)
+
+    def jumpVertical(x, y, dy):
+        # 沿着 y 轴方向一直走，返回遇到的跳点位置，遇到障碍物时返回 None
+        while True:
+            y += dy
+            if not isWalkable(x, y):
+                return None
+            if x == dest_x and y == dest_y:
+                return (x, y)
+            if ((isWalkable(x - 1, y) and not isWalkable(x - 1, y - dy)) or
+                (isWalkable(x + 1, y) and not isWalkable(x + 1, y - dy))):
+                return (x, y)
+            # 路径先沿 y 轴再沿 x 轴移动，如果从这个格子向左右能找到跳点，这个格子也是跳点
+            if jumpHorizontal(x, y, 1) is not None or jumpHorizontal(x, y, -1) is not None:
+                return (x, y)
+
+    def getDirections(index):
+        # 根据从父跳点过来的方向，返回需要搜索的方向
+        parent = parent_list[index]
+        if parent == -1:
+            return ((-1, 0), (0, -1), (1, 0), (0, 1))
+        y, x = divmod(index, width)
+        parent_y, parent_x = divmod(parent, width)
+        if x != parent_x:
+            dx = 1 if x > parent_x else -1
+            return ((0, -1), (0, 1), (dx, 0))
+        dy = 1 if y > parent_y else -1
+        return ((-1, 0), (1, 0), (0, dy))
+
+    # 每个跳点的状态，0 表示未访问，1 表示在 open 列表中，2 表示在 closed 列表中
+    state_list = bytearray(map.size)
+    g_list = array('i', [0]) * map.size
+    # parent_list 保存每个跳点的父跳点索引值
+    parent_list = array('i', [-1]) * map.size
+    open_heap = [(0, 0, source_index)]
+    state_list[source_index] = 1
+    # 扩展的跳点数量，加入最小堆的记录数量和最小堆的最大长度，只在记录统计信息时计数
+    expanded, pushed, peak_open = 0, 1, 1
+    record = start_time is not None or counter is not None
+
+    while len(open_heap) > 0:
+        if record and len(open_heap) > peak_open:
+            peak_open = len(open_heap)
+        _, g_cost, index = heapq.heappop(open_heap)
+        g_cost = -g_cost
+        if state_list[index] != 1 or g_list[index] != g_cost:
+            # 跳过过期的记录
+            continue
+        if index == dest_index:
+            searchStats.recordSearch(map, start_time, 'jps', expanded, pushed, peak_open, g_cost, counter)
+            return createStepEntry(map, parent_list, index)
+        state_list[index] = 2
+        if record:
+            expanded += 1
+
+        y, x = divmod(index, width)
+        for dx, dy in getDirections(index):
+            if dx != 0:
+                point = jumpHorizontal(x, y, dx)
+            else:
+                point = jumpVertical(x, y, dy)
+            if point is None:
+                continue
+            next = map.getCellIndex(*point)
+            if state_list[next] == 2:
+                continue
+            # 两个跳点在一条直线上，距离是 x 轴或 y 轴的差值
+            next_g = g_cost + abs(point[0] - x) + abs(point[1] - y)
+            if state_list[next] == 1 and g_list[next] <= next_g:
+                continue
+            state_list[next] = 1
+            g_list[next] = next_g
+            parent_list[next] = index
+            lower_distance = map.calLowerDistance(next, dest_index)
+            if lower_distance is None:
+                continue
+            f_cost = next_g + lower_distance
+            # f_cost 相同时优先扩展离 source 更远的跳点
+            heapq.heappush(open_heap, (f_cost, -next_g, next))
+            if record:
+                pushed += 1
+    searchStats.recordSearch(map, start_time, 'jps', expanded, pushed, peak_open, None, counter)
+    return None
+
+def createStepEntry(map, parent_list, index):
+    # 把跳点之间的直线展开成每一步的格子，返回和 AStarSearch 一样的路径节点链表
+    point_list = []
+    while index != -1:
+        point_list.append(map.getCellPos(index))
+        index = parent_list[index]
+    point_list.reverse()
+
+    x, y = point_list[0]
+    location = aStarSearch.SearchEntry(x, y, 0, 0)
+    for next_x, next_y in point_list[1:]:
+        dx = (next_x > x) - (next_x < x)
+        dy = (next_y > y) - (next_y < y)
+        while x != next_x or y != next_y:
+            x, y = x + dx, y + dy
+            g_cost = location.g_cost + 1
+            location = aStarSearch.SearchEntry(x, y, g_cost, g_cost, location)
+    return location
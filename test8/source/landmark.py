@@ -0,0 +1,121 @@
+'''路标（ALT）估计距离，保存几个路标格子到每个格子的静态行走距离，用三角不等式估计两个格子之间的距离'''
+import os
+import json
+import zlib
+from array import array
+from . import constants as c
+
+class LandmarkTable():
+    def __init__(self, map):
+        self.map = map
+        self.typecode = 'H' if map.size < 0xffff else 'I'
+        # 不能到达的格子的距离值是数组元素类型的最大值
+        self.unreachable = (1 << (8 * array(self.typecode).itemsize)) - 1
+        # passable 保存格子是否有效并且不是石头，路标距离不考虑生物
+        self.passable = bytearray(map.size)
+        for index in range(map.size):
+            x, y = map.getCellPos(index)
+            self.passable[index] = map.isValid(x, y) and map.grid_map[index] != c.MAP_STONE
+        # landmarks 是路标格子索引值的列表，distances 是每个路标到每个格子的距离数组列表
+        self.landmarks = []
+        self.distances = []
+
+    def searchDistance(self, source):
+        # 从 source 格子广度优先搜索，返回 source 到每个格子的距离数组
+        row = array(self.typecode, [self.unreachable]) * self.map.size
+        row[source] = 0
+        queue = [source]
+        head = 0
+        while head < len(queue):
+            index = queue[head]
+            head += 1
+            g_cost = row[index] + 1
+            for next in self.map.move_table[index]:
+                if self.passable[next] and row[next] == self.unreachable:
+                    row[next] = g_cost
+                    queue.append(next)
+        return row
+
+    def selectLandmarks(self, landmark_num):
+        '''每次选择离已有路标最远的格子作为新的路标，让路标分布在地图的边缘'''
+        landmarks, distances = [], []
+        self.landmarks, self.distances = landmarks, distances
+        cells = [index for index in range(self.map.size) if self.passable[index]]
+        if len(cells) == 0:
+            return
+        # nearest 保存每个格子到最近路标的距离，不能到达的格子优先选择，覆盖不连通的区域
+        nearest = [self.unreachable] * self.map.size
+        row = self.searchDistance(cells[0])
+        while len(landmarks) < min(landmark_num, len(cells)):
+            best, best_distance = None, None
+            for index in cells:
+                distance = row[index] if len(landmarks) == 0 else nearest[index]
+                if index not in landmarks and (best is None or distance > best_distance):
+                    best, best_distance = index, distance
+            if len(landmarks) > 0 and best_distance == 0:
+                break
+            row = self.searchDistance(best)
+            landmarks.append(best)
+            distances.append(row)
+            for index in cells:
+                if row[index] < nearest[index]:
+                    nearest[index] = row[index]
+
+    def getLowerDistance(self, index1, index2):
+        '''返回两个格子之间行走距离的下限，不会高估实际的行走距离。
+           两个格子只考虑石头也不能到达时返回 None'''
+        unreachable = self.unreachable
+        lower = 0
+        for row in self.distances:
+            distance1, distance2 = row[index1], row[index2]
+            if distance1 == unreachable or distance2 == unreachable:
+                if distance1 != distance2:
+                    # 一个格子和路标连通，另一个不连通
+                    return None
+                continue
+            # 三角不等式：|d(L, a) - d(L, b)| <= d(a, b)
+            if distance1 > distance2:
+                distance1, distance2 = distance2, distance1
+            if distance2 - distance1 > lower:
+                lower = distance2 - distance1
+        return lower
+
+    def getSignature(self):
+        # 地图大小，类型和格子类型的校验值，用来判断文件中的路标距离表是否和地图一致
+        return [self.map.width, self.map.height, c.MAP_HEXAGON, zlib.crc32(bytes(self.map.grid_map))]
+
+    def save(self, file_path):
+        '''把路标距离表保存到文件中，不能到达的距离保存为 -1'''
+        data = {'signature': self.getSignature(), 'landmarks': self.landmarks,
+                'distances': [[-1 if distance == self.unreachable else distance for distance in row]
+                              for row in self.distances]}
+        try:
+            with open(file_path, 'w') as f:
+                json.dump(data, f)
+        except OSError:
+            # 不能写文件时只在内存中使用路标距离表
+            pass
+
+def loadLandmarkTable(map, file_path=None):
+    '''返回地图的路标距离表。file_path 不为 None 时先从文件读取，
+       文件不存在，不能读取，格式错误或者和地图不一致时重新计算，并保存到文件中'''
+    table = LandmarkTable(map)
+    if file_path is not None and os.path.exists(file_path):
+        try:
+            with open(file_path) as f:
+                data = json.load(f)
+            if data['signature'] == table.getSignature():
+                landmarks = data['landmarks']
+                distances = [array(table.typecode, [table.unreachable if distance < 0 else distance
+                              for distance in row]) for row in data['distances']]
+                if (len(landmarks) == len(distances) and all(len(row) == map.size for row in distances) and
+                    all(0 <= index < map.size for index in landmarks)):
+                    table.landmarks, table.distances = landmarks, distances
+                    return table
+        except (OSError, ValueError, KeyError, TypeError, OverflowError):
+            # 文件损坏或者格式不对时和文件不存在一样，重新计算并覆盖文件
+            pass
+    table.selectLandmarks(c.LANDMARK_NUM)
+    if file_path is not None:
+        table.save(file_path)
+    return table
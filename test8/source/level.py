@@ -20,6 +20,22 @@ class Level(tool.State):
         grid = self.map_data[c.MAP_GRID] if c.MAP_GRID in self.map_data else None
         # 创建地图类
         self.map = map.Map(c.GRID_X_LEN, c.GRID_Y_LEN, grid)
+        if c.MAP_MOVE_COST_KEY in self.map_data:
+            # 关卡设置了格子类型的行走距离，json 中 key 是字符串，转换成格子类型
+            cost_dict = self.map_data[c.MAP_MOVE_COST_KEY]
+            self.map.setMoveCost({int(type): cost for type, cost in cost_dict.items()})
+        if c.MAP_PATH_SEARCH in self.map_data:
+            # 关卡设置了路径搜索算法，格子的行走距离不同时 getPathSearch 会改用桶队列搜索
+            self.map.setPathSearch(self.map_data[c.MAP_PATH_SEARCH])
+        elif not self.map.uniform_cost:
+            self.map.setPathSearch(c.SEARCH_DIAL)
+        if c.BAKE_DISTANCE_TABLE:
+            # 创建地图格子之间的距离表，用来加快路径搜索，距离在搜索用到时才计算
+            self.map.buildDistanceTable()
+        if c.MAP_HEURISTIC in self.map_data:
+            # 关卡设置了估计距离类型，路标距离表缓存在关卡配置文件旁边
+            file_path = os.path.join('data', 'map', 'level_' + str(self.game_info[c.LEVEL_NUM]) + '_landmark.json')
+            self.map.setHeuristic(self.map_data[c.MAP_HEURISTIC], file_path)
         # 创建生物组
         self.setupGroup()
         # 设置初始状态为空闲状态
@@ -49,14 +65,17 @@ class Level(tool.State):
     def update(self, surface, current_time, mouse_pos):
         '''游戏的更新函数'''
         self.current_time = current_time
+        # 开始统计这一帧的路径搜索
+        self.map.startSearchFrame()
 
         if self.state == c.IDLE:
             # 获取下一个行动的生物
             result = self.getActiveEntity()
             if result is not None:
                 entity, group = result
-                # 保存当前行动生物
+                # 保存当前行动生物，开始统计这个生物行动回合的路径搜索
                 self.map.active_entity = entity
+                self.map.startSearchTurn()
                 # 更新生物组的下一个行动生物索引
                 group.consumeEntity()
                 # 设置运行类状态为生物行为选择状态
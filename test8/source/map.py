@@ -1,7 +1,10 @@
+from array import array
+from collections import OrderedDict
 import pygame as pg
 from . import tool
 from . import constants as c
-from . import aStarSearch
+from . import aStarSearch, distanceTable, landmark, jumpPointSearch, hierarchicalSearch, flowField
+from . import searchStats, componentLabel, hexGeometry, bitboard, distanceField
 
 class Map():
     def __init__(self, width, height, grid):
@@ -9,23 +12,73 @@ class Map():
         self.width = width
         # 地图的列数
         self.height = height 
-        # bg_map 是地图的背景颜色二维数组，每个元素对应一个地图格子。
-        self.bg_map = [[0 for x in range(self.width)] for y in range(self.height)]
-        # entity_map 是保存生物的二维数组，每个元素对应一个地图格子。
-        self.entity_map = [[None for x in range(self.width)] for y in range(self.height)]
+        # 地图格子的数量，地图格子 (x, y) 的索引值是 y * width + x
+        self.size = width * height
+        # bg_map 是地图的背景颜色数组，每个元素对应一个地图格子。
+        self.bg_map = bytearray(self.size)
+        # entity_map 是保存生物的数组，每个元素对应一个地图格子。
+        self.entity_map = [None] * self.size
         # 保存当前行动的生物
         self.active_entity = None
         # 保存生物攻击时所在的地图位置
         self.select = None
+        # updateMapShow 上次计算时的输入，输入没有改变时保留上次的背景显示。
+        # show_key 是 (行动生物, 生物状态, 地图版本)，mouse_key 是鼠标所在的格子
+        self.show_key = None
+        self.mouse_key = None
+        self.mouse_pos = None
+        # range_bg 保存只显示行动生物行走范围时的背景颜色数组
+        self.range_bg = bytearray(self.size)
+        # bg_surface 保存绘制好的地图背景，第一次绘制时创建。drawn_bg 是 bg_surface 上绘制的背景颜色数组，
+        # 每次绘制时只重新绘制背景颜色和 drawn_bg 不同的格子
+        self.bg_surface = None
+        self.drawn_bg = bytearray(self.size)
+        # version 是地图搜索条件的版本号，格子类型，生物位置，行走距离，搜索算法或估计距离改变时加 1
+        self.version = 0
+        # search_cache 按照最近使用的顺序保存搜索结果，key 的第一个值是版本号，
+        # 版本号改变后旧的结果不会再被使用，超过缓存的最大数量时最先被删除
+        self.search_cache = OrderedDict()
+        # 搜索结果缓存的命中和未命中次数
+        self.cache_hit = 0
+        self.cache_miss = 0
+        # 路径搜索的统计信息，没有启用时不记录
+        self.search_stats = searchStats.SearchStats(c.SEARCH_STATS)
+        # 地图使用的路径搜索算法
+        self.path_search = c.SEARCH_ASTAR
+        # 分层路径搜索使用的区块图，第一次使用时创建
+        self.cluster_graph = None
+        # 距离场使用的 numpy 相邻格子数组，第一次使用时创建
+        self.neighbor_array = None
+        # 生物行走时使用的增量路径搜索对象列表，地图改变时通知它们修复搜索结果
+        self.planner_list = []
+        # 只考虑石头时所有格子之间的距离表，调用 buildDistanceTable 后创建
+        self.distance_table = None
+        # AStarSearch 使用的估计距离类型，使用路标估计距离时保存路标距离表
+        self.heuristic = c.HEURISTIC_DEFAULT
+        self.landmark_table = None
         self.setupMapImage(grid)
+        self.setupTileImage()
+        self.setupNeighborTable()
+        # 可以移动到的格子的连通区域标记，生物位置改变时增量更新
+        self.component_label = componentLabel.ComponentLabel(self)
+        # 格子数量不多时使用位棋盘计算行走范围
+        self.bitboard = bitboard.Bitboard(self) if self.size <= c.BITBOARD_MAX_SIZE else None
 
     def setupMapImage(self, grid):
-        # grid_map是地图的格子类型二维数组，每个元素对应一个地图格子
-        self.grid_map = [[0 for x in range(self.width)] for y in range(self.height)]
+        # grid_map是地图的格子类型数组，每个元素对应一个地图格子
+        self.grid_map = array('b', bytes(self.size))
         if grid is not None:
             for data in grid:
                 x, y, type = data['x'], data['y'], data['type']
-                self.grid_map[y][x] = type
+                self.grid_map[self.getCellIndex(x, y)] = type
+        # 每种格子类型的行走距离，cost_map 是移动到每个地图格子需要的行走距离
+        self.move_cost = dict(c.MAP_MOVE_COST)
+        self.updateMoveCost()
+        # movable_map 是地图格子是否可以移动到的数组，值为 1 表示格子有效，不是石头并且没有生物
+        self.movable_map = bytearray(self.size)
+        for index in range(self.size):
+            self.updateMovable(index)
+        self.updateVersion()
         
         # 创建一个和地图一样大小的图片map_image，用来绘制非空的地图格子，比如格子是石块或草地。
         self.map_image = pg.Surface((c.MAP_WIDTH, c.MAP_WIDTH)).convert()
@@ -34,10 +87,10 @@ class Map():
         self.rect.y = 0
         for y in range(self.height):
             for x in range(self.width):
-                type = self.grid_map[y][x]
+                type = self.grid_map[self.getCellIndex(x, y)]
                 if type != c.MAP_EMPTY:
                     if c.MAP_HEXAGON:
-                        base_x, base_y = tool.getHexMapPos(x, y)
+                        base_x, base_y = hexGeometry.getCellPixel(x, y)
                         self.map_image.blit(tool.GRID[type], (base_x, base_y))
                     else:
                         # (x * c.REC_SIZE, y * c.REC_SIZE)表示格子在地图上的坐标
@@ -45,13 +98,228 @@ class Map():
         # pygame.Surface 创建的Surface对象的默认颜色是黑色，设置透明色为黑色后，图像上黑色的部分显示时变成透明
         self.map_image.set_colorkey(c.BLACK)
 
+    def setupTileImage(self):
+        # 每种背景格子类型创建一个格子图片，tile_list[type] 是背景格子类型为 type 的图片，
+        # 绘制背景时每个格子只需要复制一次图片
+        self.tile_list = []
+        for type in (c.BG_EMPTY, c.BG_ACTIVE, c.BG_RANGE, c.BG_SELECT, c.BG_ATTACK):
+            color = self.getBackgroundColor(type)
+            if c.MAP_HEXAGON:
+                # 图片大小是六边形格子的外接矩形，六边形外面的黑色部分显示时是透明的
+                tile = pg.Surface((c.HEX_X_SIZE + 1, c.HEX_Y_SIZE + 1)).convert()
+                pg.draw.polygon(tile, color, self.getHexPoints(0, 0))
+                tile.set_colorkey(c.BLACK)
+            else:
+                tile = pg.Surface((c.REC_SIZE, c.REC_SIZE)).convert()
+                tile.fill(color)
+            self.tile_list.append(tile)
+        # pixel_list 保存每个格子的图片在地图上的坐标
+        self.pixel_list = [self.getCellPixel(*self.getCellPos(index)) for index in range(self.size)]
+
+        # 创建一个和地图一样大小的图片 grid_image，绘制所有格子的边线，其他白色的部分显示时是透明的
+        self.grid_image = pg.Surface((c.MAP_WIDTH, c.MAP_HEIGHT)).convert()
+        self.grid_image.fill(c.WHITE)
+        if c.MAP_HEXAGON:
+            for y in range(self.height):
+                for x in range(self.width):
+                    if self.isValid(x, y):
+                        pg.draw.lines(self.grid_image, c.BLACK, True, self.getHexPoints(x, y))
+        else:
+            # 绘制地图每一行的线
+            for y in range(self.height):
+                pg.draw.line(self.grid_image, c.BLACK, (0, c.REC_SIZE * y), (c.MAP_WIDTH, c.REC_SIZE * y), 1)
+            # 绘制地图每一列的线
+            for x in range(self.width):
+                pg.draw.line(self.grid_image, c.BLACK, (c.REC_SIZE * x, 0), (c.REC_SIZE * x, c.MAP_HEIGHT), 1)
+        self.grid_image.set_colorkey(c.WHITE)
+
+    def updateMoveCost(self):
+        # 根据格子类型设置 cost_map 数组，所有行走距离都是 1 时 uniform_cost 为 True
+        self.cost_map = bytearray(self.move_cost.get(type, 1) for type in self.grid_map)
+        self.max_move_cost = max(self.cost_map) if self.size > 0 else 1
+        self.uniform_cost = self.max_move_cost == 1
+
+    def setMoveCost(self, cost_dict):
+        '''设置格子类型的行走距离，cost_dict 的 key 是格子类型，value 是 1 到 255 的整数，
+           行走距离不正确时抛出 ValueError，不修改之前的设置'''
+        for type, cost in cost_dict.items():
+            # 行走距离是 0 时估计距离会高估，桶队列搜索也会出错，超过 255 时不能保存在 cost_map 中
+            if isinstance(cost, bool) or not isinstance(cost, int) or not 1 <= cost <= 255:
+                raise ValueError('move cost of map type %r must be an integer from 1 to 255, got %r' % (type, cost))
+        self.move_cost.update(cost_dict)
+        self.updateMoveCost()
+        self.updateVersion()
+
+    def setupNeighborTable(self):
+        '''创建地图时调用，保存每个地图格子可以移动到和可以攻击到的有效相邻格子位置'''
+        # move_table 和 attack_table 数组的每个元素是相邻格子索引值的元组
+        self.move_table = [() for index in range(self.size)]
+        self.attack_table = [() for index in range(self.size)]
+        # axial_q 和 axial_r 保存每个格子的轴向坐标，正方形地图中就是 (x, y)
+        self.axial_q = array('i', [0]) * self.size
+        self.axial_r = array('i', [0]) * self.size
+        for index in range(self.size):
+            x, y = self.getCellPos(index)
+            if c.MAP_HEXAGON:
+                x, y = hexGeometry.offsetToAxial(x, y)
+            self.axial_q[index], self.axial_r[index] = x, y
+        for y in range(self.height):
+            for x in range(self.width):
+                if not self.isValid(x, y):
+                    continue
+                index = self.getCellIndex(x, y)
+                self.move_table[index] = tuple(self.getCellIndex(x + offset_x, y + offset_y)
+                        for offset_x, offset_y in tool.getMovePositions(x, y)
+                        if self.isValid(x + offset_x, y + offset_y))
+                self.attack_table[index] = tuple(self.getCellIndex(x + offset_x, y + offset_y)
+                        for offset_x, offset_y in tool.getAttackPositions(x, y)
+                        if self.isValid(x + offset_x, y + offset_y))
+
+    def getCellIndex(self, map_x, map_y):
+        '''返回地图位置 (map_x, map_y) 的格子索引值'''
+        return map_y * self.width + map_x
+
+    def getCellPos(self, index):
+        '''返回格子索引值对应的地图位置 (map_x, map_y)'''
+        map_y, map_x = divmod(index, self.width)
+        return (map_x, map_y)
+
+    def getGridType(self, map_x, map_y):
+        # 返回地图格子的类型
+        return self.grid_map[map_y * self.width + map_x]
+
+    def getBackground(self, map_x, map_y):
+        # 返回地图格子的背景颜色类型
+        return self.bg_map[map_y * self.width + map_x]
+
+    def setBackground(self, map_x, map_y, type):
+        # 设置地图格子的背景颜色类型
+        self.bg_map[map_y * self.width + map_x] = type
+
+    def getEntity(self, map_x, map_y):
+        # 返回地图格子上的生物，没有生物时返回 None
+        return self.entity_map[map_y * self.width + map_x]
+
+    def updateMovable(self, index):
+        # 根据格子类型和格子上的生物，更新格子是否可以移动到
+        map_x, map_y = self.getCellPos(index)
+        if (self.isValid(map_x, map_y) and self.grid_map[index] != c.MAP_STONE and
+            self.entity_map[index] is None):
+            self.movable_map[index] = 1
+        else:
+            self.movable_map[index] = 0
+
+    def isNextToEntity(self, entity1, entity2):
+        '''判断两个生物是否在相邻可攻击的地图位置'''
+        index1 = self.getCellIndex(entity1.map_x, entity1.map_y)
+        return self.getCellIndex(entity2.map_x, entity2.map_y) in self.attack_table[index1]
+
+    def updateVersion(self):
+        '''地图的搜索条件改变时调用，之前版本号的搜索结果都失效了'''
+        self.version += 1
+
+    def getSearchResult(self, key, search_func, *args):
+        '''从缓存中获取搜索结果，如果没有缓存，调用 search_func(self, *args) 搜索并保存结果'''
+        key = (self.version,) + key
+        if key in self.search_cache:
+            self.cache_hit += 1
+            self.search_cache.move_to_end(key)
+            return self.search_cache[key]
+        self.cache_miss += 1
+        result = search_func(self, *args)
+        self.addSearchResult(key[1:], result)
+        return result
+
+    def addSearchResult(self, key, result):
+        '''保存搜索结果到缓存中，超过缓存的最大数量时删除最久没有使用的结果'''
+        self.search_cache[(self.version,) + key] = result
+        self.search_cache.move_to_end((self.version,) + key)
+        if len(self.search_cache) > c.SEARCH_CACHE_SIZE:
+            self.search_cache.popitem(last=False)
+
+    def setPathSearch(self, path_search):
+        '''设置地图使用的路径搜索算法，之前缓存的搜索结果都失效了'''
+        self.path_search = path_search
+        self.updateVersion()
+
+    def getPathSearch(self, path_search=None):
+        '''返回路径搜索函数，path_search 为 None 时使用地图设置的路径搜索算法。
+           跳点搜索，分层路径搜索和双向搜索假设每一步的距离都是 1，
+           格子的行走距离不同时使用桶队列的 Dijkstra 搜索'''
+        if path_search is None:
+            path_search = self.path_search
+        if path_search == c.SEARCH_DIAL or (not self.uniform_cost and
+                path_search in (c.SEARCH_JPS, c.SEARCH_HPA, c.SEARCH_BIDIRECTIONAL)):
+            return aStarSearch.DialSearch
+        if path_search == c.SEARCH_JPS:
+            return jumpPointSearch.JumpPointSearch
+        elif path_search == c.SEARCH_HPA:
+            return hierarchicalSearch.HierarchicalSearch
+        elif path_search == c.SEARCH_BIDIRECTIONAL:
+            return aStarSearch.BidirectionalSearch
+        return aStarSearch.AStarSearch
+
+    def setHeuristic(self, heuristic, file_path=None):
+        '''设置 AStarSearch 使用的估计距离类型。使用路标估计距离时，file_path 是路标距离表的缓存文件，
+           文件不存在或者和地图不一致时重新计算并保存'''
+        self.heuristic = heuristic
+        self.landmark_table = None
+        if heuristic == c.HEURISTIC_LANDMARK:
+            self.landmark_table = landmark.loadLandmarkTable(self, file_path)
+        self.updateVersion()
+
+    def getClusterGraph(self):
+        '''返回分层路径搜索使用的区块图'''
+        if self.cluster_graph is None:
+            self.cluster_graph = hierarchicalSearch.ClusterGraph(self)
+        return self.cluster_graph
+
+    def getDistanceField(self, sources, max_distance=None):
+        '''返回每个格子到 sources 中最近位置的行走距离场，sources 是地图位置 (x, y) 的列表。
+           使用搜索结果缓存，地图没有改变时同样的开始位置只计算一次'''
+        sources = tuple(sorted(set(tuple(pos) for pos in sources)))
+        return self.getSearchResult(('field', sources, max_distance),
+                        distanceField.getDistanceField, sources, max_distance)
+
+    def getFlowField(self, goals):
+        '''返回走到 goals 中最近格子的流场，goals 是目的格子索引值的列表。
+           使用搜索结果缓存，生物位置没有改变时 AI 行动共用同一个流场'''
+        goals = tuple(sorted(set(goals)))
+        return self.getSearchResult(('flow', goals), flowField.FlowField, list(goals))
+
+    def getCacheStats(self):
+        '''返回搜索结果缓存的统计信息'''
+        return {'version':self.version, 'size':len(self.search_cache),
+                'hit':self.cache_hit, 'miss':self.cache_miss}
+
+    def resetCacheStats(self):
+        # 清零缓存的命中和未命中次数
+        self.cache_hit = 0
+        self.cache_miss = 0
+
+    def enableSearchStats(self, enabled=True):
+        '''启用或者关闭路径搜索的统计，启用时清空之前的统计信息'''
+        self.search_stats.enabled = enabled
+        if enabled:
+            self.search_stats.reset()
+
+    def startSearchFrame(self):
+        '''每一帧开始时调用，开始统计这一帧的路径搜索'''
+        self.search_stats.startFrame()
+
+    def startSearchTurn(self):
+        '''每个生物开始行动时调用，开始统计这个生物行动回合的路径搜索'''
+        self.search_stats.startTurn()
+
+    def getSearchStats(self):
+        '''返回路径搜索的统计信息，包含最近一次搜索，当前帧，当前回合，所有搜索，上一帧和上一回合的统计'''
+        return self.search_stats.getStats()
+
     def isValid(self, map_x, map_y):
         '''判断传入的地图x和y的值是否是有效的'''
         if c.MAP_HEXAGON:
-            if map_y % 2 == 0:
-                max_x = self.width
-            else:
-                max_x = self.width - 1
+            # 奇数行向右偏移半个格子，少一个格子
+            max_x = self.width - (map_y & 1)
         else:
             max_x = self.width
         if (map_x < 0 or map_x >= max_x or
@@ -62,32 +330,51 @@ class Map():
     def getMapIndex(self, x, y):
         '''根据传入的坐标x和y值，返回坐标所在的格子位置'''
         if c.MAP_HEXAGON:
-            return tool.getHexMapIndex(x, y)
+            return hexGeometry.getPixelCell(x, y)
         else:
             return (x//c.REC_SIZE, y//c.REC_SIZE)
 
     def isMovable(self, map_x, map_y):
         '''判断是否能移动到传入的地图格子位置'''
-        return (self.grid_map[map_y][map_x] != c.MAP_STONE and
-                self.entity_map[map_y][map_x] == None)
+        return self.movable_map[map_y * self.width + map_x] == 1
+
+    def buildDistanceTable(self):
+        '''关卡加载时调用，创建只考虑石头时格子之间的最短行走距离表，每一行在第一次用到时计算。
+           地图太大时不创建距离表，返回是否创建了距离表'''
+        self.distance_table = distanceTable.createDistanceTable(self)
+        return self.distance_table is not None
+
+    def calLowerDistance(self, index1, index2):
+        '''两个格子之间行走距离的下限，不会高估实际的行走距离。有距离表时使用距离表，
+           否则使用不考虑障碍物时的最少步数和路标估计距离。只考虑石头也不能到达时返回 None'''
+        if self.distance_table is not None:
+            return self.distance_table.getDistance(index1, index2)
+        distance = self.calIndexDistance(index1, index2)
+        if self.landmark_table is not None:
+            # 路标估计距离和不考虑障碍物的最少步数都不会高估，使用较大的值
+            lower_distance = self.landmark_table.getLowerDistance(index1, index2)
+            if lower_distance is None or lower_distance > distance:
+                return lower_distance
+        return distance
 
-    def calHeuristicDistance(self, x1, y1, x2, y2):
-        '''估计地图两个格点之间的距离'''
+    def calStepDistance(self, x1, y1, x2, y2):
+        '''不考虑障碍物时地图两个格点之间的最少步数，不会高估实际的行走距离'''
         if c.MAP_HEXAGON:
-            dis_y = abs(y1 - y2)
-            dis_x = abs(x1 - x2)
-            half_y = dis_y // 2
-            if dis_y >= dis_x:
-                dis_x = 0
-            else:
-                dis_x -= half_y
-            return (dis_y + dis_x)
+            return hexGeometry.getDistance(x1, y1, x2, y2)
         else:
             return abs(x1 - x2) + abs(y1 - y2)
-    
+
+    def calIndexDistance(self, index1, index2):
+        '''和 calStepDistance 一样计算两个格子之间的最少步数，使用预先计算的轴向坐标，只有整数运算'''
+        dis_q = self.axial_q[index1] - self.axial_q[index2]
+        dis_r = self.axial_r[index1] - self.axial_r[index2]
+        if c.MAP_HEXAGON:
+            return hexGeometry.getAxialDistance(dis_q, dis_r)
+        return abs(dis_q) + abs(dis_r)
+
     def getDistance(self, x1, y1, map_x2, map_y2):
         if c.MAP_HEXAGON:
-            x2, y2 = tool.getHexMapPos(map_x2, map_y2)
+            x2, y2 = hexGeometry.getCellPixel(map_x2, map_y2)
             x2 += c.HEX_X_SIZE // 2
             y2 += c.HEX_Y_SIZE // 2
             distance = (abs(x1 - x2) + abs(y1 - y2))
@@ -103,26 +390,37 @@ class Map():
                 distance -= c.REC_SIZE//2
         return distance
     
+    def isConnected(self, source_index, dest_index):
+        '''判断是否可以从 source 格子走到 dest 格子，source 格子上可以有生物，O(1) 排除不能到达的格子'''
+        return self.component_label.isConnected(source_index, dest_index)
+
     def isInRange(self, source_x, source_y, dest_x, dest_y, max_distance):
-        '''调用 A* 算法函数获取两个格子之间的距离，判断是否小于等于传入的参数 max_distance'''
-        distance = aStarSearch.getAStarDistance(self, (source_x, source_y), (dest_x, dest_y))
-        if distance is not None:
-            if distance <= max_distance:
-                return True
-        return False
+        '''判断两个格子之间的行走距离是否小于等于传入的参数 max_distance'''
+        source, dest = (source_x, source_y), (dest_x, dest_y)
+        return self.getSearchResult(('reach', source, dest, max_distance),
+                        aStarSearch.isReachable, source, dest, max_distance)
+
+    def getThreatBits(self, entity_list):
+        '''返回 entity_list 中的生物本轮可以攻击到的格子位棋盘，没有位棋盘时返回 None'''
+        if self.bitboard is None or not self.uniform_cost:
+            return None
+        return self.bitboard.getThreatBits(entity_list)
 
     def checkMouseClick(self, mouse_pos):
         x, y = mouse_pos
         # 获取鼠标位置所在的地图位置
         map_x, map_y = self.getMapIndex(x, y)
+        if not self.isValid(map_x, map_y):
+            return False
+        index = self.getCellIndex(map_x, map_y)
         
-        if self.bg_map[map_y][map_x] == c.BG_SELECT:
+        if self.bg_map[index] == c.BG_SELECT:
             # 如果格子类型是 c.BG_SELECT，表示这个格子是要行走到的目的位置
             self.active_entity.setDestination(self, map_x, map_y)
             return True
-        elif self.bg_map[map_y][map_x] == c.BG_ATTACK:
+        elif self.bg_map[index] == c.BG_ATTACK:
             # 如果格子类型是 c.BG_ATTACK，表示这个格子上是被攻击的敌方生物
-            entity = self.entity_map[map_y][map_x]
+            entity = self.entity_map[index]
             if self.active_entity.canRemoteAttack(self):
                 self.active_entity.setRemoteTarget(entity)
             else:
@@ -132,10 +430,9 @@ class Map():
         return False
     
     def resetBackGround(self):
-        # 恢复默认，设置所有地图格子类型为 c.BG_EMPTY
-        for y in range(self.height):
-            for x in range(self.width):
-                self.bg_map[y][x] = c.BG_EMPTY
+        # 恢复默认，设置所有地图格子类型为 c.BG_EMPTY，下次调用 updateMapShow 时重新计算
+        self.bg_map[:] = bytes(self.size)
+        self.show_key = None
 
     def showActiveEntityRange(self):
         # 获取行动生物所在的地图位置
@@ -143,25 +440,22 @@ class Map():
         # 获取行动生物的行走距离
         distance = self.active_entity.attr.distance
         
-        # 设置行动生物所在的格子类型为 c.BG_ACTIVE
-        self.bg_map[map_y][map_x] = c.BG_ACTIVE
+        # 从行动生物所在的位置搜索一次，获取所有行走距离小于等于 distance 的地图位置
+        area = self.getSearchResult(('area', (map_x, map_y), distance),
+                        aStarSearch.getReachableArea, (map_x, map_y), distance)
+        for index in area.index_list:
+            # 设置距离小于等于生物行走距离的格子类型为 c.BG_RANGE
+            self.bg_map[index] = c.BG_RANGE
 
-        for y in range(self.height):
-            for x in range(self.width):
-                if (not self.isMovable(x,y) or not self.isValid(x,y) or
-                    (x == map_x and y == map_y)):
-                    # 忽略不能移动，位置无效或者生物所在的地图格子
-                    continue
-                if self.isInRange(map_x, map_y, x, y, distance):
-                    # 设置距离小于等于生物行走距离的格子类型为 c.BG_RANGE
-                    self.bg_map[y][x] = c.BG_RANGE
+        # 设置行动生物所在的格子类型为 c.BG_ACTIVE
+        self.bg_map[area.source] = c.BG_ACTIVE
 
     def checkMouseMove(self, mouse_pos):
         # 获取鼠标位置所在的地图位置
         map_x, map_y = self.getMapIndex(*mouse_pos)
         
         if (not self.isValid(map_x, map_y) or 
-            self.grid_map[map_y][map_x] == c.MAP_STONE):
+            self.getGridType(map_x, map_y) == c.MAP_STONE):
             # 如果是无效的地图位置或者地图格子上是石头，返回
             return False
         
@@ -172,30 +466,28 @@ class Map():
         
         self.select = None
         # 判断鼠标所在的地图格子上是否有生物
-        entity = self.entity_map[map_y][map_x]
+        index = self.getCellIndex(map_x, map_y)
+        entity = self.entity_map[index]
         if entity is None: 
             # 鼠标所在的地图格子上没有生物
             if self.isInRange(x, y, map_x, map_y, distance):
-                self.bg_map[map_y][map_x] = c.BG_SELECT
+                self.bg_map[index] = c.BG_SELECT
         elif entity == self.active_entity:
             # 鼠标所在的地图格子上的生物就是当前行动的生物
-            self.bg_map[map_y][map_x] = c.BG_SELECT
+            self.bg_map[index] = c.BG_SELECT
         elif entity.group_id != self.active_entity.group_id:
             if self.active_entity.canRemoteAttack(self):
-                self.bg_map[map_y][map_x] = c.BG_ATTACK
+                self.bg_map[index] = c.BG_ATTACK
             else:
                 # 鼠标所在的地图格子上的生物是敌方生物
-                dir_list = tool.getAttackPositions(map_x, map_y)
                 # 保存行走生物可移动到格子的列表
                 res_list = []
-                for offset_x, offset_y in dir_list:
-                    # 遍历鼠标所在地图格子的相邻八个格子
-                    tmp_x, tmp_y = map_x + offset_x, map_y + offset_y
-                    if self.isValid(tmp_x, tmp_y):
-                        type = self.bg_map[tmp_y][tmp_x]
-                        if type == c.BG_RANGE or type == c.BG_ACTIVE:
-                            # 如果这个格子是当前行动生物可以行动到的，添加到列表中
-                            res_list.append((tmp_x, tmp_y))
+                for tmp_index in self.attack_table[index]:
+                    # 遍历鼠标所在地图格子的相邻可攻击格子
+                    type = self.bg_map[tmp_index]
+                    if type == c.BG_RANGE or type == c.BG_ACTIVE:
+                        # 如果这个格子是当前行动生物可以行动到的，添加到列表中
+                        res_list.append(self.getCellPos(tmp_index))
                 if len(res_list) > 0:
                     # 如果格子列表不为空，表示行走生物可以攻击到这个敌方生物。
                     min_dis = c.MAP_WIDTH
@@ -206,107 +498,173 @@ class Map():
                             min_dis = distance
                             res = (tmp_x, tmp_y)
                     # 设置这个和鼠标坐标距离最小的格子类型为 c.BG_SELECT
-                    self.bg_map[res[1]][res[0]] = c.BG_SELECT
+                    self.setBackground(res[0], res[1], c.BG_SELECT)
                     # 设置鼠标所在地图格子类型为 c.BG_ATTACK
-                    self.bg_map[map_y][map_x] = c.BG_ATTACK
+                    self.bg_map[index] = c.BG_ATTACK
                     # 保存距离最小格子的地图位置
                     self.select = res
        
+    def getMouseKey(self, mouse_pos):
+        # 返回鼠标所在的格子位置，鼠标在敌方生物上时，选择的攻击位置和鼠标坐标有关，同时返回鼠标坐标
+        map_x, map_y = self.getMapIndex(*mouse_pos)
+        if self.isValid(map_x, map_y):
+            entity = self.entity_map[self.getCellIndex(map_x, map_y)]
+            if entity is not None and entity.group_id != self.active_entity.group_id:
+                return (map_x, map_y, mouse_pos)
+        return (map_x, map_y)
+
     def updateMapShow(self, mouse_pos):
-        self.resetBackGround()
-        
-        if self.active_entity is None or self.active_entity.state != c.IDLE:
+        '''每一帧调用，只在行动生物，生物状态，地图版本或者鼠标所在的格子改变时重新计算背景显示'''
+        entity = self.active_entity
+        show_key = (entity, None if entity is None else entity.state, self.version)
+        if show_key == self.show_key and mouse_pos == self.mouse_pos:
+            # 输入都没有改变
             return
-        
-        self.showActiveEntityRange()
-        self.checkMouseMove(mouse_pos)
+        self.mouse_pos = mouse_pos
+        if show_key != self.show_key:
+            # 重新计算行动生物的行走范围
+            self.resetBackGround()
+            if entity is not None and entity.state == c.IDLE:
+                self.showActiveEntityRange()
+            self.range_bg[:] = self.bg_map
+            self.show_key = show_key
+            self.mouse_key = None
+
+        if entity is None or entity.state != c.IDLE:
+            return
+        mouse_key = self.getMouseKey(mouse_pos)
+        if mouse_key != self.mouse_key:
+            # 鼠标移动到别的格子，在行走范围上重新显示鼠标所在的格子
+            self.mouse_key = mouse_key
+            self.bg_map[:] = self.range_bg
+            self.checkMouseMove(mouse_pos)
 
     def setEntity(self, map_x, map_y, value):
         # value 为 None，清除 entity_map 数组中指定位置的设置，
         # value 不为 None， 添加生物到 entity_map 数组中指定位置
-        self.entity_map[map_y][map_x] = value
+        index = self.getCellIndex(map_x, map_y)
+        if self.bitboard is not None:
+            self.bitboard.setEntity(index, self.entity_map[index], value)
+        self.entity_map[index] = value
+        movable = self.movable_map[index]
+        self.updateMovable(index)
+        if self.movable_map[index] != movable:
+            # 格子是否可以移动到改变了，更新连通区域标记
+            if self.movable_map[index]:
+                self.component_label.setMovable(index)
+            else:
+                self.component_label.setBlocked(index)
+        if self.cluster_graph is not None:
+            # 只需要重新创建格子所在的区块
+            self.cluster_graph.setDirty(index)
+        for planner in self.planner_list:
+            planner.setDirty(index)
+        self.updateVersion()
+
+    def addPlanner(self, planner):
+        '''添加一个增量路径搜索对象，setEntity 改变格子时通知它'''
+        self.planner_list.append(planner)
+
+    def removePlanner(self, planner):
+        '''生物行走结束时调用，删除增量路径搜索对象'''
+        if planner in self.planner_list:
+            self.planner_list.remove(planner)
+
+    def getDirtyCells(self):
+        '''比较 bg_map 和上次绘制时的背景颜色数组，返回背景颜色改变了的格子索引值列表'''
+        if self.bg_map == self.drawn_bg:
+            return []
+        # 两个数组转换成整数后做异或运算，值不为 0 的字节就是改变了的格子，每次取出最低的一个
+        diff = int.from_bytes(self.bg_map, 'little') ^ int.from_bytes(self.drawn_bg, 'little')
+        dirty = []
+        index = 0
+        while diff:
+            offset = ((diff & -diff).bit_length() - 1) >> 3
+            index += offset
+            dirty.append(index)
+            diff >>= (offset + 1) * 8
+            index += 1
+        return dirty
 
     def drawBackground(self, surface):
-        if c.MAP_HEXAGON:
-            return self.drawBackgroundHex(surface)
+        if self.bg_surface is None:
+            # 第一次绘制时绘制整个地图背景
+            self.bg_surface = pg.Surface((c.MAP_WIDTH, c.MAP_HEIGHT)).convert()
+            if c.MAP_HEXAGON:
+                self.drawBackgroundHex(self.bg_surface)
+            else:
+                self.drawBackgroundSquare(self.bg_surface)
         else:
-            return self.drawBackgroundSquare(surface)
+            # 只重新绘制背景颜色改变了的格子
+            for index in self.getDirtyCells():
+                if c.MAP_HEXAGON:
+                    self.drawCellHex(self.bg_surface, index)
+                else:
+                    self.drawCellSquare(self.bg_surface, index)
+        self.drawn_bg[:] = self.bg_map
+        surface.blit(self.bg_surface, (0, 0))
+
+    def getBackgroundColor(self, type):
+        # 返回背景格子类型的颜色
+        if type == c.BG_EMPTY:
+            color = c.LIGHTYELLOW
+        elif type == c.BG_ACTIVE:
+            color = c.SKY_BLUE
+        elif type == c.BG_RANGE:
+            color = c.NAVYBLUE
+        elif type == c.BG_SELECT:
+            color = c.GREEN
+        elif type == c.BG_ATTACK:
+            color = c.GOLD
+        return color
+
+    def getHexPoints(self, map_x, map_y):
+        # 返回六边形格子的六个顶点坐标
+        Y_LEN = c.HEX_Y_SIZE // 2
+        X_LEN = c.HEX_X_SIZE // 2
+        base_x, base_y = hexGeometry.getCellPixel(map_x, map_y)
+        return [(base_x, base_y + Y_LEN//2 + Y_LEN), (base_x, base_y + Y_LEN//2),
+                (base_x + X_LEN, base_y), (base_x + X_LEN * 2, base_y + Y_LEN//2),
+                (base_x + X_LEN * 2, base_y + Y_LEN//2 + Y_LEN), (base_x + X_LEN, base_y + Y_LEN*2)]
+
+    def getCellPixel(self, map_x, map_y):
+        # 返回地图格子外接矩形左上角的坐标值
+        if c.MAP_HEXAGON:
+            return hexGeometry.getCellPixel(map_x, map_y)
+        return (map_x * c.REC_SIZE, map_y * c.REC_SIZE)
+
+    def drawCells(self, surface, index_list):
+        # 按照 index_list 的顺序复制格子的背景图片，再绘制格子类型的图片和格子的边线
+        tile_list, bg_map, pixel_list = self.tile_list, self.bg_map, self.pixel_list
+        blit_list = [(tile_list[bg_map[index]], pixel_list[index]) for index in index_list]
+        blit_list.append((self.map_image, self.rect))
+        blit_list.append((self.grid_image, (0, 0)))
+        surface.blits(blit_list, False)
 
     def drawBackgroundSquare(self, surface):
         # 根据背景格子类型，设置地图格子为不同的颜色
-        for y in range(self.height):
-            for x in range(self.width):
-                if self.bg_map[y][x] == c.BG_EMPTY:
-                    color = c.LIGHTYELLOW
-                elif self.bg_map[y][x] == c.BG_ACTIVE:
-                    color = c.SKY_BLUE
-                elif self.bg_map[y][x] == c.BG_RANGE:
-                    color = c.NAVYBLUE
-                elif self.bg_map[y][x] == c.BG_SELECT:
-                    color = c.GREEN
-                elif self.bg_map[y][x] == c.BG_ATTACK:
-                    color = c.GOLD
-                
-                pg.draw.rect(surface, color, (x * c.REC_SIZE, y * c.REC_SIZE, 
-                        c.REC_SIZE, c.REC_SIZE))
-        
-        # 绘制格子类型的图片
-        surface.blit(self.map_image, self.rect)
+        self.drawCells(surface, range(self.size))
 
-        # 绘制地图每一行的线
-        for y in range(self.height):
-            # 根据当前的行值，计算y轴的值为(c.REC_SIZE * y)
-            start_pos = (0, 0 + c.REC_SIZE * y)
-            end_pos = (c.MAP_WIDTH, c.REC_SIZE * y)
-            pg.draw.line(surface, c.BLACK, start_pos, end_pos, 1)
-        
-        # 绘制地图每一列的线
-        for x in range(self.width):
-            # 根据当前的列值，计算x轴的值为(c.REC_SIZE * x)
-            start_pos = (c.REC_SIZE * x, 0) 
-            end_pos = (c.REC_SIZE * x, c.MAP_HEIGHT)
-            pg.draw.line(surface, c.BLACK, start_pos, end_pos, 1)
+    def drawCellSquare(self, surface, index):
+        # 重新绘制一个格子，只绘制格子的矩形区域，和绘制整个背景时的结果一样
+        surface.set_clip(pg.Rect(self.pixel_list[index], (c.REC_SIZE, c.REC_SIZE)))
+        self.drawCells(surface, [index])
+        surface.set_clip(None)
 
     def drawBackgroundHex(self, surface):
-        Y_LEN = c.HEX_Y_SIZE // 2
-        X_LEN = c.HEX_X_SIZE // 2
-
         pg.draw.rect(surface, c.LIGHTYELLOW, pg.Rect(0, 0, c.MAP_WIDTH, c.MAP_HEIGHT))
+        self.drawCells(surface, range(self.size))
 
-        for y in range(self.height):
-            for x in range(self.width):
-                if self.bg_map[y][x] == c.BG_EMPTY:
-                    color = c.LIGHTYELLOW
-                elif self.bg_map[y][x] == c.BG_ACTIVE:
-                    color = c.SKY_BLUE
-                elif self.bg_map[y][x] == c.BG_RANGE:
-                    color = c.NAVYBLUE
-                elif self.bg_map[y][x] == c.BG_SELECT:
-                    color = c.GREEN
-                elif self.bg_map[y][x] == c.BG_ATTACK:
-                    color = c.GOLD
-
-                base_x, base_y = tool.getHexMapPos(x, y)
-                # 六边形格子的六个顶点坐标
-                points = [(base_x, base_y + Y_LEN//2 + Y_LEN), (base_x, base_y + Y_LEN//2),
-                          (base_x + X_LEN, base_y), (base_x + X_LEN * 2, base_y + Y_LEN//2),
-                          (base_x + X_LEN * 2, base_y + Y_LEN//2 + Y_LEN), (base_x + X_LEN, base_y + Y_LEN*2)]
-                pg.draw.polygon(surface, color, points)
-
-        surface.blit(self.map_image, self.rect)
-
-        for y in range(self.height):
-            for x in range(self.width):
-                if y % 2 == 0:
-                    base_x = X_LEN * 2 * x
-                    base_y = Y_LEN * 3 * (y//2)
-                else:
-                    if x == self.width - 1:
-                        continue
-                    base_x = X_LEN * 2 * x + X_LEN
-                    base_y = Y_LEN * 3 * (y//2) + Y_LEN//2 + Y_LEN
-                # 六边形格子的六个顶点坐标
-                points = [(base_x, base_y + Y_LEN//2 + Y_LEN), (base_x, base_y + Y_LEN//2),
-                          (base_x + X_LEN, base_y), (base_x + X_LEN * 2, base_y + Y_LEN//2),
-                          (base_x + X_LEN * 2, base_y + Y_LEN//2 + Y_LEN), (base_x + X_LEN, base_y + Y_LEN*2)]
-                pg.draw.lines(surface, c.BLACK, True, points)
\ No newline at end of file
+    def drawCellHex(self, surface, index):
+        # 重新绘制一个格子，只绘制格子的外接矩形区域。外接矩形中还有相邻格子的一部分，
+        # 按照绘制整个背景时的顺序重新绘制格子和相邻格子，结果和绘制整个背景时一样
+        map_x, map_y = self.getCellPos(index)
+        # 格子右边和下边的顶点也在外接矩形中
+        rect = pg.Rect(self.pixel_list[index], (c.HEX_X_SIZE + 1, c.HEX_Y_SIZE + 1))
+        index_list = [index] + [self.getCellIndex(x, y) for x, y in hexGeometry.getNeighbors(map_x, map_y)
+                        if 0 <= x < self.width and 0 <= y < self.height]
+        index_list.sort()
+        surface.set_clip(rect)
+        pg.draw.rect(surface, c.LIGHTYELLOW, rect)
+        self.drawCells(surface, index_list)
+        surface.set_clip(None)
@@ -0,0 +1,74 @@
+'''路径搜索的统计信息，记录每次搜索扩展的节点数量，加入 open 列表的节点数量，open 列表的最大长度，
+   路径长度和搜索时间，并按照每一帧和每个生物的行动回合累加'''
+import time
+
+class SearchStats():
+    def __init__(self, enabled=False):
+        # 没有启用时搜索函数不计时也不记录
+        self.enabled = enabled
+        # 最近一次搜索的统计信息
+        self.last = None
+        # 当前帧，当前回合和所有搜索的累加统计信息，以及上一帧和上一回合的统计信息
+        self.frame = self.createRecord()
+        self.turn = self.createRecord()
+        self.total = self.createRecord()
+        self.last_frame = self.createRecord()
+        self.last_turn = self.createRecord()
+
+    def createRecord(self):
+        # 创建一个空的累加统计信息
+        return {'calls':0, 'expanded':0, 'pushed':0, 'peak_open':0, 'path_length':0, 'elapsed':0.0}
+
+    def record(self, name, expanded, pushed, peak_open, path_length, elapsed):
+        '''记录一次搜索的统计信息，path_length 是 None 表示没有找到路径'''
+        self.last = {'name':name, 'expanded':expanded, 'pushed':pushed, 'peak_open':peak_open,
+                     'path_length':path_length, 'elapsed':elapsed}
+        for record in (self.frame, self.turn, self.total):
+            record['calls'] += 1
+            record['expanded'] += expanded
+            record['pushed'] += pushed
+            record['peak_open'] = max(record['peak_open'], peak_open)
+            if path_length is not None:
+                record['path_length'] += path_length
+            record['elapsed'] += elapsed
+
+    def startFrame(self):
+        '''每一帧开始时调用，保存上一帧的统计信息'''
+        self.last_frame = self.frame
+        self.frame = self.createRecord()
+
+    def startTurn(self):
+        '''每个生物开始行动时调用，保存上一回合的统计信息'''
+        self.last_turn = self.turn
+        self.turn = self.createRecord()
+
+    def reset(self):
+        # 清空所有统计信息
+        self.__init__(self.enabled)
+
+    def getStats(self):
+        '''返回统计信息的字典'''
+        return {'enabled':self.enabled, 'last':self.last, 'frame':dict(self.frame), 'turn':dict(self.turn),
+                'total':dict(self.total), 'last_frame':dict(self.last_frame), 'last_turn':dict(self.last_turn)}
+
+def getStartTime(map):
+    '''搜索开始时调用，没有启用统计时返回 None，不用计时'''
+    if map.search_stats.enabled:
+        return time.perf_counter()
+    return None
+
+def recordSearch(map, start_time, name, expanded, pushed, peak_open, path_length, counter=None):
+    '''搜索结束时调用，counter 不为 None 时把统计信息保存到 counter 字典中，
+       start_time 不为 None 时记录到地图的统计信息中'''
+    if counter is not None:
+        counter.update(expanded=expanded, pushed=pushed, peak_open=peak_open, path_length=path_length)
+    if start_time is not None:
+        map.search_stats.record(name, expanded, pushed, peak_open, path_length, time.perf_counter() - start_time)
+
+def getLayerPeak(cost_list):
+    '''广度优先搜索的 open 列表最多时包含同一距离的所有格子，返回格子最多的一层的格子数量'''
+    count_dict = {}
+    for cost in cost_list:
+        if cost >= 0:
+            count_dict[cost] = count_dict.get(cost, 0) + 1
+    return max(count_dict.values()) if len(count_dict) > 0 else 0
@@ -3,6 +3,7 @@ import json # 加载 json 模块
 from abc import abstractmethod
 import pygame as pg  # 为了书写方便，将 pygame 缩写为pg
 from . import constants as c # 为了书写方便，将constants缩写为c
+from . import hexGeometry
 
 class State():
     def __init__(self):
@@ -157,11 +158,8 @@ def load_entiry_attr(file_path):
 
 def getMovePositions(x, y):
     if c.MAP_HEXAGON:
-        # 根据当前地图格子 Y 轴的位置返回相邻的六个六边形格子位置
-        if y % 2 == 0:
-            offsets = [(-1, 0), (-1, -1), (0, -1), (1, 0), (-1, 1), (0, 1)]
-        else:
-            offsets = [(-1, 0), (0, -1), (1, -1), (1, 0), (0, 1), (1, 1)]
+        # 根据当前地图格子 Y 轴位置的奇偶返回相邻的六个六边形格子位置
+        offsets = list(hexGeometry.OFFSET_DIRECTIONS[y & 1])
     else:
         # 从当前的格子可以移动到相邻的左边，上面，右边，下面四个格子
         offsets = [(-1,0), (0, -1), (1, 0), (0, 1)]
@@ -174,90 +172,6 @@ def getAttackPositions(x, y):
     else:
         return [(-1,-1), (-1,0), (-1,1), (0,-1), (0,1), (1,-1),(1,0), (1,1)]
 
-def isNextToEntity(entity1, entity2):
-    # 判断两个生物是否在相邻可攻击的地图位置
-    dir_list = getAttackPositions(entity1.map_x, entity1.map_y)
-    for offset_x, offset_y in dir_list:
-        x, y = entity1.map_x + offset_x, entity1.map_y + offset_y
-        if x == entity2.map_x and y == entity2.map_y:
-            return True
-    return False
-
-def getHexMapPos(x, y):
-    # 根据地图格子位置返回对应的坐标值
-    X_LEN = c.HEX_X_SIZE // 2
-    Y_LEN = c.HEX_Y_SIZE // 2
-    if y % 2 == 0:
-        base_x = X_LEN * 2 * x
-        base_y = Y_LEN * 3 * (y//2)
-    else:
-        base_x = X_LEN * 2 * x + X_LEN
-        base_y = Y_LEN * 3 * (y//2) + Y_LEN//2 + Y_LEN
-    return (base_x, base_y)
-
-class Vector2d():
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-
-    def minus(self, vec):
-        return Vector2d(self.x - vec.x, self.y - vec.y)
-
-    def crossProduct(self, vec):
-        return (self.x * vec.y - self.y * vec.x)
-
-def isInTriangle(x1, y1, x2, y2, x3, y3, x, y):
-    # 判断坐标 (x,y) 是否在三角形中
-    A = Vector2d(x1, y1)
-    B = Vector2d(x2, y2)
-    C = Vector2d(x3, y3)
-    P = Vector2d(x, y)
-    PA = A.minus(P)
-    PB = B.minus(P)
-    PC = C.minus(P)
-    t1 = PA.crossProduct(PB)
-    t2 = PB.crossProduct(PC)
-    t3 = PC.crossProduct(PA)
-    if (t1 * t2 >= 0) and (t1 * t3 >= 0):
-        return True
-    return False
-
-def getHexMapIndex(x, y):
-    # 根据坐标返回所在六边形格子的地图位置
-    X_LEN = c.HEX_X_SIZE // 2
-    Y_LEN = c.HEX_Y_SIZE // 2
-    tmp_x, offset_x = divmod(x, c.HEX_X_SIZE)
-    tmp_y, offset_y = divmod(y, Y_LEN * 3)
-    map_x, map_y = 0, 0
-    if offset_y <= (Y_LEN + Y_LEN//2):
-        if offset_y >= Y_LEN//2:
-            map_x, map_y = tmp_x, tmp_y * 2
-        else:
-            triangle_list = [(0, 0, 0, Y_LEN//2, X_LEN, 0),
-                             (0, Y_LEN//2, X_LEN, 0, c.HEX_X_SIZE, Y_LEN//2),
-                             (X_LEN, 0, c.HEX_X_SIZE, 0, c.HEX_X_SIZE, Y_LEN//2)]
-            map_list = [(tmp_x - 1, tmp_y * 2 -1), (tmp_x, tmp_y * 2), (tmp_x, tmp_y * 2 -1)]
-            for i, data in enumerate(triangle_list):
-                if isInTriangle(*data, offset_x, offset_y):
-                    map_x, map_y = map_list[i]
-                    break
-    elif offset_y >= c.HEX_Y_SIZE:
-        if offset_x <= X_LEN:
-            map_x, map_y = tmp_x - 1, tmp_y * 2 + 1
-        else:
-            map_x, map_y = tmp_x, tmp_y *2 + 1
-    else:
-        triangle_list = [(0, Y_LEN + Y_LEN//2, 0, c.HEX_Y_SIZE, X_LEN, c.HEX_Y_SIZE),
-                         (0, Y_LEN + Y_LEN//2, X_LEN, c.HEX_Y_SIZE, c.HEX_X_SIZE, Y_LEN + Y_LEN//2),
-                         (X_LEN, c.HEX_Y_SIZE, c.HEX_X_SIZE, Y_LEN + Y_LEN//2, c.HEX_X_SIZE, c.HEX_Y_SIZE)]
-        map_list = [(tmp_x - 1, tmp_y * 2 + 1), (tmp_x, tmp_y * 2), (tmp_x, tmp_y *2 + 1)]
-        for i, data in enumerate(triangle_list):
-            if isInTriangle(*data, offset_x, offset_y):
-                map_x, map_y = map_list[i]
-                break
-
-    return (map_x, map_y)
-
 
 # pygame的初始化
 pg.init()
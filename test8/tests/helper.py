@@ -0,0 +1,106 @@
+'''测试使用的公共函数，创建随机地图和计算作为参考的最短距离。
+   在 test8 目录中运行：python -m unittest discover tests'''
+import os
+import sys
+import heapq
+import random
+import unittest
+
+# tool 模块加载时会创建窗口并加载图片，使用不显示窗口的驱动，并且从游戏的根目录加载资源
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.chdir(ROOT_DIR)
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from source import constants as c
+from source import map
+
+class Blocker():
+    # 放在格子上挡住路径的生物
+    def __init__(self, group_id=0):
+        self.group_id = group_id
+
+def createMap(rnd, hexagon, weighted, stone_rate=0.25, max_size=24):
+    # 创建随机大小的地图，随机放置石头和草地，weighted 为 True 时草地和空格子的行走距离不同
+    c.MAP_HEXAGON = hexagon
+    width, height = rnd.randint(2, max_size), rnd.randint(2, max_size)
+    grid = []
+    for y in range(height):
+        for x in range(width):
+            value = rnd.random()
+            if value < stone_rate:
+                grid.append({'x':x, 'y':y, 'type':c.MAP_STONE})
+            elif value < stone_rate * 2:
+                grid.append({'x':x, 'y':y, 'type':c.MAP_GRASS})
+    test_map = map.Map(width, height, grid)
+    if weighted:
+        test_map.setMoveCost({c.MAP_EMPTY:rnd.randint(1, 2), c.MAP_GRASS:rnd.randint(1, 5)})
+    return test_map
+
+def getMovableCells(test_map):
+    # 返回所有可以移动到的格子位置列表
+    return [test_map.getCellPos(index) for index in range(test_map.size) if test_map.movable_map[index]]
+
+def dijkstra(test_map, source_index, passable=()):
+    # 从 source 格子开始的 Dijkstra 搜索，source 格子和 passable 中的格子可以有生物，
+    # 返回到每个格子的行走距离列表，不能到达的格子值为 None
+    distances = [None] * test_map.size
+    distances[source_index] = 0
+    open_heap = [(0, source_index)]
+    while len(open_heap) > 0:
+        g_cost, index = heapq.heappop(open_heap)
+        if g_cost > distances[index]:
+            continue
+        for next in test_map.move_table[index]:
+            if not test_map.movable_map[next] and next not in passable:
+                continue
+            next_g = g_cost + test_map.cost_map[next]
+            if distances[next] is None or next_g < distances[next]:
+                distances[next] = next_g
+                heapq.heappush(open_heap, (next_g, next))
+    return distances
+
+def getEntryCost(location):
+    # 返回路径节点链表的行走距离，找不到路径时返回 None
+    return None if location is None else location.g_cost
+
+def getEntryCells(test_map, location):
+    # 返回路径节点链表从开始位置到目的位置的格子索引值列表
+    cells = []
+    while location is not None:
+        cells.append(test_map.getCellIndex(*location.getPos()))
+        location = location.pre_entry
+    return cells[::-1]
+
+
+class SearchTestCase(unittest.TestCase):
+    def setUp(self):
+        # 测试会修改地图类型，测试结束后恢复
+        self.hexagon = c.MAP_HEXAGON
+        if not hasattr(c, 'REC_SIZE'):
+            c.REC_SIZE = 50
+            self.addCleanup(delattr, c, 'REC_SIZE')
+
+    def tearDown(self):
+        c.MAP_HEXAGON = self.hexagon
+
+    def getMaps(self, seed_num, weighted, **kwargs):
+        # 依次返回 (随机数生成器, 地图)，六边形和正方形地图各 seed_num 个
+        for hexagon in (True, False):
+            for seed in range(seed_num):
+                rnd = random.Random(seed)
+                test_map = createMap(rnd, hexagon, weighted, **kwargs)
+                if len(getMovableCells(test_map)) >= 3:
+                    yield rnd, test_map
+
+    def getQueries(self, seed_num, weighted, query_num=5):
+        # 依次返回 (随机数生成器, 地图, 开始位置, 目的位置)，地图上随机放两个生物。
+        # 生物所在的格子不能移动到，但是可以作为开始位置
+        for rnd, test_map in self.getMaps(seed_num, weighted):
+            cells = getMovableCells(test_map)
+            for pos in rnd.sample(cells, 2):
+                test_map.setEntity(*pos, Blocker())
+            for _ in range(query_num):
+                source, dest = rnd.sample(cells, 2)
+                yield rnd, test_map, source, dest
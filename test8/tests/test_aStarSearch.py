@@ -0,0 +1,136 @@
+'''aStarSearch 模块的测试，在随机的六边形和正方形地图上和 Dijkstra 搜索的结果比较'''
+import unittest
+import helper
+from source import constants as c
+from source import aStarSearch
+
+class AStarSearchTest(helper.SearchTestCase):
+    def testShortestPath(self):
+        # A* 搜索和 getPath 返回最短路径，路径上每一步都相邻并且可以经过
+        for rnd, test_map, source, dest in self.getQueries(60, False):
+            source_index, dest_index = test_map.getCellIndex(*source), test_map.getCellIndex(*dest)
+            expected = helper.dijkstra(test_map, source_index)[dest_index]
+            with self.subTest(size=(test_map.width, test_map.height), source=source, dest=dest):
+                location = aStarSearch.AStarSearch(test_map, source, dest)
+                self.assertEqual(helper.getEntryCost(location), expected)
+                if location is not None:
+                    cells = helper.getEntryCells(test_map, location)
+                    self.assertEqual((cells[0], cells[-1]), (source_index, dest_index))
+                    for index, next in zip(cells, cells[1:]):
+                        self.assertIn(next, test_map.move_table[index])
+                        self.assertTrue(test_map.movable_map[next])
+                path = aStarSearch.getPath(test_map, source, dest)
+                self.assertEqual(None if path is None else path.getCost(), expected)
+
+    def testSamePosition(self):
+        # 开始位置和目的位置相同时，A* 返回只有一个节点的链表，getPath 返回 None
+        for rnd, test_map in self.getMaps(5, False):
+            pos = helper.getMovableCells(test_map)[0]
+            self.assertEqual(aStarSearch.AStarSearch(test_map, pos, pos).getPos(), pos)
+            self.assertIsNone(aStarSearch.getPath(test_map, pos, pos))
+
+    def testAStarDistance(self):
+        # getAStarDistance 返回最短路径的步数，开始位置和目的位置相同时是 0
+        for rnd, test_map, source, dest in self.getQueries(20, False, 2):
+            expected = helper.dijkstra(test_map, test_map.getCellIndex(*source))[test_map.getCellIndex(*dest)]
+            self.assertEqual(aStarSearch.getAStarDistance(test_map, source, dest), expected)
+            self.assertEqual(aStarSearch.getAStarDistance(test_map, source, source), 0)
+
+
+class ReachableAreaTest(helper.SearchTestCase):
+    def testAreaCost(self):
+        # 行走范围中每个格子的行走距离和 Dijkstra 搜索一样，超过 max_distance 的格子不在范围中
+        for rnd, test_map, source, dest in self.getQueries(40, False, 2):
+            expected = helper.dijkstra(test_map, test_map.getCellIndex(*source))
+            max_distance = rnd.randint(0, 12)
+            area = aStarSearch.searchReachableArea(test_map, source, max_distance)
+            for index in range(test_map.size):
+                cost = expected[index]
+                self.assertEqual(area.getCost(index), cost if cost is not None and cost <= max_distance else None)
+            self.assertEqual(sorted(area.index_list), [index for index in range(test_map.size)
+                             if area.getCost(index) is not None])
+            for index in area.index_list:
+                # 路径节点链表从开始位置走到格子，行走距离和范围中的距离一样
+                cells = helper.getEntryCells(test_map, area.getEntry(index))
+                self.assertEqual((cells[0], cells[-1]), (area.source, index))
+                self.assertEqual(len(cells) - 1, area.getCost(index))
+
+
+class ReachableTest(helper.SearchTestCase):
+    def testIsReachable(self):
+        # isReachable 和 Map.isInRange 判断行走距离是否小于等于 max_distance
+        for rnd, test_map, source, dest in self.getQueries(60, False):
+            distance = helper.dijkstra(test_map, test_map.getCellIndex(*source))[test_map.getCellIndex(*dest)]
+            for max_distance in (rnd.randint(0, 12), distance):
+                if max_distance is None:
+                    continue
+                expected = distance is not None and distance <= max_distance
+                self.assertEqual(aStarSearch.isReachable(test_map, source, dest, max_distance), expected)
+                self.assertEqual(test_map.isInRange(*source, *dest, max_distance), expected)
+            if distance is not None and distance > 0:
+                self.assertFalse(aStarSearch.isReachable(test_map, source, dest, distance - 1))
+
+
+class GoalEntriesTest(helper.SearchTestCase):
+    def testGoalEntries(self):
+        # 每个目的格子的路径距离是到这个格子的最短距离，每组目的格子中至少找到一个最近的格子，
+        # 设置 max_distance 时超过 max_distance 的组找不到格子
+        for rnd, test_map in self.getMaps(40, True):
+            cells = helper.getMovableCells(test_map)
+            source = rnd.choice(cells)
+            expected = helper.dijkstra(test_map, test_map.getCellIndex(*source))
+            goal_groups = [[test_map.getCellIndex(*pos) for pos in rnd.sample(cells, min(3, len(cells)))]
+                           for _ in range(3)]
+            max_distance = rnd.choice([None, rnd.randint(0, 10)])
+            entries = aStarSearch.getGoalEntries(test_map, source, goal_groups, max_distance)
+            for index, path in entries.items():
+                self.assertEqual(path.getCost(), expected[index])
+                self.assertEqual((path[0], path.getDest()), (source, test_map.getCellPos(index)))
+            for group in goal_groups:
+                costs = [expected[index] for index in group if expected[index] is not None
+                         and (max_distance is None or expected[index] <= max_distance)]
+                found = [entries[index].getCost() for index in group if index in entries]
+                self.assertEqual(min(found, default=None), min(costs, default=None))
+
+
+class BidirectionalSearchTest(helper.SearchTestCase):
+    def testShortestPath(self):
+        # 双向搜索返回最短路径，counter 保存扩展的节点数量和路径长度
+        for rnd, test_map, source, dest in self.getQueries(60, False):
+            source_index, dest_index = test_map.getCellIndex(*source), test_map.getCellIndex(*dest)
+            expected = helper.dijkstra(test_map, source_index)[dest_index]
+            counter = {}
+            location = aStarSearch.BidirectionalSearch(test_map, source, dest, counter)
+            self.assertEqual(helper.getEntryCost(location), expected)
+            self.assertEqual(counter['path_length'], expected)
+            self.assertIn('expanded', counter)
+            if location is not None:
+                cells = helper.getEntryCells(test_map, location)
+                self.assertEqual((cells[0], cells[-1]), (source_index, dest_index))
+                for index, next in zip(cells, cells[1:]):
+                    self.assertIn(next, test_map.move_table[index])
+
+    def testPathSearchOverride(self):
+        # 每次搜索可以指定算法，不改变地图设置的算法，不同算法的结果分别缓存
+        for rnd, test_map, source, dest in self.getQueries(20, False, 2):
+            expected = aStarSearch.searchPath(test_map, source, dest)
+            path = aStarSearch.searchPath(test_map, source, dest, c.SEARCH_BIDIRECTIONAL)
+            self.assertEqual(test_map.path_search, c.SEARCH_ASTAR)
+            self.assertEqual(None if path is None else path.getCost(),
+                             None if expected is None else expected.getCost())
+            self.assertIs(aStarSearch.searchPath(test_map, source, dest), expected)
+            self.assertIs(aStarSearch.searchPath(test_map, source, dest, c.SEARCH_BIDIRECTIONAL), path)
+
+    def testCounter(self):
+        # 传入 counter 时一定重新搜索并保存统计信息，结果仍然保存到缓存中
+        for rnd, test_map, source, dest in self.getQueries(10, False, 2):
+            aStarSearch.searchPath(test_map, source, dest)
+            for path_search in (None, c.SEARCH_BIDIRECTIONAL, c.SEARCH_JPS, c.SEARCH_HPA, c.SEARCH_DIAL):
+                counter = {}
+                path = aStarSearch.getPath(test_map, source, dest, path_search, counter)
+                self.assertEqual(counter['path_length'] is None, path is None)
+                self.assertIs(aStarSearch.searchPath(test_map, source, dest, path_search) is None, path is None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+'''bitboard 模块的测试，位棋盘计算的结果和桶队列搜索比较'''
+import unittest
+import helper
+from source import bitboard, aStarSearch
+
+class Attr():
+    def __init__(self, distance):
+        self.distance = distance
+
+class Unit(helper.Blocker):
+    # 有行走距离的生物
+    def __init__(self, map_x, map_y, group_id, distance):
+        super().__init__(group_id)
+        self.map_x, self.map_y = map_x, map_y
+        self.attr = Attr(distance)
+
+class BitboardTest(helper.SearchTestCase):
+    def testReachableArea(self):
+        # 位棋盘的行走范围和桶队列搜索的一样，每个格子的路径长度等于行走距离
+        for rnd, test_map, source, dest in self.getQueries(40, False, 2):
+            self.assertIsNotNone(test_map.bitboard)
+            max_distance = rnd.randint(0, 12)
+            area = bitboard.getReachableArea(test_map, source, max_distance)
+            expected = aStarSearch.searchReachableArea(test_map, source, max_distance)
+            self.assertEqual(area.index_list[0], expected.source)
+            self.assertEqual(sorted(area.index_list), sorted(expected.index_list))
+            for index in range(test_map.size):
+                self.assertEqual(area.getCost(index), expected.getCost(index))
+                self.assertEqual(area.isInArea(index), expected.getCost(index) is not None)
+            for index in area.index_list:
+                cells = helper.getEntryCells(test_map, area.getEntry(index))
+                self.assertEqual((cells[0], cells[-1]), (expected.source, index))
+                self.assertEqual(len(cells) - 1, area.getCost(index))
+                for cell, next in zip(cells, cells[1:]):
+                    self.assertIn(next, test_map.move_table[cell])
+
+    def testEntityBits(self):
+        # 生物改变后增量更新的位棋盘和重新创建的一样，可以移动到的格子和 movable_map 一样
+        for rnd, test_map in self.getMaps(20, False):
+            cells = helper.getMovableCells(test_map)
+            for _ in range(20):
+                pos = rnd.choice(cells)
+                entity = None if rnd.random() < 0.4 else helper.Blocker(rnd.randint(1, 2))
+                test_map.setEntity(*pos, entity)
+                board = test_map.bitboard
+                expected = bitboard.Bitboard(test_map)
+                self.assertEqual((board.entity_bits, board.terrain_bits), (expected.entity_bits, expected.terrain_bits))
+                self.assertEqual({key: bits for key, bits in board.group_bits.items() if bits},
+                                 {key: bits for key, bits in expected.group_bits.items() if bits})
+                movable = [index for index in range(test_map.size) if test_map.movable_map[index]]
+                self.assertEqual(bitboard.getIndexList(board.getMovableBits()), movable)
+
+    def testThreatBits(self):
+        # 威胁范围是每个生物的行走范围和行走范围中格子的可攻击相邻格子
+        for rnd, test_map in self.getMaps(20, False):
+            cells = helper.getMovableCells(test_map)
+            units = [Unit(x, y, 1, rnd.randint(1, 4)) for x, y in rnd.sample(cells, 3)]
+            for unit in units:
+                test_map.setEntity(unit.map_x, unit.map_y, unit)
+            expected = set()
+            for unit in units:
+                area = aStarSearch.searchReachableArea(test_map, (unit.map_x, unit.map_y), unit.attr.distance)
+                for index in area.index_list:
+                    expected.add(index)
+                    expected.update(next for next in test_map.attack_table[index]
+                                    if test_map.isValid(*test_map.getCellPos(next)) and
+                                    test_map.grid_map[next] != helper.c.MAP_STONE)
+            self.assertEqual(bitboard.getIndexList(test_map.getThreatBits(units)), sorted(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
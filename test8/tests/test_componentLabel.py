@@ -0,0 +1,49 @@
+'''componentLabel 模块的测试'''
+import unittest
+import helper
+from source import componentLabel
+
+class ComponentLabelTest(helper.SearchTestCase):
+    def changeEntities(self, rnd, test_map, cells, entities):
+        # 随机放置或者移走一个生物，返回改变的格子位置
+        if len(entities) > 0 and rnd.random() < 0.4:
+            pos = entities.pop(rnd.randrange(len(entities)))
+            test_map.setEntity(*pos, None)
+            return pos
+        pos = rnd.choice(cells)
+        if test_map.isMovable(*pos):
+            test_map.setEntity(*pos, helper.Blocker())
+            entities.append(pos)
+        return pos
+
+    def testIncrementalUpdate(self):
+        # 生物改变后增量更新的连通区域标记和广度优先搜索的结果一样
+        for rnd, test_map in self.getMaps(30, False):
+            cells = helper.getMovableCells(test_map)
+            entities = []
+            for _ in range(20):
+                self.changeEntities(rnd, test_map, cells, entities)
+                source_index = test_map.getCellIndex(*rnd.choice(cells))
+                expected = helper.dijkstra(test_map, source_index)
+                for index in range(test_map.size):
+                    reachable = index == source_index or (test_map.movable_map[index] == 1 and
+                                                         expected[index] is not None)
+                    self.assertEqual(test_map.isConnected(source_index, index), reachable)
+
+    def testSameAsRebuild(self):
+        # 增量更新后的连通区域划分和重新创建的一样，id 可以不同，每个连通区域的格子数量正确
+        for rnd, test_map in self.getMaps(20, False, stone_rate=0.1):
+            cells = helper.getMovableCells(test_map)
+            entities = []
+            for _ in range(30):
+                self.changeEntities(rnd, test_map, cells, entities)
+                label = test_map.component_label
+                expected = componentLabel.ComponentLabel(test_map)
+                pairs = set(zip(label.label_list, expected.label_list))
+                self.assertEqual(len(pairs), len(set(label.label_list)))
+                self.assertEqual(len(pairs), len(set(expected.label_list)))
+                self.assertEqual(sorted(label.size_dict.values()), sorted(expected.size_dict.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+'''多个生物一起规划路径的协作 A* 搜索的测试'''
+import unittest
+import helper
+from source import entity
+
+class Walker(helper.Blocker):
+    # 一起规划路径的生物
+    def __init__(self, map_x, map_y):
+        super().__init__(1)
+        self.map_x, self.map_y = map_x, map_y
+
+class CooperativeSearchTest(helper.SearchTestCase):
+    def getPlans(self, seed_num):
+        # 依次返回 (地图, 生物列表, {生物: 目的位置}, {生物: 路径对象})
+        for rnd, test_map in self.getMaps(seed_num, False, stone_rate=0.08, max_size=14):
+            cells = helper.getMovableCells(test_map)
+            walker_num = min(len(cells) // 4, 6)
+            if walker_num < 2:
+                continue
+            cells = rnd.sample(cells, walker_num * 2)
+            group = entity.EntityGroup(1)
+            for x, y in cells[:walker_num]:
+                walker = Walker(x, y)
+                group.group.append(walker)
+                test_map.setEntity(x, y, walker)
+            destinations = dict(zip(group.group, cells[walker_num:]))
+            yield test_map, group.group, destinations, group.planPaths(test_map, destinations)
+
+    def testNoCollision(self):
+        # 按照路径同时行走时，任何时间两个生物不在同一个格子，也不会交换位置，每一步相邻或者原地等待
+        for test_map, walkers, destinations, paths in self.getPlans(60):
+            def getCell(walker, time):
+                path = paths[walker]
+                if path is None:
+                    return test_map.getCellIndex(walker.map_x, walker.map_y)
+                return path.index_list[min(time, len(path.index_list) - 1)]
+
+            end_time = max(len(path.index_list) for path in paths.values() if path is not None)
+            for time in range(end_time + 1):
+                cells = [getCell(walker, time) for walker in walkers]
+                self.assertEqual(len(set(cells)), len(cells))
+                if time == 0:
+                    continue
+                moves = set()
+                for walker in walkers:
+                    index, next = getCell(walker, time - 1), getCell(walker, time)
+                    self.assertTrue(next == index or next in test_map.move_table[index])
+                    self.assertTrue(test_map.movable_map[next] or test_map.entity_map[next] in walkers)
+                    if next != index:
+                        self.assertNotIn((next, index), moves)
+                        moves.add((index, next))
+
+    def testSingleWalker(self):
+        # 只规划一个生物时，其他生物是障碍，窗口内可以到达的目的位置的路径是最短路径
+        for test_map, walkers, destinations, paths in self.getPlans(30):
+            walker = walkers[0]
+            group = entity.EntityGroup(1)
+            group.group = [walker]
+            path = group.planPaths(test_map, {walker: destinations[walker]})[walker]
+            source_index = test_map.getCellIndex(walker.map_x, walker.map_y)
+            dest_index = test_map.getCellIndex(*destinations[walker])
+            expected = helper.dijkstra(test_map, source_index)[dest_index]
+            if expected is None:
+                self.assertIsNone(path)
+            elif expected < helper.c.COOPERATIVE_WINDOW:
+                self.assertEqual((path.index_list[-1], path.getCost()), (dest_index, expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+'''distanceField 模块的测试，距离场和 Dijkstra 搜索的结果比较'''
+import unittest
+from unittest import mock
+import helper
+from source import constants as c
+from source import distanceField, aStarSearch
+
+class DistanceFieldTest(helper.SearchTestCase):
+    def checkField(self, weighted):
+        # 多个开始位置的距离场等于到每个开始位置的最短距离中最小的一个
+        for rnd, test_map, source, dest in self.getQueries(40, weighted, 1):
+            sources = rnd.sample(helper.getMovableCells(test_map), rnd.randint(1, 3)) + [source]
+            distances = [helper.dijkstra(test_map, test_map.getCellIndex(*pos)) for pos in sources]
+            max_distance = rnd.choice([None, rnd.randint(0, 10)])
+            field = distanceField.getDistanceField(test_map, sources, max_distance)
+            for index in range(test_map.size):
+                costs = [distance[index] for distance in distances if distance[index] is not None]
+                expected = min(costs, default=None)
+                if expected is not None and max_distance is not None and expected > max_distance:
+                    expected = None
+                self.assertEqual(field.getCost(index), expected)
+
+    @unittest.skipIf(distanceField.np is None, 'numpy is not installed')
+    def testNumpyField(self):
+        self.checkField(False)
+
+    def testSearchField(self):
+        # 没有 numpy 或者格子的行走距离不同时使用桶队列搜索
+        with mock.patch.object(distanceField, 'np', None):
+            self.checkField(False)
+        self.checkField(True)
+
+    @unittest.skipIf(distanceField.np is None, 'numpy is not installed')
+    def testReachableArea(self):
+        # numpy 距离场计算的行走范围和桶队列搜索的行走范围一样，每个格子的路径长度等于行走距离
+        for rnd, test_map, source, dest in self.getQueries(40, False, 2):
+            max_distance = rnd.randint(0, 15)
+            area = distanceField.getReachableArea(test_map, source, max_distance)
+            expected = aStarSearch.searchReachableArea(test_map, source, max_distance)
+            self.assertEqual(list(area.cost_list), list(expected.cost_list))
+            self.assertEqual(area.index_list[0], area.source)
+            self.assertEqual(sorted(area.index_list), sorted(expected.index_list))
+            self.assertEqual([area.getCost(index) for index in area.index_list],
+                             sorted(area.getCost(index) for index in area.index_list))
+            for index in area.index_list:
+                cells = helper.getEntryCells(test_map, area.getEntry(index))
+                self.assertEqual((cells[0], cells[-1]), (area.source, index))
+                self.assertEqual(len(cells) - 1, area.getCost(index))
+                for cell, next in zip(cells, cells[1:]):
+                    self.assertIn(next, test_map.move_table[cell])
+
+    def testMapField(self):
+        # 地图没有改变时同样的开始位置共用一个距离场，生物改变后重新计算
+        for rnd, test_map in self.getMaps(5, False):
+            cells = helper.getMovableCells(test_map)
+            sources = rnd.sample(cells, 2)
+            field = test_map.getDistanceField(sources)
+            self.assertIs(test_map.getDistanceField(sources[::-1]), field)
+            test_map.setEntity(*cells[-1], helper.Blocker())
+            self.assertIsNot(test_map.getDistanceField(sources), field)
+
+    @unittest.skipIf(distanceField.np is None, 'numpy is not installed')
+    def testRangeDispatch(self):
+        # 没有位棋盘的大地图中，范围比较大时行走范围由距离场计算
+        c.MAP_HEXAGON = False
+        test_map = helper.map.Map(40, 40, None)
+        self.assertIsNone(test_map.bitboard)
+        test_map.enableSearchStats()
+        for max_distance, name in ((c.FIELD_MIN_DISTANCE - 1, 'area'), (c.FIELD_MIN_DISTANCE, 'field')):
+            area = aStarSearch.getReachableArea(test_map, (20, 20), max_distance)
+            self.assertEqual(test_map.getSearchStats()['last']['name'], name)
+            expected = aStarSearch.searchReachableArea(test_map, (20, 20), max_distance)
+            self.assertEqual(list(area.cost_list), list(expected.cost_list))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+'''distanceTable 模块的测试'''
+import unittest
+import helper
+from source import distanceTable, aStarSearch
+
+class DistanceTableTest(helper.SearchTestCase):
+    def testLazyRows(self):
+        # 距离表创建时不计算任何一行，每次查询只计算目标格子的一行，距离是只考虑石头时的最短距离
+        for rnd, test_map in self.getMaps(20, False):
+            self.assertTrue(test_map.buildDistanceTable())
+            table = test_map.distance_table
+            self.assertEqual(table.row_list, [None] * test_map.size)
+            index1, index2 = [test_map.getCellIndex(*pos) for pos in rnd.sample(helper.getMovableCells(test_map), 2)]
+            expected = helper.dijkstra(test_map, index2)
+            self.assertEqual(table.getDistance(index1, index2), expected[index1])
+            self.assertEqual([index for index, row in enumerate(table.row_list) if row is not None], [index2])
+            for index in range(test_map.size):
+                if test_map.movable_map[index]:
+                    self.assertEqual(table.getDistance(index, index2), expected[index])
+
+    def testExactSearch(self):
+        # 生物挡住路径或者格子的行走距离不同时，距离表仍然不会高估，A* 搜索返回最短路径
+        for weighted in (False, True):
+            for rnd, test_map, source, dest in self.getQueries(30, weighted):
+                test_map.buildDistanceTable()
+                expected = helper.dijkstra(test_map, test_map.getCellIndex(*source))
+                self.assertEqual(helper.getEntryCost(aStarSearch.AStarSearch(test_map, source, dest)),
+                                 expected[test_map.getCellIndex(*dest)])
+
+    def testMaxBytes(self):
+        # 所有行需要的内存超过 max_bytes 时不创建距离表
+        for rnd, test_map in self.getMaps(5, False):
+            self.assertIsNone(distanceTable.createDistanceTable(test_map, test_map.size * test_map.size - 1))
+            self.assertIsNotNone(distanceTable.createDistanceTable(test_map, test_map.size * test_map.size * 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
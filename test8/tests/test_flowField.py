@@ -0,0 +1,55 @@
+'''flowField 模块的测试'''
+import unittest
+import helper
+from source import flowField
+
+class FlowFieldTest(helper.SearchTestCase):
+    def getFields(self, weighted):
+        # 依次返回 (随机数生成器, 地图, 流场)，地图上随机放两个生物，目的格子是随机的几个可以移动到的格子
+        for rnd, test_map in self.getMaps(20, weighted, max_size=10):
+            cells = helper.getMovableCells(test_map)
+            for pos in rnd.sample(cells, 2):
+                test_map.setEntity(*pos, helper.Blocker())
+            cells = helper.getMovableCells(test_map)
+            goals = [test_map.getCellIndex(*pos) for pos in rnd.sample(cells, min(len(cells), rnd.randint(1, 4)))]
+            yield rnd, test_map, flowField.FlowField(test_map, goals)
+
+    def checkField(self, weighted):
+        # 每个格子的距离是走到最近目的格子的最短距离，有生物的格子也可以作为开始位置，
+        # 沿着流场的路径走到目的格子，路径的行走距离等于流场的距离
+        for rnd, test_map, field in self.getFields(weighted):
+            for index in range(test_map.size):
+                distances = helper.dijkstra(test_map, index)
+                expected = min((distances[goal] for goal in field.goals if distances[goal] is not None), default=None)
+                self.assertEqual(field.getDistance(index), expected)
+                if not test_map.movable_map[index] and test_map.getEntity(*test_map.getCellPos(index)) is None:
+                    continue
+                path = field.getPath(test_map.getCellPos(index))
+                if expected is None:
+                    self.assertIsNone(path)
+                    continue
+                self.assertEqual(path.index_list[0], index)
+                self.assertIn(path.index_list[-1], field.goals)
+                self.assertEqual(path.getCost(), expected)
+                for cell, next in zip(path.index_list, path.index_list[1:]):
+                    self.assertIn(next, test_map.move_table[cell])
+                    self.assertTrue(test_map.movable_map[next])
+
+    def testUniformField(self):
+        self.checkField(False)
+
+    def testWeightedField(self):
+        self.checkField(True)
+
+    def testMapField(self):
+        # 同样的目的格子共用一个流场，生物位置改变后重新计算
+        for rnd, test_map, field in self.getFields(False):
+            goals = list(field.goals)
+            flow = test_map.getFlowField(goals)
+            self.assertIs(test_map.getFlowField(goals[::-1]), flow)
+            test_map.setEntity(*test_map.getCellPos(goals[0]), helper.Blocker())
+            self.assertIsNot(test_map.getFlowField(goals), flow)
+
+
+if __name__ == '__main__':
+    unittest.main()
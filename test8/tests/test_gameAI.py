@@ -0,0 +1,64 @@
+'''gameAI 模块的测试'''
+import unittest
+import helper
+from source import tool, entity, gameAI, aStarSearch
+
+class GameAITest(helper.SearchTestCase):
+    def getBattles(self, seed_num):
+        # 依次返回 (地图, 行动生物, 敌方生物列表)，每组在随机的地图位置放三个随机的生物
+        for rnd, test_map in self.getMaps(seed_num, True, stone_rate=0.15):
+            cells = helper.getMovableCells(test_map)
+            if len(cells) < 6:
+                continue
+            groups = [entity.EntityGroup(1), entity.EntityGroup(2)]
+            for i, pos in enumerate(rnd.sample(cells, 6)):
+                name = rnd.choice(list(tool.ATTR))
+                group = groups[i % 2]
+                unit = entity.Entity(group, name, pos[0], pos[1], tool.ATTR[name])
+                group.group.append(unit)
+                test_map.setEntity(pos[0], pos[1], unit)
+            # 行动生物至少可以走到一个敌方生物的相邻位置
+            enemy_cells = [test_map.getCellIndex(enemy.map_x, enemy.map_y) for enemy in groups[1].group]
+            for unit in groups[0].group:
+                distances = helper.dijkstra(test_map, test_map.getCellIndex(unit.map_x, unit.map_y), enemy_cells)
+                if any(distances[index] is not None for index in enemy_cells):
+                    yield test_map, unit, groups[1].group
+
+    def testAction(self):
+        # 选择的位置在本轮行走范围中，攻击的敌方生物在选择的位置相邻，不攻击时走向敌方生物
+        for test_map, unit, enemy_list in self.getBattles(20):
+            pos, enemy = gameAI.getAction(unit, test_map, enemy_list)
+            if pos is None:
+                self.assertTrue(unit.canRemoteAttack(test_map))
+                continue
+            source_index = test_map.getCellIndex(unit.map_x, unit.map_y)
+            distances = helper.dijkstra(test_map, source_index)
+            self.assertLessEqual(distances[test_map.getCellIndex(*pos)], unit.attr.distance)
+            if enemy is not None:
+                self.assertIn(test_map.getCellIndex(*pos),
+                              test_map.attack_table[test_map.getCellIndex(enemy.map_x, enemy.map_y)])
+
+    def testOneSearch(self):
+        # 一次 AI 行动选择只从行动生物的位置搜索一次，生物行走时从缓存中获取选择的路径，
+        # 地图没有改变时流场也从缓存中获取
+        for test_map, unit, enemy_list in self.getBattles(20):
+            test_map.enableSearchStats()
+            pos, enemy = gameAI.getAction(unit, test_map, enemy_list)
+            if pos is None:
+                continue
+            self.assertLessEqual(test_map.getSearchStats()['total']['calls'], 2)
+            test_map.enableSearchStats()
+            test_map.resetCacheStats()
+            path = aStarSearch.getPath(test_map, (unit.map_x, unit.map_y), pos)
+            self.assertEqual(test_map.getSearchStats()['total']['calls'], 0)
+            if path is not None:
+                self.assertEqual(test_map.getCacheStats()['hit'], 1)
+                self.assertLessEqual(path.getCost(), unit.attr.distance)
+            test_map.enableSearchStats()
+            self.assertEqual(gameAI.getAction(unit, test_map, enemy_list), (pos, enemy))
+            self.assertLessEqual(test_map.getSearchStats()['total']['calls'], 1)
+            test_map.enableSearchStats(False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+'''hexGeometry 模块的测试'''
+import random
+import unittest
+import helper
+from source import constants as c
+from source import hexGeometry
+
+class HexGeometryTest(helper.SearchTestCase):
+    def getCells(self, num, seed=0):
+        # 返回 num 个随机的格子位置，包含负数坐标和奇数行
+        rnd = random.Random(seed)
+        return [(rnd.randint(-20, 20), rnd.randint(-20, 20)) for _ in range(num)]
+
+    def testCoordinates(self):
+        # 偏移坐标和轴向坐标可以互相转换，相邻格子的距离都是 1
+        for x, y in self.getCells(200):
+            self.assertEqual(hexGeometry.axialToOffset(*hexGeometry.offsetToAxial(x, y)), (x, y))
+            self.assertEqual(hexGeometry.cubeToOffset(*hexGeometry.offsetToCube(x, y)), (x, y))
+            self.assertEqual(sum(hexGeometry.offsetToCube(x, y)), 0)
+            neighbors = hexGeometry.getNeighbors(x, y)
+            self.assertEqual(len(set(neighbors)), 6)
+            for next_x, next_y in neighbors:
+                self.assertEqual(hexGeometry.getDistance(x, y, next_x, next_y), 1)
+
+    def testNeighborTable(self):
+        # 地图的相邻格子表和 getNeighbors 返回的有效格子一样，无效的格子没有相邻格子
+        c.MAP_HEXAGON = True
+        test_map = helper.map.Map(7, 6, None)
+        for index in range(test_map.size):
+            x, y = test_map.getCellPos(index)
+            if not test_map.isValid(x, y):
+                # 奇数行最后一个格子不在地图中，没有相邻格子
+                self.assertEqual(test_map.move_table[index], ())
+                continue
+            expected = [test_map.getCellIndex(*pos) for pos in hexGeometry.getNeighbors(x, y)
+                        if test_map.isValid(*pos)]
+            self.assertEqual(sorted(test_map.move_table[index]), sorted(expected))
+
+    def testDistance(self):
+        # getDistance 等于广度优先搜索的步数
+        for x, y in self.getCells(5):
+            distances = {(x, y): 0}
+            queue = [(x, y)]
+            for pos in queue:
+                if distances[pos] == 6:
+                    break
+                for next in hexGeometry.getNeighbors(*pos):
+                    if next not in distances:
+                        distances[next] = distances[pos] + 1
+                        queue.append(next)
+            for (x2, y2), distance in distances.items():
+                self.assertEqual(hexGeometry.getDistance(x, y, x2, y2), distance)
+
+    def testRingAndDisc(self):
+        # 环上有 6 * radius 个不同的格子，距离都是 radius，圆盘按照距离从小到大包含所有距离不超过 radius 的格子
+        for x, y in self.getCells(20):
+            for radius in range(5):
+                ring = hexGeometry.getRing(x, y, radius)
+                self.assertEqual(len(set(ring)), max(1, 6 * radius))
+                self.assertTrue(all(hexGeometry.getDistance(x, y, *pos) == radius for pos in ring))
+                disc = hexGeometry.getDisc(x, y, radius)
+                self.assertEqual(len(set(disc)), 1 + 3 * radius * (radius + 1))
+                distances = [hexGeometry.getDistance(x, y, *pos) for pos in disc]
+                self.assertEqual(distances, sorted(distances))
+                self.assertLessEqual(max(distances), radius)
+
+    def testLine(self):
+        # 直线包含两端的格子，格子数量是距离加 1，每一步都走到相邻格子
+        cells = self.getCells(60)
+        for (x1, y1), (x2, y2) in zip(cells, cells[1:]):
+            line = hexGeometry.getLine(x1, y1, x2, y2)
+            self.assertEqual((line[0], line[-1]), ((x1, y1), (x2, y2)))
+            self.assertEqual(len(line), hexGeometry.getDistance(x1, y1, x2, y2) + 1)
+            for pos, next in zip(line, line[1:]):
+                self.assertEqual(hexGeometry.getDistance(*pos, *next), 1)
+        self.assertEqual(hexGeometry.getLine(3, 4, 3, 4), [(3, 4)])
+
+    def testPixelCell(self):
+        # 坐标在 getPixelCell 返回的格子的六边形中，格子中心坐标返回格子自己
+        rnd = random.Random(0)
+        half_x, half_y = c.HEX_X_SIZE // 2, c.HEX_Y_SIZE // 2
+        for _ in range(2000):
+            x, y = rnd.uniform(0, 500), rnd.uniform(0, 600)
+            map_x, map_y = hexGeometry.getPixelCell(x, y)
+            base_x, base_y = hexGeometry.getCellPixel(map_x, map_y)
+            dis_x, dis_y = abs(x - base_x - half_x), abs(y - base_y - half_y)
+            # 六边形上下两个顶点到中心的距离是 half_y，左右两边到中心的距离是 half_x，
+            # 斜边上 dis_x 从 0 增加到 half_x 时 dis_y 的上限从 half_y 减少到 half_y / 2
+            self.assertLessEqual(dis_x, half_x + 1e-6)
+            self.assertLessEqual(dis_y + dis_x * half_y / 2 / half_x, half_y + 1e-6)
+        for x, y in self.getCells(50):
+            base_x, base_y = hexGeometry.getCellPixel(x, y)
+            self.assertEqual(hexGeometry.getPixelCell(base_x + half_x, base_y + half_y), (x, y))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+'''hierarchicalSearch 模块的测试'''
+import unittest
+import helper
+from source import hierarchicalSearch
+
+class HierarchicalSearchTest(helper.SearchTestCase):
+    def testPathIsValid(self):
+        # 分层路径搜索的路径不一定最短，但是每一步都相邻并且可以经过，找不到路径时一定不能到达
+        for rnd, test_map, source, dest in self.getQueries(40, False):
+            source_index, dest_index = test_map.getCellIndex(*source), test_map.getCellIndex(*dest)
+            expected = helper.dijkstra(test_map, source_index)[dest_index]
+            location = hierarchicalSearch.HierarchicalSearch(test_map, source, dest)
+            if expected is None:
+                self.assertIsNone(location)
+                continue
+            cells = helper.getEntryCells(test_map, location)
+            self.assertEqual((cells[0], cells[-1]), (source_index, dest_index))
+            self.assertGreaterEqual(len(cells) - 1, expected)
+            for index, next in zip(cells, cells[1:]):
+                self.assertIn(next, test_map.move_table[index])
+                self.assertTrue(test_map.movable_map[next])
+
+    def testIncrementalRebuild(self):
+        # 生物改变后增量更新的区块图和重新创建的区块图一样
+        for rnd, test_map in self.getMaps(30, False):
+            graph = hierarchicalSearch.ClusterGraph(test_map, rnd.choice([3, 4, 8]))
+            cells = helper.getMovableCells(test_map)
+            entities = []
+            for _ in range(20):
+                if len(entities) > 0 and rnd.random() < 0.4:
+                    pos = entities.pop(rnd.randrange(len(entities)))
+                    test_map.setEntity(*pos, None)
+                else:
+                    pos = rnd.choice(cells)
+                    if not test_map.isMovable(*pos):
+                        continue
+                    test_map.setEntity(*pos, helper.Blocker())
+                    entities.append(pos)
+                graph.setDirty(test_map.getCellIndex(*pos))
+                graph.rebuild()
+                expected = hierarchicalSearch.ClusterGraph(test_map, graph.cluster_size)
+                self.assertEqual(graph.border_dict, expected.border_dict)
+                self.assertEqual(graph.cluster_nodes, expected.cluster_nodes)
+                self.assertEqual(graph.edge_dict, expected.edge_dict)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+'''incrementalSearch 模块的测试'''
+import unittest
+import helper
+from source import incrementalSearch
+
+class DStarLiteTest(helper.SearchTestCase):
+    def testRepairedDistance(self):
+        # 生物行走时地图改变，D* Lite 修复后的距离和重新搜索的最短距离一样，下一步在最短路径上
+        for rnd, test_map in self.getMaps(30, True):
+            cells = helper.getMovableCells(test_map)
+            source, dest = rnd.sample(cells, 2)
+            walker = helper.Blocker()
+            test_map.setEntity(*source, walker)
+            dstar = incrementalSearch.DStarLite(test_map, source, dest, walker)
+            test_map.addPlanner(dstar)
+            index = test_map.getCellIndex(*source)
+            dest_index = test_map.getCellIndex(*dest)
+            for _ in range(20):
+                pos = rnd.choice(cells)
+                if test_map.getEntity(*pos) is None:
+                    test_map.setEntity(*pos, helper.Blocker())
+                elif test_map.getEntity(*pos) is not walker:
+                    test_map.setEntity(*pos, None)
+                next = dstar.getNextStep(index)
+                expected = helper.dijkstra(test_map, index)
+                if expected[dest_index] is None:
+                    self.assertIsNone(next)
+                    self.assertEqual(dstar.rhs_list[index], incrementalSearch.INFINITE)
+                    continue
+                self.assertEqual(dstar.rhs_list[index], expected[dest_index])
+                if next is None:
+                    break
+                next_expected = helper.dijkstra(test_map, next, (index,))
+                self.assertEqual(test_map.cost_map[next] + next_expected[dest_index], expected[dest_index])
+                # 生物走到下一步
+                test_map.setEntity(*test_map.getCellPos(index), None)
+                test_map.setEntity(*test_map.getCellPos(next), walker)
+                index = next
+            test_map.removePlanner(dstar)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+'''jumpPointSearch 模块的测试'''
+import unittest
+import helper
+from source import constants as c
+from source import jumpPointSearch, aStarSearch
+
+class JumpPointSearchTest(helper.SearchTestCase):
+    def testShortestPath(self):
+        # 跳点搜索返回最短路径，跳点之间展开成每一步相邻的格子
+        for rnd, test_map, source, dest in self.getQueries(60, False):
+            source_index, dest_index = test_map.getCellIndex(*source), test_map.getCellIndex(*dest)
+            expected = helper.dijkstra(test_map, source_index)[dest_index]
+            location = jumpPointSearch.JumpPointSearch(test_map, source, dest)
+            self.assertEqual(helper.getEntryCost(location), expected)
+            if location is None:
+                continue
+            cells = helper.getEntryCells(test_map, location)
+            self.assertEqual((cells[0], cells[-1]), (source_index, dest_index))
+            self.assertEqual(len(cells) - 1, expected)
+            for index, next in zip(cells, cells[1:]):
+                self.assertIn(next, test_map.move_table[index])
+                self.assertTrue(test_map.movable_map[next])
+
+    def testMapSearch(self):
+        # 地图设置跳点搜索后，getPath 使用跳点搜索，路径长度不变
+        for rnd, test_map, source, dest in self.getQueries(20, False, 2):
+            expected = aStarSearch.getPath(test_map, source, dest)
+            test_map.setPathSearch(c.SEARCH_JPS)
+            path = aStarSearch.getPath(test_map, source, dest)
+            test_map.setPathSearch(c.SEARCH_ASTAR)
+            self.assertEqual(None if path is None else path.getCost(),
+                             None if expected is None else expected.getCost())
+
+
+if __name__ == '__main__':
+    unittest.main()
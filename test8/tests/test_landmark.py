@@ -0,0 +1,78 @@
+'''landmark 模块的测试'''
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import helper
+from source import constants as c
+from source import landmark, aStarSearch
+
+class LandmarkTest(helper.SearchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dir_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir_path)
+
+    def testLowerDistance(self):
+        # 路标估计距离不会高估，使用路标估计距离的 A* 搜索返回最短路径
+        for weighted in (False, True):
+            for rnd, test_map, source, dest in self.getQueries(30, weighted):
+                test_map.setHeuristic(c.HEURISTIC_LANDMARK)
+                source_index, dest_index = test_map.getCellIndex(*source), test_map.getCellIndex(*dest)
+                expected = helper.dijkstra(test_map, source_index)[dest_index]
+                lower_distance = test_map.landmark_table.getLowerDistance(source_index, dest_index)
+                if expected is not None:
+                    self.assertLessEqual(lower_distance, expected)
+                self.assertEqual(helper.getEntryCost(aStarSearch.AStarSearch(test_map, source, dest)), expected)
+
+    def testLoadFile(self):
+        # 文件和地图一致时直接使用文件中的路标距离表，不重新计算
+        for rnd, test_map in self.getMaps(5, False):
+            file_path = os.path.join(self.dir_path, 'landmark.json')
+            table = landmark.loadLandmarkTable(test_map, file_path)
+            with mock.patch.object(landmark.LandmarkTable, 'selectLandmarks') as select:
+                loaded = landmark.loadLandmarkTable(test_map, file_path)
+            select.assert_not_called()
+            self.assertEqual((loaded.landmarks, loaded.distances), (table.landmarks, table.distances))
+            os.remove(file_path)
+
+    def testBadFile(self):
+        # 文件损坏，和地图不一致或者数组长度不对时重新计算，并用正确的路标距离表覆盖文件
+        def corrupt(data):
+            return '{"signature": [1, 2'
+
+        def mismatch(data):
+            data['signature'][0] += 1
+            return json.dumps(data)
+
+        def shortRow(data):
+            data['distances'][0].pop()
+            return json.dumps(data)
+
+        def badLandmark(data):
+            data['landmarks'][0] = -1
+            return json.dumps(data)
+
+        def badType(data):
+            data['distances'] = 5
+            return json.dumps(data)
+
+        for rnd, test_map in self.getMaps(3, False):
+            file_path = os.path.join(self.dir_path, 'landmark.json')
+            expected = landmark.loadLandmarkTable(test_map, file_path)
+            with open(file_path) as f:
+                data = f.read()
+            for change in (corrupt, mismatch, shortRow, badLandmark, badType):
+                with open(file_path, 'w') as f:
+                    f.write(change(json.loads(data)))
+                table = landmark.loadLandmarkTable(test_map, file_path)
+                self.assertEqual((table.landmarks, table.distances), (expected.landmarks, expected.distances))
+                with open(file_path) as f:
+                    self.assertEqual(f.read(), data)
+            os.remove(file_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+'''map 模块的测试'''
+import random
+import unittest
+import helper
+import pygame as pg
+from source import constants as c
+from source import tool, entity, map, aStarSearch
+
+class SearchCacheTest(helper.SearchTestCase):
+    def setUp(self):
+        super().setUp()
+        c.MAP_HEXAGON = True
+        self.test_map = map.Map(10, 10, None)
+        # call_list 保存每次实际调用搜索函数的参数
+        self.call_list = []
+
+    def search(self, test_map, value):
+        self.call_list.append(value)
+        return value * 2
+
+    def testHitAndMiss(self):
+        # 相同的 key 只搜索一次，之后从缓存中获取，并统计命中和未命中次数
+        test_map = self.test_map
+        self.assertEqual(test_map.getSearchResult(('test', 1), self.search, 1), 2)
+        self.assertEqual(test_map.getSearchResult(('test', 1), self.search, 1), 2)
+        self.assertEqual(test_map.getSearchResult(('test', 2), self.search, 2), 4)
+        self.assertEqual(self.call_list, [1, 2])
+        stats = test_map.getCacheStats()
+        self.assertEqual((stats['hit'], stats['miss'], stats['size']), (1, 2, 2))
+        test_map.resetCacheStats()
+        self.assertEqual((test_map.getCacheStats()['hit'], test_map.getCacheStats()['miss']), (0, 0))
+
+    def testInvalidation(self):
+        # 生物位置，行走距离，搜索算法或估计距离改变后，之前的结果不再使用
+        test_map = self.test_map
+        changes = [lambda: test_map.setEntity(0, 0, helper.Blocker()),
+                   lambda: test_map.setEntity(0, 0, None),
+                   lambda: test_map.setMoveCost({c.MAP_GRASS:2}),
+                   lambda: test_map.setPathSearch(c.SEARCH_DIAL),
+                   lambda: test_map.setHeuristic(c.HEURISTIC_DEFAULT)]
+        for change in changes:
+            version = test_map.version
+            test_map.getSearchResult(('test', 1), self.search, 1)
+            change()
+            self.assertGreater(test_map.version, version)
+            test_map.getSearchResult(('test', 1), self.search, 1)
+        # 每次改变后搜索一次，加上第一次搜索
+        self.assertEqual(len(self.call_list), len(changes) + 1)
+
+    def testPathAfterChange(self):
+        # 路径被生物挡住后，getPath 重新搜索，不返回缓存中的旧路径
+        test_map = self.test_map
+        path = aStarSearch.getPath(test_map, (0, 0), (4, 0))
+        self.assertEqual(path.getCost(), 4)
+        test_map.setEntity(2, 0, helper.Blocker())
+        path = aStarSearch.getPath(test_map, (0, 0), (4, 0))
+        self.assertNotIn(test_map.getCellIndex(2, 0), path.index_list)
+        self.assertGreater(path.getCost(), 4)
+
+    def testLeastRecentlyUsed(self):
+        # 超过缓存的最大数量时删除最久没有使用的结果，旧版本号的结果最先被删除
+        test_map = self.test_map
+        test_map.getSearchResult(('test', -1), self.search, -1)
+        test_map.updateVersion()
+        for value in range(c.SEARCH_CACHE_SIZE):
+            test_map.getSearchResult(('test', value), self.search, value)
+            # 经常使用的结果不会被删除
+            test_map.getSearchResult(('test', 0), self.search, 0)
+        self.assertEqual(len(test_map.search_cache), c.SEARCH_CACHE_SIZE)
+        self.assertNotIn((test_map.version - 1, 'test', -1), test_map.search_cache)
+        test_map.getSearchResult(('test', c.SEARCH_CACHE_SIZE), self.search, c.SEARCH_CACHE_SIZE)
+        self.assertEqual(len(test_map.search_cache), c.SEARCH_CACHE_SIZE)
+        self.assertIn((test_map.version, 'test', 0), test_map.search_cache)
+        self.assertNotIn((test_map.version, 'test', 1), test_map.search_cache)
+
+
+class MoveCostTest(helper.SearchTestCase):
+    def testInvalidCost(self):
+        # 行走距离不是 1 到 255 的整数时抛出 ValueError，错误信息包含格子类型，之前的设置不变
+        c.MAP_HEXAGON = False
+        test_map = map.Map(6, 1, [{'x':2, 'y':0, 'type':c.MAP_GRASS}])
+        test_map.setMoveCost({c.MAP_EMPTY:2})
+        for cost in (0, -1, 256, 300, 1.5, '2', True, None):
+            with self.assertRaises(ValueError) as context:
+                test_map.setMoveCost({c.MAP_EMPTY:1, c.MAP_GRASS:cost})
+            self.assertIn('map type %d' % c.MAP_GRASS, str(context.exception))
+            self.assertEqual(list(test_map.cost_map), [2, 2, 1, 2, 2, 2])
+        test_map.setMoveCost({c.MAP_GRASS:255})
+        self.assertEqual(list(test_map.cost_map), [2, 2, 255, 2, 2, 2])
+        self.assertEqual(aStarSearch.getPath(test_map, (0, 0), (5, 0)).getCost(), 263)
+
+    def testWeightedSearch(self):
+        # 格子的行走距离不同时，A* 搜索和桶队列搜索都返回最短路径
+        for rnd, test_map, source, dest in self.getQueries(40, True):
+            expected = helper.dijkstra(test_map, test_map.getCellIndex(*source))[test_map.getCellIndex(*dest)]
+            self.assertEqual(helper.getEntryCost(aStarSearch.AStarSearch(test_map, source, dest)), expected)
+            self.assertEqual(helper.getEntryCost(aStarSearch.DialSearch(test_map, source, dest)), expected)
+
+
+class MapShowTest(helper.SearchTestCase):
+    def createBattle(self, rnd, hexagon):
+        # 创建关卡大小的随机地图，两个生物组各放三个随机的生物，返回 (地图, 生物列表)
+        c.MAP_HEXAGON = hexagon
+        grid = [{'x':x, 'y':y, 'type':rnd.choice([c.MAP_STONE, c.MAP_GRASS])}
+                for y in range(c.GRID_Y_LEN) for x in range(c.GRID_X_LEN) if rnd.random() < 0.3]
+        test_map = map.Map(c.GRID_X_LEN, c.GRID_Y_LEN, grid)
+        groups = [entity.EntityGroup(1), entity.EntityGroup(2)]
+        units = []
+        for i, (x, y) in enumerate(rnd.sample(helper.getMovableCells(test_map), 6)):
+            name = rnd.choice(list(tool.ATTR))
+            unit = entity.Entity(groups[i % 2], name, x, y, tool.ATTR[name])
+            test_map.setEntity(x, y, unit)
+            units.append(unit)
+        return test_map, units
+
+    def getMousePos(self, rnd, test_map):
+        # 返回地图中随机一个格子中心附近的鼠标坐标
+        x, y = rnd.choice([test_map.getCellPos(index) for index in range(test_map.size)
+                           if test_map.isValid(*test_map.getCellPos(index))])
+        base_x, base_y = test_map.getCellPixel(x, y)
+        size_x, size_y = (c.HEX_X_SIZE, c.HEX_Y_SIZE) if c.MAP_HEXAGON else (c.REC_SIZE, c.REC_SIZE)
+        return (base_x + size_x // 2 + rnd.randint(-8, 8), base_y + size_y // 2 + rnd.randint(-8, 8))
+
+    def testSameAsRecompute(self):
+        # 生物，生物状态，地图和鼠标位置随机改变时，updateMapShow 的背景和重新计算的背景一样
+        for hexagon in (True, False):
+            for seed in range(10):
+                rnd = random.Random(seed)
+                test_map, units = self.createBattle(rnd, hexagon)
+                test_map.active_entity = units[0]
+                mouse_pos = self.getMousePos(rnd, test_map)
+                for _ in range(60):
+                    value = rnd.random()
+                    if value < 0.15:
+                        test_map.active_entity = rnd.choice(units)
+                    elif value < 0.25:
+                        test_map.active_entity.state = rnd.choice([c.IDLE, c.IDLE, c.WALK])
+                    elif value < 0.35:
+                        unit = rnd.choice(units[1:])
+                        pos = rnd.choice(helper.getMovableCells(test_map))
+                        test_map.setEntity(unit.map_x, unit.map_y, None)
+                        unit.map_x, unit.map_y = pos
+                        test_map.setEntity(*pos, unit)
+                    elif value < 0.7:
+                        mouse_pos = self.getMousePos(rnd, test_map)
+                    test_map.updateMapShow(mouse_pos)
+                    bg_map, select, show_key = bytes(test_map.bg_map), test_map.select, test_map.show_key
+                    # 不使用缓存的背景和鼠标格子，从头计算，比较后恢复，下一次 updateMapShow 继续使用缓存
+                    test_map.resetBackGround()
+                    if test_map.active_entity.state == c.IDLE:
+                        test_map.showActiveEntityRange()
+                        test_map.checkMouseMove(mouse_pos)
+                        self.assertEqual(test_map.select, select)
+                    self.assertEqual(bytes(test_map.bg_map), bg_map)
+                    test_map.bg_map[:] = bg_map
+                    test_map.select, test_map.show_key = select, show_key
+
+    def testDirtyCells(self):
+        # getDirtyCells 返回的格子和逐个比较 bg_map 和 drawn_bg 的结果一样
+        rnd = random.Random(0)
+        test_map = map.Map(c.GRID_X_LEN, c.GRID_Y_LEN, None)
+        for _ in range(300):
+            for index in rnd.sample(range(test_map.size), rnd.randint(0, 6)):
+                test_map.bg_map[index] = rnd.randint(0, c.BG_ATTACK)
+            for index in rnd.sample([0, 1, test_map.size - 2, test_map.size - 1], rnd.randint(0, 2)):
+                test_map.drawn_bg[index] = rnd.randint(0, c.BG_ATTACK)
+            expected = [index for index in range(test_map.size) if test_map.bg_map[index] != test_map.drawn_bg[index]]
+            self.assertEqual(test_map.getDirtyCells(), expected)
+            if rnd.random() < 0.5:
+                test_map.drawn_bg[:] = test_map.bg_map
+
+    def testRedrawCells(self):
+        # 只重新绘制改变了的格子后的背景图片，和重新绘制整个背景的图片一样
+        for hexagon in (True, False):
+            rnd = random.Random(1)
+            test_map, units = self.createBattle(rnd, hexagon)
+            test_map.active_entity = units[0]
+            surface = pg.Surface((c.MAP_WIDTH, c.MAP_HEIGHT))
+            for _ in range(20):
+                test_map.active_entity = rnd.choice(units)
+                test_map.updateMapShow(self.getMousePos(rnd, test_map))
+                test_map.drawBackground(surface)
+                expected = pg.Surface((c.MAP_WIDTH, c.MAP_HEIGHT)).convert()
+                if hexagon:
+                    test_map.drawBackgroundHex(expected)
+                else:
+                    test_map.drawBackgroundSquare(expected)
+                self.assertEqual(pg.image.tostring(test_map.bg_surface, 'RGB'), pg.image.tostring(expected, 'RGB'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+'''aStarSearch.Path 路径对象的测试'''
+import unittest
+import helper
+from source import aStarSearch
+
+class PathTest(helper.SearchTestCase):
+    def setUp(self):
+        super().setUp()
+        helper.c.MAP_HEXAGON = False
+        self.test_map = helper.map.Map(10, 2, None)
+        # 第一行从 (0, 0) 走到 (5, 0)，格子的累计行走距离
+        self.index_list = list(range(6))
+        self.cost_list = [0, 1, 3, 4, 7, 8]
+
+    def getPaths(self):
+        # 返回每一步距离都是 1 的路径和累计行走距离不同的路径
+        return (aStarSearch.Path(self.test_map, self.index_list),
+                aStarSearch.Path(self.test_map, self.index_list, 0, self.cost_list))
+
+    def testQueue(self):
+        # 作为队列使用时 popStep 依次返回每一步，长度，距离和下一步随着当前格子改变
+        for path in self.getPaths():
+            self.assertEqual((len(path), path.getDistance(), path.getFirstStep()), (6, 5, (1, 0)))
+            copy = path.copy()
+            steps = []
+            while True:
+                pos = copy.popStep()
+                if pos is None:
+                    break
+                steps.append(pos)
+            self.assertEqual(steps, [(x, 0) for x in range(1, 6)])
+            self.assertEqual((len(copy), copy.getDistance(), copy.getCost(), copy.getFirstStep()), (1, 0, 0, None))
+            # 复制的路径单独作为队列使用，不影响原来的路径
+            self.assertEqual(list(path), [(x, 0) for x in range(6)])
+            self.assertEqual((path[0], path[-1], path.getDest()), ((0, 0), (5, 0), (5, 0)))
+            with self.assertRaises(IndexError):
+                path[6]
+
+    def testSlice(self):
+        # 切片从当前格子开始，返回新的路径对象，累计行走距离和原来的路径一致
+        for path, cost in zip(self.getPaths(), (2, 4)):
+            path.popStep()
+            part = path[1:4]
+            self.assertEqual(list(part), [(2, 0), (3, 0), (4, 0)])
+            self.assertEqual((part.head, part.getDistance(), part.getCost()), (0, 2, cost))
+            self.assertEqual(list(path[:]), list(path))
+            self.assertEqual(path.getDistance(), 4)
+
+    def testCost(self):
+        # getPosByCost 返回累计行走距离不超过 cost 的最远位置，cutByCost 的目的位置一样
+        uniform, weighted = self.getPaths()
+        self.assertEqual([uniform.getPosByCost(cost) for cost in (-1, 0, 2, 5, 9)],
+                         [(0, 0), (0, 0), (2, 0), (5, 0), (5, 0)])
+        self.assertEqual([weighted.getPosByCost(cost) for cost in (0, 2, 3, 6, 8, 9)],
+                         [(0, 0), (1, 0), (2, 0), (3, 0), (5, 0), (5, 0)])
+        self.assertEqual(weighted.getCost(), 8)
+        for path in (uniform, weighted):
+            for cost in range(-1, 10):
+                part = path.cutByCost(cost)
+                self.assertEqual((part[0], part.getDest()), ((0, 0), path.getPosByCost(cost)))
+                self.assertLessEqual(part.getCost(), max(cost, 0))
+        weighted.popStep()
+        self.assertEqual((weighted.getCost(), weighted.getPosByCost(3)), (7, (3, 0)))
+
+    def testDistance(self):
+        # getPosByDistance 从当前格子往前数，模块函数从目的位置往回数，超过路径范围时返回开始或者目的位置
+        path = self.getPaths()[0]
+        self.assertEqual([path.getPosByDistance(distance) for distance in (-1, 0, 2, 7)],
+                         [(0, 0), (0, 0), (2, 0), (5, 0)])
+        self.assertEqual([aStarSearch.getPosByDistance(path, distance) for distance in (0, 2, 7)],
+                         [(5, 0), (3, 0), (0, 0)])
+        self.assertEqual(aStarSearch.getFirstStepAndDistance(path), (1, 0, 5))
+        single = aStarSearch.Path(self.test_map, [3])
+        self.assertEqual(aStarSearch.getFirstStepAndDistance(single), (3, 0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()